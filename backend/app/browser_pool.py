@@ -0,0 +1,209 @@
+"""
+Long-lived Chromium pool for the Playwright extractor.
+Keeps browsers warm between extractions, hands out an isolated
+BrowserContext per job and recycles browsers that have served too many
+pages or grown past the memory ceiling.
+"""
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager
+from typing import Optional, Set
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BROWSER_ARGS = ['--no-sandbox', '--disable-setuid-sandbox']
+
+
+class PooledBrowser:
+    """A pooled Chromium instance and its usage counters"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+
+    async def rss_mb(self) -> float:
+        """
+        Resident memory of the browser and all its child processes in MB.
+        Process IDs come from the DevTools protocol, RSS from /proc, so this
+        returns 0 on platforms without procfs.
+        """
+        if not sys.platform.startswith('linux'):
+            return 0.0
+
+        session = await self.browser.new_browser_cdp_session()
+        try:
+            info = await session.send('SystemInfo.getProcessInfo')
+        finally:
+            await session.detach()
+
+        total_kb = 0
+        for process in info.get('processInfo', []):
+            try:
+                with open(f"/proc/{process['id']}/status") as status:
+                    for line in status:
+                        if line.startswith('VmRSS:'):
+                            total_kb += int(line.split()[1])
+                            break
+            except (OSError, ValueError, KeyError):
+                continue
+        return total_kb / 1024
+
+
+class BrowserPool:
+    """
+    Pool of warm headless Chromium browsers.
+
+    At most `size` browsers are alive at once; each lease gets a fresh
+    BrowserContext so cookies and storage never leak between extractions.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        warmup: Optional[int] = None,
+        recycle_pages: Optional[int] = None,
+        recycle_memory_mb: Optional[int] = None
+    ):
+        self.size = max(1, size if size is not None else settings.browser_pool_size)
+        self.warmup = warmup if warmup is not None else settings.browser_pool_warmup
+        self.recycle_pages = recycle_pages if recycle_pages is not None else settings.browser_recycle_pages
+        self.recycle_memory_mb = (
+            recycle_memory_mb if recycle_memory_mb is not None else settings.browser_recycle_memory_mb
+        )
+
+        self._playwright: Optional[Playwright] = None
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.size)
+        self._browsers: Set[PooledBrowser] = set()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    async def start(self):
+        """Start Playwright and launch the warm-up browsers"""
+        async with self._start_lock:
+            if self._started:
+                return
+
+            self._playwright = await async_playwright().start()
+            self._started = True
+
+            for _ in range(min(self.warmup, self.size)):
+                self._idle.put_nowait(await self._launch())
+
+            logger.info(f"Browser pool started (size={self.size}, warm={self._idle.qsize()})")
+
+    async def stop(self):
+        """Close every pooled browser and stop Playwright"""
+        async with self._start_lock:
+            if not self._started:
+                return
+
+            for pooled in list(self._browsers):
+                await self._close(pooled)
+
+            self._idle = asyncio.Queue()
+            await self._playwright.stop()
+            self._playwright = None
+            self._started = False
+            logger.info("Browser pool stopped")
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """
+        Lease a browser and yield a new isolated BrowserContext on it.
+        The context is closed and the browser returned (or recycled) on exit.
+        """
+        if not self._started:
+            await self.start()
+
+        async with self._slots:
+            pooled = await self._acquire()
+            browser_context: Optional[BrowserContext] = None
+            try:
+                browser_context = await pooled.browser.new_context(**context_options)
+                yield browser_context
+            finally:
+                if browser_context is not None:
+                    try:
+                        await browser_context.close()
+                    except Exception as e:
+                        logger.debug(f"Error closing browser context: {e}")
+                pooled.pages_served += 1
+                await self._release(pooled)
+
+    def stats(self) -> dict:
+        """Current pool occupancy"""
+        return {
+            "size": self.size,
+            "alive": len(self._browsers),
+            "idle": self._idle.qsize(),
+            "started": self._started
+        }
+
+    async def _launch(self) -> PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        pooled = PooledBrowser(browser)
+        self._browsers.add(pooled)
+        logger.debug(f"Launched pooled browser ({len(self._browsers)} alive)")
+        return pooled
+
+    async def _acquire(self) -> PooledBrowser:
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                return await self._launch()
+
+            if pooled.browser.is_connected():
+                return pooled
+
+            # Browser crashed while idle - drop it and try the next one
+            self._browsers.discard(pooled)
+
+    async def _release(self, pooled: PooledBrowser):
+        if not pooled.browser.is_connected():
+            self._browsers.discard(pooled)
+            return
+
+        reason = await self._recycle_reason(pooled)
+        if reason:
+            logger.info(f"Recycling pooled browser: {reason}")
+            await self._close(pooled)
+            return
+
+        self._idle.put_nowait(pooled)
+
+    async def _recycle_reason(self, pooled: PooledBrowser) -> Optional[str]:
+        if self.recycle_pages and pooled.pages_served >= self.recycle_pages:
+            return f"served {pooled.pages_served} pages"
+
+        if self.recycle_memory_mb:
+            try:
+                rss = await pooled.rss_mb()
+            except Exception as e:
+                logger.debug(f"Could not read browser memory: {e}")
+                return None
+            if rss > self.recycle_memory_mb:
+                return f"RSS {rss:.0f} MB exceeds {self.recycle_memory_mb} MB"
+
+        return None
+
+    async def _close(self, pooled: PooledBrowser):
+        self._browsers.discard(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled browser: {e}")
+
+
+# Shared pool used by MediaExtractor, started with the FastAPI app
+browser_pool = BrowserPool()
@@ -13,11 +13,109 @@ class Settings(BaseSettings):
     max_video_size_mb: int = 500
     playwright_timeout: int = 30000
     enable_ffmpeg_conversion: bool = True
-    
+
+    # Browser pool (Playwright extractor)
+    browser_pool_size: int = 2
+    browser_pool_warmup: int = 1
+    browser_recycle_pages: int = 50
+    browser_recycle_memory_mb: int = 1024
+
+    # Event-driven extraction completion
+    extraction_deadline_seconds: int = 30
+    extraction_quiet_window_ms: int = 1500
+    extraction_min_video_kb: int = 1024
+
+    # Request blocking in the headless browser
+    enable_resource_blocking: bool = True
+    blocked_resource_types: str = "image,font,stylesheet"
+
+    # Extraction cascade (static HTML scan before the browser)
+    enable_static_scan: bool = True
+    cascade_skip_after_misses: int = 3
+    # A skipped tier is tried again on every Nth request for the domain (0 = never)
+    cascade_reprobe_every: int = 20
+    static_scan_max_kb: int = 2048
+    static_scan_max_connections: int = 20
+
+    # Selenium fallback extractor
+    selenium_pool_size: int = 2
+    selenium_pool_warmup: int = 1
+    selenium_recycle_pages: int = 50
+
+    # Extraction result cache (memory LRU + optional shared Redis tier)
+    enable_extraction_cache: bool = True
+    extraction_cache_max_entries: int = 500
+    extraction_cache_default_ttl: int = 600
+    extraction_cache_max_ttl: int = 3600
+    extraction_cache_safety_margin: int = 60
+    redis_url: str = ""
+
+    # Admission control: concurrent jobs per class, and how many may wait
+    max_browser_jobs: int = 2
+    max_ytdlp_jobs: int = 3
+    max_ffmpeg_jobs: int = 1
+    max_audio_jobs: int = 2
+    job_queue_size: int = 20
+    job_default_seconds: int = 60
+
+    # FFmpeg core budget (0 = all CPUs) and threads per video re-encode (0 = half the cores)
+    transcode_cores: int = 0
+    transcode_encode_threads: int = 0
+    # Long re-encodes are split into chunks encoded in parallel (0 segments = auto)
+    segmented_transcode_min_seconds: int = 300
+    segmented_transcode_segments: int = 0
+
+    # Playlist downloads (videos in parallel per playlist / across all playlists)
+    playlist_max_parallel: int = 3
+    playlist_global_max_parallel: int = 6
+    playlist_item_timeout_seconds: int = 1800
+
+    # Checkpoints of playlist jobs, resumed after a restart
+    job_store_path: str = "/tmp/playlist_jobs.db"
+
+    # Playlist enumeration cache
+    playlist_cache_ttl: int = 1800
+    playlist_cache_max_entries: int = 50
+
+    # Parallel fragment downloads (fragments one job fetches at once, per job class)
+    youtube_concurrent_fragments: int = 4
+    playlist_concurrent_fragments: int = 2
+    hls_concurrent_segments: int = 8
+
+    # YouTube format ladders (kept until stream URLs expire; TTL when they carry no expiry)
+    format_index_ttl: int = 3600
+    format_index_max_entries: int = 200
+
+    # yt-dlp worker pool
+    ytdlp_pool_size: int = 3
+    ytdlp_worker_max_tasks: int = 100
+    # Seconds a stalled connection may go without data before yt-dlp gives up on it
+    ytdlp_socket_timeout: int = 30
+
+    # Background yt-dlp updater (0 disables the schedule; the admin endpoint still works)
+    ytdlp_runtime_dir: str = "/tmp/ytdlp_runtime"
+    ytdlp_update_interval_hours: int = 24
+
+    # Per-video metadata cache (title, thumbnail, duration, uploader)
+    metadata_cache_max_entries: int = 2000
+    metadata_cache_ttl: int = 21600
+
+    # YouTube download cache (files in use or accessed recently are never evicted)
+    youtube_cache_max_mb: int = 5000
+    youtube_cache_min_age_seconds: int = 600
+
+    # Token required by /api/admin endpoints (admin endpoints are disabled when empty)
+    admin_token: str = ""
+
     @property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins from comma-separated string"""
         return [origin.strip() for origin in self.cors_origins.split(",")]
+
+    @property
+    def blocked_resource_types_list(self) -> List[str]:
+        """Parse blocked Playwright resource types from comma-separated string"""
+        return [t.strip() for t in self.blocked_resource_types.split(",") if t.strip()]
     
     class Config:
         env_file = ".env"
@@ -1,9 +1,13 @@
-import asyncio
 import os
 import logging
 import hashlib
+import shutil
+from pathlib import Path
 from typing import Optional
 from app.config import settings
+from app.hls_fetcher import fetch_hls, HlsFetchError
+from app.progress import ProgressCallback
+from app.transcode_scheduler import run_transcode, REMUX
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +16,13 @@ class VideoConverter:
     """Handles video conversion, primarily HLS (.m3u8) to MP4 using FFmpeg"""
     
     @staticmethod
-    async def convert_hls_to_mp4(m3u8_url: str) -> Optional[str]:
+    async def convert_hls_to_mp4(m3u8_url: str, on_progress: Optional[ProgressCallback] = None) -> Optional[str]:
         """
         Convert HLS stream (.m3u8) to MP4 file using FFmpeg
         
         Args:
             m3u8_url: URL of the .m3u8 playlist file
+            on_progress: Called with live FFmpeg progress fields
             
         Returns:
             Path to converted MP4 file, or None if conversion failed
@@ -38,10 +43,22 @@ class VideoConverter:
             
             logger.info(f"Converting HLS to MP4: {m3u8_url}")
             
+            # Fetch segments in parallel and let FFmpeg remux from disk;
+            # live or encrypted streams are left to FFmpeg's own demuxer
+            source = m3u8_url
+            segment_dir = Path(settings.download_dir) / f"hls_{url_hash}"
+            if settings.hls_concurrent_segments > 1:
+                try:
+                    source = str(await fetch_hls(
+                        m3u8_url, segment_dir, settings.hls_concurrent_segments, on_progress=on_progress
+                    ))
+                except HlsFetchError as e:
+                    logger.info(f"Parallel segment fetch not used ({e}), FFmpeg will read the stream")
+            
             # FFmpeg command to download and convert HLS stream
             cmd = [
                 'ffmpeg',
-                '-i', m3u8_url,
+                '-i', source,
                 '-c', 'copy',  # Copy streams without re-encoding (faster)
                 '-bsf:a', 'aac_adtstoasc',  # Fix AAC stream
                 '-y',  # Overwrite output file
@@ -49,19 +66,16 @@ class VideoConverter:
             ]
             
             # Run FFmpeg
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
+            try:
+                returncode, stderr = await run_transcode(cmd, REMUX, on_progress)
+            finally:
+                shutil.rmtree(segment_dir, ignore_errors=True)
             
-            if process.returncode == 0 and os.path.exists(output_file):
+            if returncode == 0 and os.path.exists(output_file):
                 logger.info(f"Conversion successful: {output_file}")
                 return output_file
             else:
-                logger.error(f"FFmpeg failed: {stderr.decode()}")
+                logger.error(f"FFmpeg failed: {stderr}")
                 return None
                 
         except FileNotFoundError:
@@ -0,0 +1,257 @@
+"""
+Content-addressed cache of YouTube download outputs.
+Files are named after (video ID, resolved format selector, format type), so
+repeat requests for the same video in the same format reuse the existing
+file instead of downloading it again. All state lives on disk, so it is
+shared by every worker process: per-key lock files serialize downloads,
+files being served are pinned with shared locks on per-file pin files, and
+file modification times record the last access. Display metadata (title,
+thumbnail, ...) is kept in a `.json` file next to each output, so a hit
+served by any worker has it. Eviction removes least-recently-used, unpinned
+files once the cache exceeds its size budget.
+Only finished outputs carry the plain `youtube_<key>.<ext>` name, so files
+still being written are never evicted.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: locks and pins only hold within this process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_PREFIX = "youtube_"
+LOCK_DIR = ".locks"
+
+# Finished outputs only - not .part/.ytdl files or yt-dlp's .fNNN/.temp intermediates
+_CACHE_FILE_RE = re.compile(rf"^{CACHE_FILE_PREFIX}[0-9a-f]+\.[a-z0-9]+$")
+
+# Back-off while another process holds a key lock
+LOCK_POLL_MIN_SECONDS = 0.05
+LOCK_POLL_MAX_SECONDS = 1.0
+
+
+class CacheEntry:
+    """A cached output file"""
+
+    def __init__(self, path: Path, size: int, last_access: float, metadata: Optional[Dict] = None):
+        self.path = path
+        self.size = size
+        self.last_access = last_access
+        self.metadata = metadata
+
+
+class DownloadCache:
+    """Finished downloads in a directory, keyed by content"""
+
+    def __init__(self, directory: Path, max_mb: Optional[int] = None, min_age_seconds: Optional[int] = None):
+        self.directory = Path(directory)
+        self.lock_dir = self.directory / LOCK_DIR
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = (max_mb if max_mb is not None else settings.youtube_cache_max_mb) * 1024 * 1024
+        self.min_age_seconds = min_age_seconds if min_age_seconds is not None else settings.youtube_cache_min_age_seconds
+        # Coroutines of this process queue on an asyncio lock before polling the file lock
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        # Open pin file descriptors (None without fcntl) per served file
+        self._pins: Dict[str, List[Optional[int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(video_id: str, format_selector: str, format_type: str) -> str:
+        digest = hashlib.sha1(f"{video_id}|{format_selector}|{format_type}".encode()).hexdigest()
+        return digest[:20]
+
+    def path_for(self, key: str, extension: str) -> Path:
+        return self.directory / f"{CACHE_FILE_PREFIX}{key}.{extension}"
+
+    @staticmethod
+    def metadata_path(path: Path) -> Path:
+        """Metadata file of an output (not matched as a cache entry itself)"""
+        return path.with_name(f"{path.name}.json")
+
+    def _read_metadata(self, path: Path) -> Optional[Dict]:
+        try:
+            return json.loads(self.metadata_path(path).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_metadata(self, path: Path, metadata: Dict):
+        target = self.metadata_path(path)
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            temp.write_text(json.dumps(metadata))
+            os.replace(temp, target)
+        except OSError as e:
+            logger.warning(f"Could not write metadata for {path.name}: {e}")
+
+    def _entries(self) -> List[CacheEntry]:
+        """Finished files currently in the cache directory"""
+        entries = []
+        for path in self.directory.iterdir():
+            if not _CACHE_FILE_RE.match(path.name):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append(CacheEntry(path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _open_lock_file(self, name: str) -> Optional[int]:
+        if fcntl is None:
+            return None
+        return os.open(self.lock_dir / name, os.O_RDWR | os.O_CREAT, 0o644)
+
+    @asynccontextmanager
+    async def lock(self, key: str):
+        """Serialize work on one key across coroutines and worker processes, so a file is only downloaded once"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                fd = self._open_lock_file(f"{key}.lock")
+                try:
+                    delay = LOCK_POLL_MIN_SECONDS
+                    while fd is not None:
+                        try:
+                            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                            break
+                        except BlockingIOError:
+                            await asyncio.sleep(delay)
+                            delay = min(delay * 2, LOCK_POLL_MAX_SECONDS)
+                    yield
+                finally:
+                    # Closing the descriptor releases the lock
+                    if fd is not None:
+                        os.close(fd)
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    @staticmethod
+    def _touch(path: Path) -> Optional[CacheEntry]:
+        """Record an access in the file's mtime; None if the file is gone"""
+        if not path.is_file():
+            return None
+        try:
+            os.utime(path)
+            return CacheEntry(path, path.stat().st_size, time.time())
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, path: Path) -> Optional[CacheEntry]:
+        """Cached entry for an output path, counting the hit or miss"""
+        entry = self._touch(path)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        entry.metadata = self._read_metadata(path)
+        self.hits += 1
+        self.bytes_saved += entry.size
+        return entry
+
+    def add(self, path: Path, metadata: Optional[Dict] = None) -> CacheEntry:
+        """Register a finished download (with its display metadata) and evict old files if over budget"""
+        if metadata:
+            self._write_metadata(path, metadata)
+        entry = self._touch(path)
+        if entry is not None:
+            entry.metadata = metadata
+        self.evict()
+        return entry
+
+    def acquire(self, filename: str) -> bool:
+        """Pin a file while it is being served; False if it is not cached"""
+        fd = self._open_lock_file(f"{filename}.pin")
+        if fd is not None:
+            # Eviction holds the exclusive lock only while it unlinks the file
+            fcntl.flock(fd, fcntl.LOCK_SH)
+        if self._touch(self.directory / filename) is None:
+            if fd is not None:
+                os.close(fd)
+            return False
+        self._pins.setdefault(filename, []).append(fd)
+        return True
+
+    def release(self, filename: str):
+        pins = self._pins.get(filename)
+        if not pins:
+            return
+        fd = pins.pop()
+        if fd is not None:
+            os.close(fd)
+        if not pins:
+            del self._pins[filename]
+
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries())
+
+    def evict(self):
+        """Remove least-recently-used files that are not in use until under budget"""
+        entries = self._entries()
+        total = sum(entry.size for entry in entries)
+        if total <= self.max_bytes:
+            return
+
+        now = time.time()
+        for entry in sorted(entries, key=lambda entry: entry.last_access):
+            if total <= self.max_bytes:
+                break
+            name = entry.path.name
+            if self._pins.get(name) or now - entry.last_access < self.min_age_seconds:
+                continue
+            fd = self._open_lock_file(f"{name}.pin")
+            try:
+                if fd is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # Being served by another worker
+                        continue
+                entry.path.unlink(missing_ok=True)
+                self.metadata_path(entry.path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not evict {entry.path}: {e}")
+                continue
+            finally:
+                if fd is not None:
+                    os.close(fd)
+            total -= entry.size
+            self.evictions += 1
+            logger.info(f"Evicted cached download {name} ({entry.size / (1024 * 1024):.1f} MB)")
+
+    def stats(self) -> Dict:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "total_mb": round(sum(entry.size for entry in entries) / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024)),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions
+        }
+
+
+# Shared cache for YouTube downloads
+youtube_download_cache = DownloadCache(Path("/tmp/youtube_downloads"))
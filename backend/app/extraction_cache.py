@@ -0,0 +1,137 @@
+"""
+Extraction result cache.
+Stores the MediaFile list (with cookies and headers) per normalized page
+URL in an in-memory LRU and, when REDIS_URL is set and redis is installed,
+in a shared Redis tier so every worker benefits. Entry lifetimes follow the
+expiry hints in the captured media URLs, capped by a configurable maximum.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.models import MediaFile
+from app.url_utils import normalize_url, seconds_until_expiry
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """Two-tier (memory LRU + optional Redis) cache of extraction results"""
+
+    KEY_PREFIX = "extract:"
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        default_ttl: Optional[int] = None,
+        max_ttl: Optional[int] = None,
+        redis_url: Optional[str] = None
+    ):
+        self.max_entries = max_entries if max_entries is not None else settings.extraction_cache_max_entries
+        self.default_ttl = default_ttl if default_ttl is not None else settings.extraction_cache_default_ttl
+        self.max_ttl = max_ttl if max_ttl is not None else settings.extraction_cache_max_ttl
+        self._memory: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+
+        redis_url = redis_url if redis_url is not None else settings.redis_url
+        if redis_url:
+            if redis_asyncio is None:
+                logger.warning("REDIS_URL is set but redis is not installed - using memory cache only")
+            else:
+                self._redis = redis_asyncio.from_url(redis_url)
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha1(normalize_url(url).encode()).hexdigest()
+
+    def ttl_for(self, media_files: List[MediaFile]) -> float:
+        """
+        Cache lifetime for a result: the earliest expiry hint among its media
+        URLs (minus a safety margin), else the default, never above max_ttl
+        """
+        remaining = [
+            left for left in (seconds_until_expiry(m.url) for m in media_files) if left is not None
+        ]
+        ttl = min(remaining) - settings.extraction_cache_safety_margin if remaining else self.default_ttl
+        return min(ttl, self.max_ttl)
+
+    async def get(self, url: str) -> Optional[List[MediaFile]]:
+        """Cached media files for a page URL, or None"""
+        if not settings.enable_extraction_cache:
+            return None
+
+        key = self.key_for(url)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry and entry[0] > now:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return [MediaFile(**item) for item in entry[1]]
+        if entry:
+            del self._memory[key]
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self.KEY_PREFIX + key)
+            except Exception as e:
+                logger.debug(f"Shared cache read failed: {e}")
+                raw = None
+            if raw:
+                payload = json.loads(raw)
+                if payload["expires_at"] > now:
+                    self._remember(key, payload["expires_at"], payload["media"])
+                    self.hits += 1
+                    return [MediaFile(**item) for item in payload["media"]]
+
+        self.misses += 1
+        return None
+
+    async def set(self, url: str, media_files: List[MediaFile]):
+        """Cache an extraction result unless its media URLs are about to expire"""
+        if not settings.enable_extraction_cache or not media_files:
+            return
+
+        ttl = self.ttl_for(media_files)
+        if ttl <= 0:
+            logger.debug(f"Not caching {url}: media URLs expire too soon")
+            return
+
+        key = self.key_for(url)
+        expires_at = time.time() + ttl
+        media = [m.model_dump() for m in media_files]
+        self._remember(key, expires_at, media)
+
+        if self._redis is not None:
+            try:
+                payload = json.dumps({"expires_at": expires_at, "media": media})
+                await self._redis.set(self.KEY_PREFIX + key, payload, ex=max(1, int(ttl)))
+            except Exception as e:
+                logger.debug(f"Shared cache write failed: {e}")
+
+        logger.info(f"Cached extraction for {url[:80]} ({ttl:.0f}s)")
+
+    def _remember(self, key: str, expires_at: float, media: list):
+        self._memory[key] = (expires_at, media)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_tier": self._redis is not None
+        }
@@ -0,0 +1,151 @@
+"""
+Tiered media extraction.
+Runs a cheap static scan of the page HTML first and escalates to the
+browser extractor only when the scan finds nothing plausible. Which tier
+answered is recorded per domain so repeat domains skip tiers that never
+work for them; a skipped tier is still re-probed every so often, in case
+the site has changed.
+"""
+import inspect
+import logging
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from app.config import settings
+from app.models import MediaFile
+from app.media_classifier import SEGMENT_EXTENSIONS
+from app.extractor_simple import SimpleMediaExtractor
+
+logger = logging.getLogger(__name__)
+
+STATIC_TIER = "static"
+BROWSER_TIER = "browser"
+
+# Upper bound on remembered domains (oldest are forgotten first)
+MAX_TRACKED_DOMAINS = 10000
+
+
+class CascadeResult(NamedTuple):
+    """Outcome of a cascaded extraction"""
+    media_files: Optional[List[MediaFile]]
+    tier: Optional[str]
+    finish_phase: Optional[str] = None
+
+
+class DomainTierStats:
+    """Per-domain hit/miss counters for each extraction tier"""
+
+    def __init__(self, skip_after_misses: Optional[int] = None, reprobe_every: Optional[int] = None):
+        self.skip_after_misses = (
+            skip_after_misses if skip_after_misses is not None else settings.cascade_skip_after_misses
+        )
+        self.reprobe_every = reprobe_every if reprobe_every is not None else settings.cascade_reprobe_every
+        self._stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        host = (urlparse(url).hostname or "").lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def record(self, domain: str, tier: str, hit: bool):
+        tiers = self._stats.pop(domain, None) or {}
+        counters = tiers.setdefault(tier, {"hits": 0, "misses": 0, "skipped": 0})
+        counters["hits" if hit else "misses"] += 1
+
+        # Re-insert so the dict stays in least-recently-used order
+        self._stats[domain] = tiers
+        if len(self._stats) > MAX_TRACKED_DOMAINS:
+            self._stats.pop(next(iter(self._stats)))
+
+    def should_skip(self, domain: str, tier: str) -> bool:
+        """
+        A tier is skipped once it has missed repeatedly and never answered,
+        except for every `reprobe_every`-th request, which tries it again
+        """
+        if not self.skip_after_misses:
+            return False
+        counters = self._stats.get(domain, {}).get(tier)
+        if not counters or counters["hits"] or counters["misses"] < self.skip_after_misses:
+            return False
+        if self.reprobe_every and counters["skipped"] + 1 >= self.reprobe_every:
+            counters["skipped"] = 0
+            return False
+        counters["skipped"] += 1
+        return True
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        return {domain: {t: dict(c) for t, c in tiers.items()} for domain, tiers in self._stats.items()}
+
+
+class ExtractionCascade:
+    """Static HTML scan first, headless browser only on a miss"""
+
+    def __init__(self, browser_extractor_cls, stats: Optional[DomainTierStats] = None):
+        self.browser_extractor_cls = browser_extractor_cls
+        self.stats = stats or DomainTierStats()
+
+    def _tiers(self) -> List[str]:
+        tiers = []
+        if settings.enable_static_scan and self.browser_extractor_cls is not SimpleMediaExtractor:
+            tiers.append(STATIC_TIER)
+        tiers.append(BROWSER_TIER)
+        return tiers
+
+    async def extract(self, url: str) -> CascadeResult:
+        """
+        Extract media from a page, escalating through the tiers
+
+        Args:
+            url: Webpage URL to extract media from
+
+        Returns:
+            CascadeResult with the media files (or None) and the tier that answered
+        """
+        domain = self.stats.domain_of(url)
+        tiers = self._tiers()
+
+        for i, tier in enumerate(tiers):
+            is_last = i == len(tiers) - 1
+
+            # The last tier always runs - skipping it would just fail the request
+            if not is_last and self.stats.should_skip(domain, tier):
+                logger.info(f"Skipping {tier} tier for {domain} (never answered)")
+                continue
+
+            media_files, finish_phase = await self._run_tier(tier, url)
+            hit = self._is_plausible(media_files)
+            self.stats.record(domain, tier, hit)
+
+            if hit:
+                logger.info(f"Extraction for {domain} answered by {tier} tier")
+                return CascadeResult(media_files, tier, finish_phase)
+
+            logger.info(f"{tier} tier found nothing plausible for {domain}")
+            if is_last:
+                return CascadeResult(media_files or None, None, finish_phase)
+
+        return CascadeResult(None, None)
+
+    async def _run_tier(self, tier: str, url: str):
+        if tier == STATIC_TIER:
+            return await self._static_scan(url), None
+
+        extractor = self.browser_extractor_cls()
+        result = extractor.extract(url)
+        if inspect.isawaitable(result):
+            result = await result
+        if result is not None and not isinstance(result, list):
+            result = [result]
+        return result, getattr(extractor, 'finish_phase', None)
+
+    async def _static_scan(self, url: str) -> Optional[List[MediaFile]]:
+        try:
+            return await SimpleMediaExtractor().extract(url)
+        except Exception as e:
+            logger.info(f"Static scan failed for {url}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _is_plausible(media_files: Optional[List[MediaFile]]) -> bool:
+        """At least one complete video or manifest - a lone stream segment doesn't count"""
+        return bool(media_files) and any(m.extension not in SEGMENT_EXTENSIONS for m in media_files)
@@ -1,12 +1,15 @@
 import asyncio
-import re
 import logging
 import sys
 from typing import Optional, List, Dict
-from playwright.async_api import async_playwright, Page, Route, Request
-from urllib.parse import urlparse, urljoin
+from playwright.async_api import Page, Request
+from urllib.parse import urlparse
 from app.models import MediaFile, ExtractionStatus
 from app.config import settings
+from app.browser_pool import BrowserPool, browser_pool
+from app.resource_blocker import ResourceBlocker
+from app import media_classifier
+from app.media_classifier import MediaDeduper
 
 # Fix for Python 3.13 on Windows - must be set before any async operations
 if sys.platform == 'win32' and sys.version_info >= (3, 13):
@@ -24,37 +27,27 @@ class MediaExtractor:
     Replicates DevTools Inspect → Network → Media workflow.
     """
     
-    # Media file extensions to capture
-    MEDIA_EXTENSIONS = {'.mp4', '.webm', '.m3u8', '.ts', '.mov', '.avi', '.mkv', '.flv'}
-    
-    # Media MIME types to capture
-    MEDIA_MIME_TYPES = {
-        'video/mp4', 'video/webm', 'video/ogg', 'video/quicktime',
-        'application/vnd.apple.mpegurl', 'application/x-mpegurl',
-        'video/mp2t', 'application/octet-stream'
-    }
-    
-    # Patterns to exclude (ads, trackers, etc.)
-    EXCLUDE_PATTERNS = [
-        r'doubleclick\.net',
-        r'googlesyndication',
-        r'analytics',
-        r'tracking',
-        r'pixel',
-        r'beacon',
-        r'ad[sv]?\.', 
-        r'advertisement'
-    ]
-    
-    def __init__(self):
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        self.pool = pool or browser_pool
         self.captured_media: List[MediaFile] = []
+        self._seen = MediaDeduper()
         self.status = ExtractionStatus.PENDING
         self.cookies = []
         self.headers = {}
+        self.finish_phase: Optional[str] = None
+        self.blocked_stats: Optional[Dict] = None
+        self._media_ready = asyncio.Event()
+        self._last_activity = 0.0
+        self._deadline = 0.0
         
     async def extract(self, url: str) -> Optional[MediaFile]:
         """
-        Main extraction method - launches headless browser and captures media requests
+        Main extraction method - loads the page in a pooled headless browser and captures media requests
+        
+        Each interaction step (load, scroll, autoplay, clicks) waits only until a
+        qualifying media response has arrived and the network has gone quiet,
+        bounded by the step's old fixed delay and one overall deadline.
+        The step that completed the extraction is stored in `finish_phase`.
         
         Args:
             url: Webpage URL to extract media from
@@ -64,22 +57,30 @@ class MediaExtractor:
         """
         self.status = ExtractionStatus.LOADING
         self.captured_media = []
+        self._seen = MediaDeduper()
+        self.finish_phase = None
+        self.blocked_stats = None
+        
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        self._deadline = started_at + settings.extraction_deadline_seconds
+        self._media_ready = asyncio.Event()
+        self._last_activity = started_at
         
-        async with async_playwright() as p:
+        # Lease an isolated context on a warm pooled browser
+        async with self.pool.context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        ) as context:
             try:
-                # Launch headless browser
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox']
-                )
-                
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                )
-                
                 page = await context.new_page()
                 
+                # Abort images, fonts, ads and trackers before they are fetched
+                blocker = None
+                if settings.enable_resource_blocking:
+                    blocker = ResourceBlocker()
+                    await page.route('**/*', blocker.handle)
+                
                 # Set up network request interception
                 page.on('request', self._handle_request)
                 page.on('response', self._handle_response)
@@ -87,100 +88,12 @@ class MediaExtractor:
                 logger.info(f"Loading page: {url}")
                 self.status = ExtractionStatus.EXTRACTING
                 
-                # Navigate to page with longer timeout and less strict wait condition
-                try:
-                    await page.goto(url, wait_until='domcontentloaded', timeout=60000)
-                except Exception as e:
-                    logger.warning(f"Page load warning: {str(e)}, continuing anyway...")
-                    # Continue even if page doesn't fully load
-                
-                # Wait a bit more for lazy-loaded videos
-                await asyncio.sleep(3)
-                
-                # Try to trigger video load by scrolling
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                await asyncio.sleep(2)
-                
-                # Try to find and click video/play button to trigger media loading
-                try:
-                    logger.info("Attempting to auto-play video...")
-                    
-                    # Method 1: Try to play all video elements via JavaScript
-                    await page.evaluate('''
-                        () => {
-                            const videos = document.querySelectorAll('video');
-                            videos.forEach(video => {
-                                try {
-                                    video.muted = true; // Mute to avoid autoplay restrictions
-                                    video.play();
-                                    console.log('Video play triggered');
-                                } catch (e) {
-                                    console.log('Could not play video:', e);
-                                }
-                            });
-                        }
-                    ''')
-                    await asyncio.sleep(3)
-                    
-                    # Method 2: Click on video elements
-                    video_elements = await page.query_selector_all('video')
-                    if video_elements:
-                        logger.info(f"Found {len(video_elements)} video element(s)")
-                        for video in video_elements:
-                            try:
-                                await video.click(timeout=2000)
-                                logger.info("Clicked video element")
-                                await asyncio.sleep(2)
-                            except:
-                                pass
-                    
-                    # Method 3: Try common play button selectors
-                    play_button_selectors = [
-                        'button[aria-label*="play" i]',
-                        'button[aria-label*="Play" i]',
-                        '[aria-label*="play" i]',
-                        'button.play',
-                        'button.play-button',
-                        '.play-button',
-                        '.play-btn',
-                        '[class*="play-button"]',
-                        '[class*="playButton"]',
-                        '[class*="PlayButton"]',
-                        'button[title*="play" i]',
-                        '.video-play-button',
-                        '[data-testid*="play"]',
-                        'button svg[class*="play"]',
-                        'div[role="button"][aria-label*="play" i]',
-                    ]
-                    
-                    for selector in play_button_selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                for element in elements[:3]:  # Try first 3 matches
-                                    try:
-                                        await element.click(timeout=2000)
-                                        logger.info(f"Clicked play button: {selector}")
-                                        await asyncio.sleep(3)
-                                        break
-                                    except:
-                                        continue
-                        except:
-                            continue
-                    
-                    # Method 4: Try clicking anywhere on the page (some players start on any click)
-                    try:
-                        await page.mouse.click(500, 300)
-                        logger.info("Clicked center of page")
-                        await asyncio.sleep(2)
-                    except:
-                        pass
-                    
-                    logger.info("Auto-play attempts completed")
-                    
-                except Exception as e:
-                    logger.debug(f"Auto-play error: {str(e)}")
-                    # Continue anyway, some videos might already be loading
+                self.finish_phase = await self._run_phases(page, url)
+                elapsed = loop.time() - started_at
+                logger.info(f"Extraction finished in phase '{self.finish_phase}' after {elapsed:.1f}s")
+                if blocker:
+                    self.blocked_stats = blocker.stats()
+                    blocker.log_summary(url)
                 
                 # Capture cookies and headers for authenticated downloads
                 self.cookies = await context.cookies()
@@ -192,8 +105,6 @@ class MediaExtractor:
                     'Origin': urlparse(url).scheme + '://' + urlparse(url).netloc,
                 }
                 
-                await browser.close()
-                
                 # Return ALL valid media files found
                 if self.captured_media:
                     logger.info(f"Found {len(self.captured_media)} media files")
@@ -226,6 +137,176 @@ class MediaExtractor:
                 self.status = ExtractionStatus.FAILED
                 raise
     
+    async def _run_phases(self, page: Page, url: str) -> str:
+        """
+        Drive the page through load, scroll and auto-play steps.
+        
+        Returns:
+            Name of the phase in which extraction completed, "deadline" if the
+            overall deadline ran out first, or "exhausted" if every step ran
+            without a qualifying media response settling.
+        """
+        # Navigate to page with less strict wait condition, never past the deadline
+        try:
+            await page.goto(url, wait_until='domcontentloaded', timeout=self._remaining_ms(60000))
+        except Exception as e:
+            logger.warning(f"Page load warning: {str(e)}, continuing anyway...")
+            # Continue even if page doesn't fully load
+        
+        # Give lazy-loaded videos a chance to start
+        if await self._settle(3):
+            return "load"
+        if self._deadline_passed():
+            return "deadline"
+        
+        # Try to trigger video load by scrolling
+        try:
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+        except Exception as e:
+            logger.debug(f"Scroll error: {str(e)}")
+        if await self._settle(2):
+            return "scroll"
+        if self._deadline_passed():
+            return "deadline"
+        
+        # Try to find and click video/play button to trigger media loading
+        try:
+            logger.info("Attempting to auto-play video...")
+            
+            # Method 1: Try to play all video elements via JavaScript
+            await page.evaluate('''
+                () => {
+                    const videos = document.querySelectorAll('video');
+                    videos.forEach(video => {
+                        try {
+                            video.muted = true; // Mute to avoid autoplay restrictions
+                            video.play();
+                            console.log('Video play triggered');
+                        } catch (e) {
+                            console.log('Could not play video:', e);
+                        }
+                    });
+                }
+            ''')
+            if await self._settle(3):
+                return "autoplay"
+            
+            # Method 2: Click on video elements
+            video_elements = await page.query_selector_all('video')
+            if video_elements:
+                logger.info(f"Found {len(video_elements)} video element(s)")
+                for video in video_elements:
+                    if self._deadline_passed():
+                        return "deadline"
+                    try:
+                        await video.click(timeout=self._remaining_ms(2000))
+                        logger.info("Clicked video element")
+                        if await self._settle(2):
+                            return "video_click"
+                    except:
+                        pass
+            
+            # Method 3: Try common play button selectors
+            play_button_selectors = [
+                'button[aria-label*="play" i]',
+                'button[aria-label*="Play" i]',
+                '[aria-label*="play" i]',
+                'button.play',
+                'button.play-button',
+                '.play-button',
+                '.play-btn',
+                '[class*="play-button"]',
+                '[class*="playButton"]',
+                '[class*="PlayButton"]',
+                'button[title*="play" i]',
+                '.video-play-button',
+                '[data-testid*="play"]',
+                'button svg[class*="play"]',
+                'div[role="button"][aria-label*="play" i]',
+            ]
+            
+            for selector in play_button_selectors:
+                if self._deadline_passed():
+                    return "deadline"
+                try:
+                    elements = await page.query_selector_all(selector)
+                    if elements:
+                        for element in elements[:3]:  # Try first 3 matches
+                            try:
+                                await element.click(timeout=self._remaining_ms(2000))
+                                logger.info(f"Clicked play button: {selector}")
+                                if await self._settle(3):
+                                    return "play_button"
+                                break
+                            except:
+                                continue
+                except:
+                    continue
+            
+            # Method 4: Try clicking anywhere on the page (some players start on any click)
+            if self._deadline_passed():
+                return "deadline"
+            try:
+                await page.mouse.click(500, 300)
+                logger.info("Clicked center of page")
+                if await self._settle(2):
+                    return "page_click"
+            except:
+                pass
+            
+            logger.info("Auto-play attempts completed")
+            
+        except Exception as e:
+            logger.debug(f"Auto-play error: {str(e)}")
+            # Continue anyway, some videos might already be loading
+        
+        return "deadline" if self._deadline_passed() else "exhausted"
+    
+    async def _settle(self, max_wait: float) -> bool:
+        """
+        Wait up to max_wait seconds (never past the deadline) for completion.
+        
+        Returns:
+            True once a qualifying media response has been captured and the
+            network has been quiet for the configured window
+        """
+        loop = asyncio.get_running_loop()
+        quiet_window = settings.extraction_quiet_window_ms / 1000
+        until = min(loop.time() + max_wait, self._deadline)
+        
+        while True:
+            now = loop.time()
+            quiet_for = now - self._last_activity
+            if self._media_ready.is_set() and quiet_for >= quiet_window:
+                return True
+            if now >= until:
+                return False
+            
+            if not self._media_ready.is_set():
+                try:
+                    await asyncio.wait_for(self._media_ready.wait(), until - now)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(max(0.05, min(quiet_window - quiet_for, until - now)))
+    
+    def _deadline_passed(self) -> bool:
+        return asyncio.get_running_loop().time() >= self._deadline
+    
+    def _remaining_ms(self, cap_ms: int) -> int:
+        """Playwright timeout that never runs past the extraction deadline"""
+        remaining = (self._deadline - asyncio.get_running_loop().time()) * 1000
+        return max(1, int(min(cap_ms, remaining)))
+    
+    def _mark_activity(self):
+        self._last_activity = asyncio.get_running_loop().time()
+    
+    def _is_qualifying_media(self, media_file: MediaFile) -> bool:
+        """A manifest or a video large enough to be the real thing (not a preview)"""
+        if media_file.extension == '.m3u8' or 'mpegurl' in media_file.type:
+            return True
+        return (media_file.size or 0) >= settings.extraction_min_video_kb * 1024
+    
     def _handle_request(self, request: Request):
         """Handle outgoing network requests"""
         url = request.url
@@ -233,6 +314,9 @@ class MediaExtractor:
         # Check if this is a media request
         if self._is_media_url(url):
             logger.debug(f"Media request detected: {url}")
+        else:
+            # Media range/segment fetches of a playing video don't keep the page "busy"
+            self._mark_activity()
     
     async def _handle_response(self, response):
         """Handle incoming network responses - this is where we capture media URLs"""
@@ -240,72 +324,43 @@ class MediaExtractor:
             url = response.url
             content_type = response.headers.get('content-type', '').lower()
             
-            # Skip if already captured
-            if any(m.url == url for m in self.captured_media):
+            # Images, ads, trackers and non-media all fall out here
+            extension = media_classifier.classify(url, content_type)
+            if extension is None:
                 return
             
-            # Skip images explicitly
-            if any(img_type in content_type for img_type in ['image/', 'jpeg', 'jpg', 'png', 'gif', 'webp', 'svg']):
+            # Skip if already captured (segments of one stream count once)
+            if not self._seen.add(url):
                 return
             
-            # Skip if URL looks like an image
-            if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico']):
-                return
+            # Get content length to prioritize larger files (actual videos)
+            content_length = response.headers.get('content-length')
+            size = int(content_length) if content_length else 0
             
-            # Check if this is a media file
-            if self._is_media_url(url) or self._is_media_content_type(content_type):
-                # Exclude ads and trackers
-                if self._should_exclude(url):
-                    logger.debug(f"Excluding URL: {url}")
-                    return
-                
-                # Extract file extension
-                parsed = urlparse(url)
-                path = parsed.path.lower()
-                extension = None
-                
-                for ext in self.MEDIA_EXTENSIONS:
-                    if ext in path:
-                        extension = ext
-                        break
-                
-                if not extension:
-                    # Guess from content type
-                    if 'mp4' in content_type:
-                        extension = '.mp4'
-                    elif 'webm' in content_type:
-                        extension = '.webm'
-                    elif 'm3u8' in content_type or 'mpegurl' in content_type:
-                        extension = '.m3u8'
-                    else:
-                        extension = '.mp4'  # default
-                
-                # Get content length to prioritize larger files (actual videos)
-                content_length = response.headers.get('content-length')
-                size = int(content_length) if content_length else 0
-                
-                media_file = MediaFile(
-                    url=url,
-                    type=content_type,
-                    extension=extension,
-                    size=size
-                )
-                
-                self.captured_media.append(media_file)
-                logger.info(f"Captured media: {url[:100]}... ({content_type}, size: {size} bytes)")
+            media_file = MediaFile(
+                url=url,
+                type=content_type,
+                extension=extension,
+                size=size
+            )
+            
+            self.captured_media.append(media_file)
+            self._mark_activity()
+            if self._is_qualifying_media(media_file):
+                self._media_ready.set()
+            logger.info(f"Captured media: {url[:100]}... ({content_type}, size: {size} bytes)")
                 
         except Exception as e:
             logger.error(f"Error handling response: {str(e)}")
     
     def _is_media_url(self, url: str) -> bool:
         """Check if URL points to a media file based on extension"""
-        url_lower = url.lower()
-        return any(ext in url_lower for ext in self.MEDIA_EXTENSIONS)
+        return media_classifier.is_media_url(url)
     
     def _is_media_content_type(self, content_type: str) -> bool:
         """Check if content type is a media type"""
-        return any(mime in content_type for mime in self.MEDIA_MIME_TYPES)
+        return media_classifier.is_media_content_type(content_type)
     
     def _should_exclude(self, url: str) -> bool:
         """Check if URL should be excluded (ads, trackers, etc.)"""
-        return any(re.search(pattern, url, re.IGNORECASE) for pattern in self.EXCLUDE_PATTERNS)
+        return media_classifier.should_exclude(url)
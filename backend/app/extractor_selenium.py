@@ -1,111 +1,228 @@
 """
 Alternative extractor using Selenium WebDriver instead of Playwright.
 This works around Python 3.13 + Windows + Playwright subprocess issues.
+
+Selenium is blocking, so extractions run on a dedicated bounded thread pool
+with a pool of warm Edge sessions that are reset between uses.
 """
+import asyncio
+import json
 import logging
+import os
+import queue
+import threading
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, List
 from selenium import webdriver
 from selenium.webdriver.edge.service import Service
 from selenium.webdriver.edge.options import Options
-import os
-import glob
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
-from urllib.parse import urlparse
 
 from app.models import MediaFile, ExtractionStatus
 from app.config import settings
+from app import media_classifier
+from app.media_classifier import MediaDeduper
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def find_edge_driver() -> Optional[str]:
+    """Locate msedgedriver.exe once; None means rely on the system PATH"""
+    possible_paths = [
+        r"C:\Program Files (x86)\Microsoft\Edge\Application\msedgedriver.exe",
+        r"C:\Program Files\Microsoft\Edge\Application\msedgedriver.exe",
+        os.path.join(os.environ.get('PROGRAMFILES', 'C:\\Program Files'), 'Microsoft', 'Edge', 'Application', 'msedgedriver.exe'),
+        os.path.join(os.environ.get('PROGRAMFILES(X86)', 'C:\\Program Files (x86)'), 'Microsoft', 'Edge', 'Application', 'msedgedriver.exe'),
+    ]
+    
+    for path in possible_paths:
+        if os.path.exists(path):
+            logger.info(f"Found EdgeDriver at: {path}")
+            return path
+    
+    logger.info("EdgeDriver not found in common locations, using system PATH")
+    return None
+
+
+class WebDriverPool:
+    """
+    Thread-safe pool of warm headless Edge sessions.
+    Sessions are reset (cookies, cache, pending logs) when returned and
+    replaced after `recycle_pages` uses or on any error.
+    """
+    
+    def __init__(self, size: Optional[int] = None, recycle_pages: Optional[int] = None):
+        self.size = max(1, size if size is not None else settings.selenium_pool_size)
+        self.recycle_pages = recycle_pages if recycle_pages is not None else settings.selenium_recycle_pages
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._uses = {}
+        self._alive = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _options() -> Options:
+        edge_options = Options()
+        edge_options.add_argument('--headless')
+        edge_options.add_argument('--no-sandbox')
+        edge_options.add_argument('--disable-dev-shm-usage')
+        edge_options.add_argument('--disable-gpu')
+        edge_options.add_argument('--window-size=1920,1080')
+        edge_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        
+        # Enable performance logging to capture network requests
+        edge_options.set_capability('ms:loggingPrefs', {'performance': 'ALL'})
+        return edge_options
+    
+    def _create(self):
+        driver_path = find_edge_driver()
+        if driver_path:
+            driver = webdriver.Edge(service=Service(driver_path), options=self._options())
+        else:
+            driver = webdriver.Edge(options=self._options())
+        driver.set_page_load_timeout(settings.playwright_timeout / 1000)
+        self._uses[id(driver)] = 0
+        return driver
+    
+    def warm_up(self, count: int):
+        """Create up to `count` idle sessions ahead of the first request"""
+        for _ in range(min(count, self.size)):
+            with self._lock:
+                if self._alive >= self.size:
+                    return
+                self._alive += 1
+            try:
+                self._idle.put(self._create())
+            except Exception:
+                with self._lock:
+                    self._alive -= 1
+                raise
+    
+    def acquire(self):
+        """Take an idle session, start a new one if below size, else wait"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_create = self._alive < self.size
+            if can_create:
+                self._alive += 1
+        
+        if not can_create:
+            return self._idle.get()
+        
+        try:
+            return self._create()
+        except Exception:
+            with self._lock:
+                self._alive -= 1
+            raise
+    
+    def release(self, driver, healthy: bool = True):
+        """Reset a session and return it, or discard it if broken or worn out"""
+        uses = self._uses.get(id(driver), 0) + 1
+        self._uses[id(driver)] = uses
+        
+        if healthy and (not self.recycle_pages or uses < self.recycle_pages):
+            try:
+                driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+                driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+                driver.get('about:blank')
+                driver.get_log('performance')  # drop entries left from the last page
+                self._idle.put(driver)
+                return
+            except Exception as e:
+                logger.debug(f"WebDriver reset failed, discarding session: {e}")
+        
+        self._discard(driver)
+    
+    def _discard(self, driver):
+        self._uses.pop(id(driver), None)
+        with self._lock:
+            self._alive -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    def close(self):
+        """Quit every idle session"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(driver)
+
+
+driver_pool = WebDriverPool()
+
+# One thread per pooled session - extra jobs wait here instead of on the event loop
+selenium_executor = ThreadPoolExecutor(
+    max_workers=driver_pool.size,
+    thread_name_prefix="selenium"
+)
+
+
+async def start_driver_pool():
+    """Resolve the driver path and warm up sessions at app startup"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(selenium_executor, find_edge_driver)
+    await loop.run_in_executor(selenium_executor, driver_pool.warm_up, settings.selenium_pool_warmup)
+
+
+async def stop_driver_pool():
+    """Quit pooled sessions at app shutdown"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(selenium_executor, driver_pool.close)
+
+
 class SeleniumMediaExtractor:
     """
     Extracts media URLs using Selenium WebDriver with Chrome DevTools Protocol.
     Works on Python 3.13 + Windows without subprocess issues.
     """
     
-    MEDIA_EXTENSIONS = {'.mp4', '.webm', '.m3u8', '.ts', '.mov', '.avi', '.mkv', '.flv'}
-    
-    MEDIA_MIME_TYPES = {
-        'video/mp4', 'video/webm', 'video/ogg', 'video/quicktime',
-        'application/vnd.apple.mpegurl', 'application/x-mpegurl',
-        'video/mp2t', 'application/octet-stream'
-    }
-    
-    EXCLUDE_PATTERNS = [
-        r'doubleclick\.net',
-        r'googlesyndication',
-        r'analytics',
-        r'tracking',
-        r'pixel',
-        r'beacon',
-        r'ad[sv]?\.', 
-        r'advertisement'
-    ]
-    
-    def __init__(self):
+    def __init__(self, pool: Optional[WebDriverPool] = None):
+        self.pool = pool or driver_pool
         self.captured_media: List[MediaFile] = []
+        self._seen = MediaDeduper()
         self.status = ExtractionStatus.PENDING
         self.network_logs = []
-        
-    def extract(self, url: str) -> Optional[MediaFile]:
+    
+    async def extract(self, url: str) -> Optional[List[MediaFile]]:
         """
         Extract media URLs using Selenium + Chrome DevTools
         
+        Runs on the dedicated Selenium thread pool so the event loop keeps
+        serving other requests.
+        
         Args:
             url: Webpage URL to extract media from
             
         Returns:
-            MediaFile object with extracted media URL, or None if not found
+            List of MediaFile objects, or None if not found
         """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(selenium_executor, self._extract_blocking, url)
+    
+    def _extract_blocking(self, url: str) -> Optional[List[MediaFile]]:
+        """Blocking extraction on a pooled WebDriver session"""
         self.status = ExtractionStatus.LOADING
         self.captured_media = []
-        
-        # Setup Edge options
-        edge_options = Options()
-        edge_options.add_argument('--headless')
-        edge_options.add_argument('--no-sandbox')
-        edge_options.add_argument('--disable-dev-shm-usage')
-        edge_options.add_argument('--disable-gpu')
-        edge_options.add_argument('--window-size=1920,1080')
-        edge_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-        
-        # Enable performance logging to capture network requests
-        edge_options.set_capability('ms:loggingPrefs', {'performance': 'ALL'})
+        self._seen = MediaDeduper()
         
         driver = None
+        healthy = True
         try:
             logger.info(f"Loading page: {url}")
             self.status = ExtractionStatus.EXTRACTING
             
-            # Try to find msedgedriver.exe in common locations
-            driver_path = None
-            possible_paths = [
-                r"C:\Program Files (x86)\Microsoft\Edge\Application\msedgedriver.exe",
-                r"C:\Program Files\Microsoft\Edge\Application\msedgedriver.exe",
-                os.path.join(os.environ.get('PROGRAMFILES', 'C:\\Program Files'), 'Microsoft', 'Edge', 'Application', 'msedgedriver.exe'),
-                os.path.join(os.environ.get('PROGRAMFILES(X86)', 'C:\\Program Files (x86)'), 'Microsoft', 'Edge', 'Application', 'msedgedriver.exe'),
-            ]
-            
-            for path in possible_paths:
-                if os.path.exists(path):
-                    driver_path = path
-                    logger.info(f"Found EdgeDriver at: {path}")
-                    break
-            
-            # Create Edge driver
-            if driver_path:
-                service = Service(driver_path)
-                driver = webdriver.Edge(service=service, options=edge_options)
-            else:
-                # Try without specifying driver path (assumes it's in PATH)
-                logger.info("EdgeDriver not found in common locations, trying system PATH")
-                driver = webdriver.Edge(options=edge_options)
-            driver.set_page_load_timeout(settings.playwright_timeout / 1000)
+            driver = self.pool.acquire()
             
             # Navigate to page
             driver.get(url)
@@ -125,7 +242,6 @@ class SeleniumMediaExtractor:
                 try:
                     log = entry['message']
                     if 'Network.responseReceived' in log or 'Network.requestWillBeSent' in log:
-                        import json
                         log_data = json.loads(log)
                         
                         if 'message' in log_data:
@@ -148,17 +264,13 @@ class SeleniumMediaExtractor:
                             
                             if request_url and self._is_media_url(request_url, content_type):
                                 if not self._should_exclude(request_url):
-                                    # Extract extension
-                                    extension = self._get_extension(request_url, content_type)
-                                    
-                                    media_file = MediaFile(
-                                        url=request_url,
-                                        type=content_type or 'unknown',
-                                        extension=extension
-                                    )
-                                    
-                                    # Avoid duplicates
-                                    if not any(m.url == request_url for m in self.captured_media):
+                                    # Avoid duplicates (segments of one stream count once)
+                                    if self._seen.add(request_url):
+                                        media_file = MediaFile(
+                                            url=request_url,
+                                            type=content_type or 'unknown',
+                                            extension=self._get_extension(request_url, content_type)
+                                        )
                                         self.captured_media.append(media_file)
                                         logger.info(f"Captured media: {request_url[:100]}...")
                 except Exception as e:
@@ -167,7 +279,7 @@ class SeleniumMediaExtractor:
             
             if self.captured_media:
                 logger.info(f"Found {len(self.captured_media)} media files")
-                return self.captured_media[0]
+                return self.captured_media
             else:
                 logger.warning("No media files found")
                 return None
@@ -175,51 +287,27 @@ class SeleniumMediaExtractor:
         except TimeoutException:
             logger.error("Page load timeout")
             self.status = ExtractionStatus.FAILED
+            healthy = False
             return None
         except Exception as e:
             logger.error(f"Extraction failed: {str(e)}")
             self.status = ExtractionStatus.FAILED
+            healthy = False
             raise
         finally:
             if driver:
-                driver.quit()
+                self.pool.release(driver, healthy)
     
     def _is_media_url(self, url: str, content_type: str = None) -> bool:
         """Check if URL or content type indicates media"""
-        url_lower = url.lower()
-        
-        # Check URL extension
-        if any(ext in url_lower for ext in self.MEDIA_EXTENSIONS):
+        if media_classifier.is_media_url(url):
             return True
-        
-        # Check content type
-        if content_type:
-            content_type_lower = content_type.lower()
-            if any(mime in content_type_lower for mime in self.MEDIA_MIME_TYPES):
-                return True
-        
-        return False
+        return bool(content_type) and media_classifier.is_media_content_type(content_type)
     
     def _should_exclude(self, url: str) -> bool:
         """Check if URL should be excluded (ads, trackers, etc.)"""
-        return any(re.search(pattern, url, re.IGNORECASE) for pattern in self.EXCLUDE_PATTERNS)
+        return media_classifier.should_exclude(url)
     
     def _get_extension(self, url: str, content_type: str = None) -> str:
         """Extract file extension from URL or content type"""
-        url_lower = url.lower()
-        
-        for ext in self.MEDIA_EXTENSIONS:
-            if ext in url_lower:
-                return ext
-        
-        # Guess from content type
-        if content_type:
-            content_type_lower = content_type.lower()
-            if 'mp4' in content_type_lower:
-                return '.mp4'
-            elif 'webm' in content_type_lower:
-                return '.webm'
-            elif 'm3u8' in content_type_lower or 'mpegurl' in content_type_lower:
-                return '.m3u8'
-        
-        return '.mp4'  # default
+        return media_classifier.extension_for(url, content_type or '')
@@ -1,109 +1,133 @@
 """
 Simple extractor that works without browser automation.
-Uses HTTP requests to fetch page and extract video URLs from HTML/JavaScript.
+Streams the page over a shared pooled HTTP client and extracts video URLs
+from HTML/JavaScript in a single incremental pass.
 """
+import codecs
+import html
 import logging
 import re
-import requests
 from typing import Optional, List
-from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+
+import httpx
 
 from app.models import MediaFile, ExtractionStatus
 from app.config import settings
+from app import media_classifier
+from app.media_classifier import MediaDeduper
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# <video>/<source> src attributes and absolute media URLs (also JSON-escaped) in one pattern
+MEDIA_SCAN_RE = re.compile(
+    r'<(?:video|source)\b[^>]*?\s(?:data-)?src\s*=\s*["\']?(?P<src>[^"\'\s>]+)'
+    r'|(?P<url>https?:(?:\\?/){2}[^\s<>"\']+?\.(?:mp4|webm|m3u8|ts|mov)(?![a-z0-9])[^\s<>"\'\\,;}\])]*)',
+    re.IGNORECASE
+)
+
+# Text kept between chunks so matches spanning a chunk boundary are not lost
+SCAN_CARRY_CHARS = 4096
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for static page fetches"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(
+                max_connections=settings.static_scan_max_connections,
+                max_keepalive_connections=settings.static_scan_max_connections
+            ),
+            headers={'User-Agent': USER_AGENT}
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client (called on app shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class SimpleMediaExtractor:
     """
     Extracts media URLs from HTML and JavaScript without browser automation.
     Works offline and doesn't require Selenium/Playwright.
     """
-    
-    MEDIA_EXTENSIONS = {'.mp4', '.webm', '.m3u8', '.ts', '.mov', '.avi', '.mkv', '.flv'}
-    
-    EXCLUDE_PATTERNS = [
-        r'doubleclick\.net',
-        r'googlesyndication',
-        r'analytics',
-        r'tracking',
-        r'pixel',
-        r'beacon',
-        r'ad[sv]?\.', 
-        r'advertisement'
-    ]
-    
-    def __init__(self):
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client
         self.captured_media: List[MediaFile] = []
+        self._seen = MediaDeduper()
         self.status = ExtractionStatus.PENDING
-        
-    def extract(self, url: str) -> Optional[MediaFile]:
+
+    async def extract(self, url: str) -> Optional[List[MediaFile]]:
         """
         Extract media URLs from page HTML and JavaScript
-        
+
+        The body is streamed and scanned chunk by chunk; reading stops once
+        `static_scan_max_kb` has been read.
+
         Args:
             url: Webpage URL to extract media from
-            
+
         Returns:
-            MediaFile object with extracted media URL, or None if not found
+            List of MediaFile objects in page order, or None if not found
         """
         self.status = ExtractionStatus.LOADING
         self.captured_media = []
-        
+        self._seen = MediaDeduper()
+
+        client = self.client or get_http_client()
+        max_bytes = settings.static_scan_max_kb * 1024
+
         try:
             logger.info(f"Fetching page: {url}")
             self.status = ExtractionStatus.EXTRACTING
-            
-            # Fetch the page
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            html_content = response.text
-            
-            # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Method 1: Find video/source tags
-            video_tags = soup.find_all(['video', 'source'])
-            for tag in video_tags:
-                src = tag.get('src') or tag.get('data-src')
-                if src:
-                    full_url = urljoin(url, src)
-                    if self._is_media_url(full_url) and not self._should_exclude(full_url):
-                        self._add_media(full_url)
-            
-            # Method 2: Find URLs in JavaScript/JSON
-            scripts = soup.find_all('script')
-            for script in scripts:
-                if script.string:
-                    # Look for URLs in JavaScript
-                    urls = re.findall(r'https?://[^\s<>"\']+\.(?:mp4|webm|m3u8|ts|mov)', script.string, re.IGNORECASE)
-                    for found_url in urls:
-                        # Clean up URL (remove trailing characters)
-                        found_url = re.sub(r'["\',;}\]]+$', '', found_url)
-                        if not self._should_exclude(found_url):
-                            self._add_media(found_url)
-            
-            # Method 3: Search entire HTML for video URLs
-            all_urls = re.findall(r'https?://[^\s<>"\']+\.(?:mp4|webm|m3u8|ts|mov)', html_content, re.IGNORECASE)
-            for found_url in all_urls:
-                found_url = re.sub(r'["\',;}\]]+$', '', found_url)
-                if not self._should_exclude(found_url):
-                    self._add_media(found_url)
-            
+
+            async with client.stream('GET', url) as response:
+                response.raise_for_status()
+
+                try:
+                    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+                except LookupError:
+                    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+                pending = ''
+                bytes_read = 0
+                async for chunk in response.aiter_bytes():
+                    bytes_read += len(chunk)
+                    pending = self._scan(pending + decoder.decode(chunk), url, final=False)
+                    if bytes_read >= max_bytes:
+                        logger.info(f"Stopped reading {url} after {bytes_read // 1024} KB (scan cap)")
+                        break
+
+                self._scan(pending + decoder.decode(b'', final=True), url, final=True)
+
             if self.captured_media:
                 logger.info(f"Found {len(self.captured_media)} media files")
-                return self.captured_media[0]
+
+                # Replay the page's request context on download
+                headers = {'User-Agent': USER_AGENT, 'Referer': url}
+                for media_file in self.captured_media:
+                    media_file.headers = headers
+                    media_file.cookies = []
+
+                return self.captured_media
             else:
                 logger.warning("No media files found")
                 return None
-                
-        except requests.RequestException as e:
+
+        except httpx.HTTPError as e:
             logger.error(f"Request failed: {str(e)}")
             self.status = ExtractionStatus.FAILED
             raise
@@ -111,10 +135,38 @@ class SimpleMediaExtractor:
             logger.error(f"Extraction failed: {str(e)}")
             self.status = ExtractionStatus.FAILED
             raise
-    
+
+    def _scan(self, text: str, page_url: str, final: bool) -> str:
+        """
+        Capture media from decoded text.
+
+        Returns:
+            The unscanned tail to prepend to the next chunk (empty when final)
+        """
+        limit = len(text) if final else max(0, len(text) - SCAN_CARRY_CHARS)
+        keep_from = limit
+
+        for match in MEDIA_SCAN_RE.finditer(text):
+            if not final and match.end() > limit:
+                # Might continue in the next chunk - rescan it with more data
+                keep_from = min(keep_from, match.start())
+                break
+
+            src = match.group('src')
+            if src:
+                full_url = urljoin(page_url, html.unescape(src))
+                if self._is_media_url(full_url) and not self._should_exclude(full_url):
+                    self._add_media(full_url)
+            else:
+                found_url = match.group('url').replace('\\/', '/')
+                if not self._should_exclude(found_url):
+                    self._add_media(found_url)
+
+        return '' if final else text[keep_from:]
+
     def _add_media(self, url: str):
         """Add media URL to captured list (avoid duplicates)"""
-        if not any(m.url == url for m in self.captured_media):
+        if self._seen.add(url):
             extension = self._get_extension(url)
             media_file = MediaFile(
                 url=url,
@@ -123,22 +175,15 @@ class SimpleMediaExtractor:
             )
             self.captured_media.append(media_file)
             logger.info(f"Captured media: {url[:100]}...")
-    
+
     def _is_media_url(self, url: str) -> bool:
         """Check if URL points to a media file"""
-        url_lower = url.lower()
-        return any(ext in url_lower for ext in self.MEDIA_EXTENSIONS)
-    
+        return media_classifier.is_media_url(url)
+
     def _should_exclude(self, url: str) -> bool:
         """Check if URL should be excluded (ads, trackers, etc.)"""
-        return any(re.search(pattern, url, re.IGNORECASE) for pattern in self.EXCLUDE_PATTERNS)
-    
+        return media_classifier.should_exclude(url)
+
     def _get_extension(self, url: str) -> str:
         """Extract file extension from URL"""
-        url_lower = url.lower()
-        
-        for ext in self.MEDIA_EXTENSIONS:
-            if ext in url_lower:
-                return ext
-        
-        return '.mp4'  # default
+        return media_classifier.extension_for(url)
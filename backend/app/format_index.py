@@ -0,0 +1,186 @@
+"""
+Normalized format ladder per YouTube video.
+Built in a single pass over yt-dlp's `formats` list: best combined,
+video-only and audio-only formats, plus a ladder grouped by height with one
+entry per (codec, container) and size estimates. The index keeps the info
+dict it was built from, so a later download can resolve the requested
+quality against it instead of running another extraction. Entries live
+until the signed stream URLs expire.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.url_utils import url_expiry
+
+logger = logging.getLogger(__name__)
+
+# Stop reusing an index this long before its stream URLs expire
+EXPIRY_MARGIN_SECONDS = 300
+
+
+def _codec(value: Optional[str]) -> Optional[str]:
+    """Codec family ("avc1.64001F" -> "avc1"), None for absent streams"""
+    if not value or value == "none":
+        return None
+    return value.split(".")[0]
+
+
+def _estimated_size(fmt: Dict, duration: Optional[float]) -> Optional[int]:
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return int(size)
+    if fmt.get("tbr") and duration:
+        # tbr is in kbit/s
+        return int(fmt["tbr"] * 1000 / 8 * duration)
+    return None
+
+
+def normalize_format(fmt: Dict, duration: Optional[float]) -> Dict:
+    vcodec = _codec(fmt.get("vcodec"))
+    acodec = _codec(fmt.get("acodec"))
+    if vcodec and acodec:
+        kind = "combined"
+    elif vcodec:
+        kind = "video"
+    else:
+        kind = "audio"
+    return {
+        "format_id": fmt.get("format_id"),
+        "kind": kind,
+        "container": fmt.get("ext"),
+        "height": fmt.get("height"),
+        "width": fmt.get("width"),
+        "fps": fmt.get("fps"),
+        "vcodec": vcodec,
+        "acodec": acodec,
+        "bitrate_kbps": round(fmt.get("tbr") or fmt.get("abr") or fmt.get("vbr") or 0) or None,
+        "abr_kbps": round(fmt["abr"]) if fmt.get("abr") else None,
+        "size_bytes": _estimated_size(fmt, duration),
+        "url": fmt.get("url")
+    }
+
+
+class FormatIndex:
+    """Formats of one video, grouped for quality selection"""
+
+    def __init__(self, video_id: str, info: Dict):
+        self.video_id = video_id
+        self.info = info
+        self.best_combined: Optional[Dict] = None
+        self.best_video: Optional[Dict] = None
+        self.best_audio: Optional[Dict] = None
+        self.audio: List[Dict] = []
+        self._rungs: Dict[int, Dict[tuple, Dict]] = {}
+
+        duration = info.get("duration")
+        expiries = []
+        for fmt in info.get("formats") or []:
+            # Storyboards and other image-only "formats"
+            if fmt.get("vcodec") in (None, "none") and fmt.get("acodec") in (None, "none"):
+                continue
+            entry = normalize_format(fmt, duration)
+            expiry = url_expiry(entry["url"] or "")
+            if expiry:
+                expiries.append(expiry)
+
+            height = entry["height"] or 0
+            bitrate = entry["bitrate_kbps"] or 0
+            if entry["kind"] == "audio":
+                self.audio.append(entry)
+                if not self.best_audio or (entry["abr_kbps"] or bitrate) > (self.best_audio["abr_kbps"] or self.best_audio["bitrate_kbps"] or 0):
+                    self.best_audio = entry
+                continue
+
+            if entry["kind"] == "combined":
+                if not self.best_combined or height > (self.best_combined["height"] or 0):
+                    self.best_combined = entry
+            elif not self.best_video or height > (self.best_video["height"] or 0):
+                self.best_video = entry
+
+            # Keep the highest-bitrate format per (height, kind, codec, container)
+            variants = self._rungs.setdefault(height, {})
+            key = (entry["kind"], entry["vcodec"], entry["container"])
+            if key not in variants or bitrate > (variants[key]["bitrate_kbps"] or 0):
+                variants[key] = entry
+
+        self.audio.sort(key=lambda f: f["abr_kbps"] or f["bitrate_kbps"] or 0, reverse=True)
+        self.created_at = time.time()
+        if expiries:
+            self.expires_at = min(expiries) - EXPIRY_MARGIN_SECONDS
+        else:
+            self.expires_at = self.created_at + settings.format_index_ttl
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def ladder(self) -> List[Dict]:
+        """Video rungs from highest to lowest resolution"""
+        return [
+            {
+                "height": height,
+                "label": f"{height}p" if height else "unknown",
+                "variants": sorted(variants.values(), key=lambda f: f["bitrate_kbps"] or 0, reverse=True)
+            }
+            for height, variants in sorted(self._rungs.items(), reverse=True)
+        ]
+
+    def to_dict(self) -> Dict:
+        return {
+            "video_id": self.video_id,
+            "title": self.info.get("title"),
+            "duration": self.info.get("duration"),
+            "best_combined": self.best_combined,
+            "best_video": self.best_video,
+            "best_audio": self.best_audio,
+            "ladder": self.ladder(),
+            "audio": self.audio,
+            "expires_at": int(self.expires_at)
+        }
+
+
+class FormatIndexCache:
+    """Format indexes by video ID, dropped when their URLs expire"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.format_index_max_entries
+        self._entries: "OrderedDict[str, FormatIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, video_id: Optional[str]) -> Optional[FormatIndex]:
+        index = self._entries.get(video_id) if video_id else None
+        if index is not None and index.expired:
+            del self._entries[video_id]
+            index = None
+        if index is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(video_id)
+        self.hits += 1
+        return index
+
+    def update(self, info: Optional[Dict]) -> Optional[FormatIndex]:
+        """Index an info dict that has a format list"""
+        if not info or not info.get("id") or not info.get("formats"):
+            return None
+        index = FormatIndex(info["id"], info)
+        self._entries[index.video_id] = index
+        self._entries.move_to_end(index.video_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return index
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Shared format indexes for YouTube videos
+format_indexes = FormatIndexCache()
@@ -0,0 +1,194 @@
+"""
+Admission control for heavy background jobs.
+Each job class (browser extraction, yt-dlp download, FFmpeg transcode,
+audio conversion) has its own concurrency limit and bounded FIFO queue.
+Jobs that cannot start yet wait with QUEUED status and a visible queue
+position; once a queue is full, new jobs are rejected with a retry hint.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from app.config import settings
+from app.models import ExtractionStatus
+
+logger = logging.getLogger(__name__)
+
+BROWSER_JOBS = "browser"
+YTDLP_JOBS = "ytdlp"
+FFMPEG_JOBS = "ffmpeg"
+AUDIO_JOBS = "audio"
+
+
+class QueueFullError(Exception):
+    """Raised when a job class has no free slot and its queue is full"""
+
+    def __init__(self, job_class: str, retry_after: int):
+        super().__init__(f"Too many {job_class} jobs queued - try again in {retry_after}s")
+        self.job_class = job_class
+        self.retry_after = retry_after
+
+
+class JobTicket:
+    """A reserved place in a job queue"""
+
+    def __init__(self, queue: "JobQueue"):
+        self.queue = queue
+        self.state: Optional[Dict] = None
+        self.granted = asyncio.Event()
+        self.started_at: Optional[float] = None
+        self.released = False
+        self._saved_status = None
+
+    def attach(self, state: Dict):
+        """Publish queue status and position into a task's state dict"""
+        self.state = state
+        if not self.granted.is_set():
+            self.queue.publish_positions()
+
+    async def wait(self):
+        await self.granted.wait()
+
+    def release(self):
+        """Free the slot (or leave the queue); safe to call more than once"""
+        if not self.released:
+            self.released = True
+            self.queue.release(self)
+
+    def _show_position(self, position: int, waiting: int):
+        if self.state is None:
+            return
+        if self._saved_status is None:
+            self._saved_status = (self.state.get("status"), self.state.get("message"))
+        self.state["status"] = ExtractionStatus.QUEUED
+        self.state["queue_position"] = position
+        self.state["message"] = f"Queued - position {position} of {waiting}"
+
+    def _clear_position(self):
+        if self.state is None or self._saved_status is None:
+            return
+        self.state["status"], self.state["message"] = self._saved_status
+        self.state.pop("queue_position", None)
+        self._saved_status = None
+
+
+class JobQueue:
+    """Concurrency limit and FIFO wait queue for one job class"""
+
+    def __init__(self, name: str, limit: int, max_queued: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queued = max_queued
+        self.running = 0
+        self.waiting: Deque[JobTicket] = deque()
+        self.completed = 0
+        self.rejected = 0
+        self.avg_seconds = float(settings.job_default_seconds)
+
+    def reserve(self, bounded: bool = True) -> JobTicket:
+        ticket = JobTicket(self)
+        if self.running < self.limit and not self.waiting:
+            self._grant(ticket)
+        elif bounded and len(self.waiting) >= self.max_queued:
+            self.rejected += 1
+            logger.warning(f"Rejected {self.name} job: {len(self.waiting)} already queued")
+            raise QueueFullError(self.name, self.retry_after())
+        else:
+            self.waiting.append(ticket)
+        return ticket
+
+    def release(self, ticket: JobTicket):
+        if ticket.granted.is_set():
+            self.running -= 1
+            self.completed += 1
+            elapsed = time.monotonic() - ticket.started_at
+            # Moving average of job duration for Retry-After estimates
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * elapsed
+        else:
+            self.waiting.remove(ticket)
+
+        while self.waiting and self.running < self.limit:
+            self._grant(self.waiting.popleft())
+        self.publish_positions()
+
+    def _grant(self, ticket: JobTicket):
+        self.running += 1
+        ticket.started_at = time.monotonic()
+        ticket._clear_position()
+        ticket.granted.set()
+
+    def publish_positions(self):
+        for position, ticket in enumerate(self.waiting, start=1):
+            ticket._show_position(position, len(self.waiting))
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up"""
+        rounds = math.ceil((len(self.waiting) + 1) / self.limit)
+        return max(1, math.ceil(self.avg_seconds * rounds))
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "queued": len(self.waiting),
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.avg_seconds, 1)
+        }
+
+
+class JobScheduler:
+    """
+    Per-class admission control.
+
+    Endpoints call reserve() before accepting work (so a full queue can be
+    answered with 429) and hand the ticket to run() as the background task.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, max_queued: Optional[int] = None):
+        if limits is None:
+            limits = {
+                BROWSER_JOBS: settings.max_browser_jobs,
+                YTDLP_JOBS: settings.max_ytdlp_jobs,
+                FFMPEG_JOBS: settings.max_ffmpeg_jobs,
+                AUDIO_JOBS: settings.max_audio_jobs
+            }
+        max_queued = max_queued if max_queued is not None else settings.job_queue_size
+        self.queues = {name: JobQueue(name, limit, max_queued) for name, limit in limits.items()}
+
+    def reserve(self, job_class: str) -> JobTicket:
+        """Reserve a slot or a queue place; raises QueueFullError when full"""
+        return self.queues[job_class].reserve()
+
+    @asynccontextmanager
+    async def slot(self, job_class: str):
+        """
+        Hold a slot for one part of an already admitted job (e.g. a playlist
+        item); waits however long the queue is instead of being rejected
+        """
+        ticket = self.queues[job_class].reserve(bounded=False)
+        try:
+            await ticket.wait()
+            yield
+        finally:
+            ticket.release()
+
+    async def run(self, ticket: JobTicket, fn: Callable[..., Awaitable], *args):
+        """Wait for the ticket's turn, run the job and free the slot"""
+        try:
+            await ticket.wait()
+            await fn(*args)
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict:
+        return {name: queue.stats() for name, queue in self.queues.items()}
+
+
+# Concurrency limits and wait queues for heavy background jobs
+job_scheduler = JobScheduler()
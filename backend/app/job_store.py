@@ -0,0 +1,182 @@
+"""
+Durable state for playlist download jobs.
+Each playlist job and the state of every item in it (pending, downloading,
+success, failed, plus its output path) is checkpointed to SQLite, so jobs
+interrupted by a restart can be resumed where they stopped instead of
+downloading the whole playlist again.
+
+Several worker processes share the store, so each job is owned by one of
+them under a lease: the owner refreshes a heartbeat while it runs the job,
+and a job is only taken over (with an atomic UPDATE) once its owner has let
+go of it on shutdown or stopped heartbeating.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are kept this long for progress lookups after a restart
+RETENTION_SECONDS = 7 * 24 * 3600
+
+# A job whose owner has not heartbeated for this long can be taken over
+LEASE_SECONDS = 60
+HEARTBEAT_INTERVAL_SECONDS = LEASE_SECONDS / 3
+
+ITEM_FIELDS = ("status", "title", "download_url", "file_size_mb", "output_path", "error")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlist_jobs (
+    task_id TEXT PRIMARY KEY,
+    quality TEXT NOT NULL,
+    format_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE TABLE IF NOT EXISTS playlist_items (
+    task_id TEXT NOT NULL REFERENCES playlist_jobs(task_id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    title TEXT,
+    download_url TEXT,
+    file_size_mb TEXT,
+    output_path TEXT,
+    error TEXT,
+    PRIMARY KEY (task_id, idx)
+);
+"""
+
+
+class PlaylistJobStore:
+    """SQLite checkpoint of playlist jobs and their items"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.job_store_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Writes are single-row and tiny, so they run inline on the event loop
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        # Stores created before job leases existed
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(playlist_jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE playlist_jobs ADD COLUMN {column} {kind}")
+        self._lock = threading.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def ensure_job(self, task_id: str, video_ids: List[str], quality: str, format_type: str) -> List[Dict]:
+        """Items of a job, creating it (all pending, owned by this process) if it is new"""
+        items = self.items(task_id)
+        if items:
+            return items
+
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT INTO playlist_jobs (task_id, quality, format_type, status, created_at, updated_at, owner, heartbeat) "
+                "VALUES (?, ?, ?, 'running', ?, ?, ?, ?)",
+                (task_id, quality, format_type, now, now, self.owner, now)
+            )
+            self._db.executemany(
+                "INSERT INTO playlist_items (task_id, idx, video_id, status) VALUES (?, ?, ?, 'pending')",
+                [(task_id, idx, video_id) for idx, video_id in enumerate(video_ids)]
+            )
+        return self.items(task_id)
+
+    def update_item(self, task_id: str, idx: int, **fields):
+        columns = [key for key in fields if key in ITEM_FIELDS]
+        if not columns:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                f"UPDATE playlist_items SET {', '.join(f'{c} = ?' for c in columns)} WHERE task_id = ? AND idx = ?",
+                [fields[c] for c in columns] + [task_id, idx]
+            )
+            self._db.execute("UPDATE playlist_jobs SET updated_at = ? WHERE task_id = ?", (time.time(), task_id))
+
+    def finish_job(self, task_id: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE playlist_jobs SET status = 'completed', updated_at = ? WHERE task_id = ?",
+                (time.time(), task_id)
+            )
+
+    def items(self, task_id: str) -> List[Dict]:
+        rows = self._db.execute(
+            "SELECT * FROM playlist_items WHERE task_id = ? ORDER BY idx", (task_id,)
+        ).fetchall()
+        return [
+            {key: row[key] for key in ("video_id", *ITEM_FIELDS) if row[key] is not None}
+            for row in rows
+        ]
+
+    def unfinished_jobs(self) -> List[Dict]:
+        """Running jobs that no live process owns (candidates for claim())"""
+        rows = self._db.execute(
+            "SELECT task_id, quality, format_type FROM playlist_jobs "
+            "WHERE status = 'running' AND (owner IS NULL OR heartbeat < ?) ORDER BY created_at",
+            (time.time() - LEASE_SECONDS,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, task_id: str) -> bool:
+        """Take over an unowned or abandoned job; False if another process holds it"""
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE playlist_jobs SET owner = ?, heartbeat = ? "
+                "WHERE task_id = ? AND status = 'running' AND (owner IS NULL OR heartbeat < ?)",
+                (self.owner, now, task_id, now - LEASE_SECONDS)
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self) -> int:
+        """Renew the lease on every running job this process owns"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE playlist_jobs SET heartbeat = ? WHERE owner = ? AND status = 'running'",
+                (time.time(), self.owner)
+            )
+        return cursor.rowcount
+
+    def release(self, task_id: Optional[str] = None):
+        """Give up ownership of one job, or of all of them on shutdown, so another process can resume it"""
+        query = "UPDATE playlist_jobs SET owner = NULL WHERE owner = ? AND status = 'running'"
+        params = [self.owner]
+        if task_id is not None:
+            query += " AND task_id = ?"
+            params.append(task_id)
+        with self._lock, self._db:
+            self._db.execute(query, params)
+
+    def prune(self, older_than: float = RETENTION_SECONDS) -> int:
+        """Forget finished jobs last updated more than `older_than` seconds ago"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "DELETE FROM playlist_jobs WHERE status = 'completed' AND updated_at < ?",
+                (time.time() - older_than,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
+
+
+# Shared store for playlist downloads
+playlist_jobs = PlaylistJobStore()
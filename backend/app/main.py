@@ -1,16 +1,21 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.staticfiles import StaticFiles
 import logging
 import uuid
 import os
 import sys
 import asyncio
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
 from datetime import datetime
 from pathlib import Path
 import shutil
+import secrets
+import json
+import aiofiles
 
 # Fix for Python 3.13 on Windows - use ProactorEventLoop for subprocess support
 if sys.platform == 'win32' and sys.version_info >= (3, 13):
@@ -23,8 +28,30 @@ from app.models import (
 )
 from app.converter import VideoConverter
 from app.instagram_extractor import InstagramExtractor
-from app.youtube_extractor import YouTubeExtractor
+from app.youtube_extractor import YouTubeExtractor, youtube_video_id
+from app.metadata_cache import video_metadata
+from app.progress import DownloadProgress, PROGRESS_FIELDS, format_bytes
+from app.transcode_scheduler import run_transcode, transcode_scheduler, REMUX, AUDIO, ENCODE
+from app.segmented_transcode import segment_count, segmented_transcode
+from app.media_probe import (
+    MediaInfo, probe, probe_bytes, is_streamable, audio_copy_extension, compression_plan,
+    SKIPPED, REMUXED, PARTIAL, REENCODED
+)
+from app.download_cache import youtube_download_cache
+from app.playlist_enumerator import playlist_enumerator
+from app.format_index import format_indexes
+from app.job_store import playlist_jobs, HEARTBEAT_INTERVAL_SECONDS
 from app.livestream import LivestreamManager
+from app.extraction_cascade import ExtractionCascade
+from app.extractor_simple import close_http_client
+from app.extraction_cache import ExtractionCache
+from app.ytdlp_pool import ytdlp_pool
+from app.ytdlp_updater import ytdlp_updater
+from app.single_flight import SingleFlight
+from app.job_scheduler import (
+    job_scheduler, JobTicket, QueueFullError,
+    BROWSER_JOBS, YTDLP_JOBS, FFMPEG_JOBS, AUDIO_JOBS
+)
 
 # Configure logging FIRST
 logging.basicConfig(
@@ -34,26 +61,73 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import extractor - prefer Playwright for full automation
+browser_pool = None
+start_driver_pool = stop_driver_pool = None
 try:
     # Try Playwright first (works in Docker with Python 3.11)
     from app.extractor import MediaExtractor
+    from app.browser_pool import browser_pool
     logger.info("Using Playwright extractor (full browser automation)")
 except Exception as e:
     logger.warning(f"Playwright not available: {e}")
     try:
         # Fallback to Selenium
         from app.extractor_selenium import SeleniumMediaExtractor as MediaExtractor
+        from app.extractor_selenium import start_driver_pool, stop_driver_pool
         logger.info("Using Selenium extractor")
     except ImportError:
         # Final fallback to Simple HTTP
         from app.extractor_simple import SimpleMediaExtractor as MediaExtractor
         logger.info("Using Simple HTTP extractor (limited functionality)")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start long-lived workers with the app and shut them down on exit"""
+    if browser_pool is not None:
+        try:
+            await browser_pool.start()
+        except Exception as e:
+            # Extraction still works - the pool launches browsers lazily
+            logger.warning(f"Browser pool warm-up failed: {e}")
+    elif start_driver_pool is not None:
+        try:
+            await start_driver_pool()
+        except Exception as e:
+            logger.warning(f"WebDriver pool warm-up failed: {e}")
+    try:
+        await ytdlp_pool.start()
+    except Exception as e:
+        # Workers are started on first use instead
+        logger.warning(f"yt-dlp worker pool warm-up failed: {e}")
+    ytdlp_updater.start()
+    playlist_maintenance = asyncio.create_task(_maintain_playlist_jobs())
+    
+    yield
+    
+    playlist_maintenance.cancel()
+    try:
+        await playlist_maintenance
+    except asyncio.CancelledError:
+        pass
+    if browser_pool is not None:
+        await browser_pool.stop()
+    elif stop_driver_pool is not None:
+        await stop_driver_pool()
+    await ytdlp_updater.stop()
+    await ytdlp_pool.stop()
+    await close_http_client()
+    # Unfinished jobs of this worker can be resumed by the next one to start
+    playlist_jobs.release()
+    playlist_jobs.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Video Downloader API",
     description="Extract video URLs from webpages using network interception",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -79,6 +153,21 @@ history: list[HistoryItem] = []
 # Livestream manager
 livestream_manager = LivestreamManager()
 
+# Static scan first, browser extractor only when the page HTML has nothing
+extraction_cascade = ExtractionCascade(MediaExtractor)
+
+# Recent extraction results, keyed by normalized page URL
+extraction_cache = ExtractionCache()
+
+# Identical in-flight jobs share one run
+single_flight = SingleFlight()
+
+# Playlist videos downloading at once across all playlists
+playlist_download_slots = asyncio.Semaphore(settings.playlist_global_max_parallel)
+
+# Playlist jobs resumed at startup (kept referenced until they finish)
+resumed_jobs: set = set()
+
 
 @app.get("/api")
 async def api_root():
@@ -162,26 +251,61 @@ async def extract_video(request: ExtractRequest, background_tasks: BackgroundTas
                 detail="This site uses DRM protection. Cannot extract protected content."
             )
         
+        # Answer repeat pages straight from the cache
+        cached_media = await extraction_cache.get(url)
+        if cached_media:
+            task_id = str(uuid.uuid4())
+            tasks[task_id] = {"url": url}
+            _complete_extraction_task(task_id, url, cached_media, tier="cache", cache_hit=True)
+            
+            return ExtractResponse(
+                status=ExtractionStatus.COMPLETED,
+                message=f"Served from cache - {len(cached_media)} file(s) found",
+                media_url=cached_media[0].url,
+                download_url=cached_media[0].url,
+                task_id=task_id,
+                cache_hit=True
+            )
+        
         # Create task ID for progress tracking
         task_id = str(uuid.uuid4())
+        
+        # Same page already being extracted - mirror that task
+        flight_key = single_flight.key("extract", url, convert_hls=request.convert_hls)
+        leader_id = single_flight.attach(flight_key)
+        if leader_id is not None:
+            tasks[task_id] = tasks[leader_id]
+            return ExtractResponse(
+                status=ExtractionStatus.LOADING,
+                message="Extraction already in progress - attached to running job",
+                task_id=task_id
+            )
+        
+        ticket = _reserve_job(BROWSER_JOBS)
         tasks[task_id] = {
             "status": ExtractionStatus.LOADING,
             "progress": 0,
             "message": "Starting extraction...",
             "url": url
         }
+        ticket.attach(tasks[task_id])
         
         # Start extraction in background
+        single_flight.lead(flight_key, task_id)
         background_tasks.add_task(
-            _extract_video_task,
+            job_scheduler.run,
+            ticket,
+            single_flight.run_leader,
+            flight_key,
             task_id,
+            _extract_video_task,
             url,
             request.convert_hls
         )
         
         return ExtractResponse(
-            status=ExtractionStatus.LOADING,
-            message="Extraction started",
+            status=tasks[task_id]["status"],
+            message="Extraction started" if ticket.granted.is_set() else tasks[task_id]["message"],
             task_id=task_id
         )
         
@@ -199,18 +323,19 @@ async def _extract_video_task(task_id: str, url: str, convert_hls: bool):
         tasks[task_id].update({
             "status": ExtractionStatus.EXTRACTING,
             "progress": 20,
-            "message": "Loading page with headless browser..."
+            "message": "Scanning page for media..."
         })
         
-        # Extract media using Playwright (async)
-        extractor = MediaExtractor()
-        media_files = await extractor.extract(url)
+        # Static HTML scan first, headless browser only if that finds nothing
+        result = await extraction_cascade.extract(url)
+        media_files = result.media_files
         
         if not media_files:
             tasks[task_id].update({
                 "status": ExtractionStatus.FAILED,
                 "progress": 100,
-                "message": "No media files found on this page"
+                "message": "No media files found on this page",
+                "finish_phase": result.finish_phase
             })
             return
         
@@ -223,48 +348,13 @@ async def _extract_video_task(task_id: str, url: str, convert_hls: bool):
             "message": f"Found {len(media_files)} media file(s)"
         })
         
-        # Prepare all media files for download
-        media_list = []
-        all_media_serializable = []
-        
-        for i, media_file in enumerate(media_files):
-            media_info = {
-                "url": media_file.url,
-                "extension": media_file.extension,
-                "size": media_file.size,
-                "index": i
-            }
-            media_list.append(media_info)
-            
-            # Store serializable version with cookies/headers
-            all_media_serializable.append({
-                "url": media_file.url,
-                "extension": media_file.extension,
-                "size": media_file.size,
-                "cookies": getattr(media_file, 'cookies', []),
-                "headers": getattr(media_file, 'headers', {})
-            })
-        
-        # Mark as completed with all media files
-        tasks[task_id].update({
-            "status": ExtractionStatus.COMPLETED,
-            "progress": 100,
-            "message": f"Extraction completed - {len(media_files)} file(s) found",
-            "media_files": media_list,
-            "media_url": media_files[0].url,  # Keep for backward compatibility
-            "download_url": media_files[0].url,  # Keep for backward compatibility
-            "cookies": getattr(media_files[0], 'cookies', []),
-            "headers": getattr(media_files[0], 'headers', {}),
-            "all_media": all_media_serializable  # Store serializable version
-        })
+        _complete_extraction_task(
+            task_id, url, media_files,
+            tier=result.tier,
+            finish_phase=result.finish_phase
+        )
         
-        # Add to history
-        history.append(HistoryItem(
-            url=url,
-            media_url=media_file.url,
-            timestamp=datetime.now().isoformat(),
-            status=ExtractionStatus.COMPLETED
-        ))
+        await extraction_cache.set(url, media_files)
         
     except Exception as e:
         logger.error(f"Task {task_id} failed: {str(e)}")
@@ -275,6 +365,53 @@ async def _extract_video_task(task_id: str, url: str, convert_hls: bool):
         })
 
 
+def _complete_extraction_task(task_id: str, url: str, media_files: list, **extra):
+    """Mark an extraction task completed with all found media files"""
+    # Prepare all media files for download
+    media_list = []
+    all_media_serializable = []
+    
+    for i, media_file in enumerate(media_files):
+        media_info = {
+            "url": media_file.url,
+            "extension": media_file.extension,
+            "size": media_file.size,
+            "index": i
+        }
+        media_list.append(media_info)
+        
+        # Store serializable version with cookies/headers
+        all_media_serializable.append({
+            "url": media_file.url,
+            "extension": media_file.extension,
+            "size": media_file.size,
+            "cookies": getattr(media_file, 'cookies', []),
+            "headers": getattr(media_file, 'headers', {})
+        })
+    
+    # Mark as completed with all media files
+    tasks[task_id].update({
+        "status": ExtractionStatus.COMPLETED,
+        "progress": 100,
+        "message": f"Extraction completed - {len(media_files)} file(s) found",
+        "media_files": media_list,
+        "media_url": media_files[0].url,  # Keep for backward compatibility
+        "download_url": media_files[0].url,  # Keep for backward compatibility
+        "cookies": getattr(media_files[0], 'cookies', []),
+        "headers": getattr(media_files[0], 'headers', {}),
+        "all_media": all_media_serializable,  # Store serializable version
+        **extra
+    })
+    
+    # Add to history
+    history.append(HistoryItem(
+        url=url,
+        media_url=media_files[0].url,
+        timestamp=datetime.now().isoformat(),
+        status=ExtractionStatus.COMPLETED
+    ))
+
+
 @app.get("/api/progress/{task_id}")
 async def get_progress(task_id: str):
     """Get extraction progress for a task"""
@@ -312,6 +449,17 @@ async def get_progress(task_id: str):
         response["file_size_mb"] = task["file_size_mb"]
     if "media_files" in task:
         response["media_files"] = task["media_files"]
+    if task.get("tier"):
+        response["tier"] = task["tier"]
+    if task.get("finish_phase"):
+        response["finish_phase"] = task["finish_phase"]
+    if task.get("cache_hit"):
+        response["cache_hit"] = True
+    if "queue_position" in task:
+        response["queue_position"] = task["queue_position"]
+    for field in PROGRESS_FIELDS:
+        if task.get(field) is not None:
+            response[field] = task[field]
     
     return response
 
@@ -392,12 +540,122 @@ async def proxy_download(task_id: str, index: int = 0):
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 
+@app.get("/api/extract/tiers")
+async def get_extraction_tiers():
+    """Which extraction tier has answered for each domain"""
+    return {
+        "domains": extraction_cascade.stats.snapshot(),
+        "cache": extraction_cache.stats()
+    }
+
+
+@app.get("/api/stats/jobs")
+async def get_job_stats():
+    """Running and queued jobs per job class, yt-dlp workers and FFmpeg core usage"""
+    return {
+        **job_scheduler.stats(),
+        "ytdlp_pool": ytdlp_pool.stats(),
+        "transcode": transcode_scheduler.stats()
+    }
+
+
+@app.get("/api/stats/downloads")
+async def get_download_cache_stats():
+    """Download cache hits, misses and bytes saved"""
+    return {
+        "youtube": youtube_download_cache.stats(),
+        "metadata": video_metadata.stats(),
+        "playlists": playlist_enumerator.stats(),
+        "formats": format_indexes.stats()
+    }
+
+
+@app.get("/api/stats/coalescing")
+async def get_coalescing_stats():
+    """How many duplicate jobs were attached to an identical running job"""
+    return single_flight.stats()
+
+
+@app.get("/api/admin/ytdlp")
+async def get_ytdlp_status(x_admin_token: str = Header(default="")):
+    """yt-dlp version in use and the last update check"""
+    _require_admin(x_admin_token)
+    return ytdlp_updater.status()
+
+
+@app.post("/api/admin/ytdlp/update")
+async def update_ytdlp(x_admin_token: str = Header(default="")):
+    """Check for a new yt-dlp release and stage it in the background"""
+    _require_admin(x_admin_token)
+    started = ytdlp_updater.trigger()
+    return {
+        "started": started,
+        "message": "Update check started" if started else "An update is already in progress",
+        **ytdlp_updater.status()
+    }
+
+
 @app.get("/api/history")
 async def get_history():
     """Get download history"""
     return {"history": history[-10:]}  # Last 10 items
 
 
+def _download_progress_updater(task_id: str, start: int, end: int):
+    """yt-dlp progress callback mapping download percentage onto [start, end] of the task"""
+    tracker = DownloadProgress()
+    
+    def update(event: dict):
+        fields = tracker.update(event)
+        task = tasks.get(task_id)
+        if task is None:
+            return
+        task.update({key: fields.get(key) for key in ("downloaded_bytes", "total_bytes", "speed", "eta", "stage") if key in fields})
+        task["progress"] = start + int(fields["percent"] * (end - start) / 100)
+        if fields.get("stage") == "downloading" and fields.get("total_bytes"):
+            task["message"] = (
+                f"Downloading... {fields['percent']:.0f}% "
+                f"({format_bytes(fields['downloaded_bytes'])} of {format_bytes(fields['total_bytes'])})"
+            )
+        elif fields.get("stage") not in (None, "downloading"):
+            task["message"] = "Processing download..."
+    
+    return update
+
+
+def _ffmpeg_progress_updater(task_id: str, start: int, end: int):
+    """FFmpeg progress callback mapping percentage onto [start, end] of the task"""
+    def update(fields: dict):
+        task = tasks.get(task_id)
+        if task is None:
+            return
+        task.update({key: fields[key] for key in ("output_bytes", "speed", "eta", "stage")})
+        if fields.get("percent") is not None:
+            task["progress"] = start + int(fields["percent"] * (end - start) / 100)
+    
+    return update
+
+
+def _require_admin(token: str):
+    """Reject admin calls unless ADMIN_TOKEN is configured and matches"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not secrets.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def _reserve_job(job_class: str) -> JobTicket:
+    """Reserve a scheduler slot, answering 429 with Retry-After when the queue is full"""
+    try:
+        return job_scheduler.reserve(job_class)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
 def _is_drm_protected(url: str) -> bool:
     """
     Basic check for known DRM-protected platforms.
@@ -440,8 +698,9 @@ async def download_instagram(request: ExtractRequest, format_type: str = "video"
         url = str(request.url)
         logger.info(f"Instagram download request: {url} (format: {format_type})")
         
-        extractor = InstagramExtractor()
-        result = await extractor.extract(url)
+        # Concurrent requests for the same post share one fetch
+        flight_key = single_flight.key("instagram", url)
+        result = await single_flight.run(flight_key, lambda: InstagramExtractor().extract(url))
         
         status_code = result.pop("status_code", 200)
         
@@ -487,6 +746,19 @@ async def download_youtube(request: ExtractRequest, background_tasks: Background
         
         # Create task ID for progress tracking
         task_id = str(uuid.uuid4())
+        
+        # Same video and format already downloading - mirror that task
+        flight_key = single_flight.key("youtube", url, quality=quality, format_type=format_type)
+        leader_id = single_flight.attach(flight_key)
+        if leader_id is not None:
+            tasks[task_id] = tasks[leader_id]
+            return {
+                "status": "downloading",
+                "message": f"YouTube download already in progress ({format_label}) - attached to running job",
+                "task_id": task_id
+            }
+        
+        ticket = _reserve_job(YTDLP_JOBS)
         tasks[task_id] = {
             "status": "downloading",
             "progress": 0,
@@ -496,15 +768,27 @@ async def download_youtube(request: ExtractRequest, background_tasks: Background
             "format_type": format_type
         }
         
+        # Show title/thumbnail right away if this video was looked up before
+        metadata = video_metadata.get(youtube_video_id(url))
+        if metadata:
+            tasks[task_id].update({key: value for key, value in metadata.items() if key != "id"})
+        ticket.attach(tasks[task_id])
+        
         # Start download in background
-        background_tasks.add_task(_youtube_download_task, task_id, url, quality, format_type)
+        single_flight.lead(flight_key, task_id)
+        background_tasks.add_task(
+            job_scheduler.run, ticket,
+            single_flight.run_leader, flight_key, task_id, _youtube_download_task, url, quality, format_type
+        )
         
         return {
-            "status": "downloading",
-            "message": f"YouTube download started ({format_label})",
+            "status": tasks[task_id]["status"],
+            "message": f"YouTube download started ({format_label})" if ticket.granted.is_set() else tasks[task_id]["message"],
             "task_id": task_id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"YouTube download error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -521,7 +805,10 @@ async def _youtube_download_task(task_id: str, url: str, quality: str = "720p",
         })
         
         extractor = YouTubeExtractor()
-        result = await extractor.download_and_merge(url, quality, format_type)
+        result = await extractor.download_and_merge(
+            url, quality, format_type,
+            progress=_download_progress_updater(task_id, start=10, end=95)
+        )
         
         if result.get("status") == "success":
             tasks[task_id].update({
@@ -533,7 +820,8 @@ async def _youtube_download_task(task_id: str, url: str, quality: str = "720p",
                 "duration": result.get("duration"),
                 "uploader": result.get("uploader"),
                 "file_size_mb": result.get("file_size_mb"),
-                "download_url": result.get("download_url")
+                "download_url": result.get("download_url"),
+                "cache_hit": result.get("cache_hit", False)
             })
         else:
             tasks[task_id].update({
@@ -551,39 +839,74 @@ async def _youtube_download_task(task_id: str, url: str, quality: str = "720p",
         })
 
 
+@app.post("/api/youtube/formats")
+async def get_youtube_formats(request: ExtractRequest):
+    """
+    Get the format ladder of a YouTube video
+    
+    Formats are grouped by height, codec and container with size estimates.
+    The ladder is cached until its stream URLs expire, and downloads of the
+    same video reuse it instead of extracting again.
+    """
+    try:
+        url = str(request.url)
+        logger.info(f"Formats request: {url}")
+        
+        result = await YouTubeExtractor().get_formats(url)
+        status_code = result.pop("status_code", 200)
+        
+        if status_code != 200:
+            raise HTTPException(status_code=status_code, detail=result.get("error"))
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Formats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/youtube/file/{filename}")
 async def get_youtube_file(filename: str):
     """Serve downloaded YouTube video file"""
     file_path = Path("/tmp/youtube_downloads") / filename
     
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
     # Security check - ensure file is in the download directory
     if not str(file_path.resolve()).startswith("/tmp/youtube_downloads"):
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # Pin first, so the file cannot be evicted between the check and the response
+    if not youtube_download_cache.acquire(filename):
+        raise HTTPException(status_code=404, detail="File not found")
+    
     return FileResponse(
         file_path,
         media_type="video/mp4",
         filename=filename,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        background=BackgroundTask(youtube_download_cache.release, filename)
     )
 
 
 @app.post("/api/youtube/playlist/info")
-async def get_youtube_playlist_info(request: ExtractRequest):
+async def get_youtube_playlist_info(request: ExtractRequest, offset: int = 0, limit: Optional[int] = None):
     """
     Get YouTube playlist information
     
-    Returns list of videos in the playlist with metadata
+    Returns list of videos in the playlist with metadata. Pass `offset` and
+    `limit` to page through large playlists; `next_offset` is null on the
+    last page.
     """
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1")
+    
     try:
         url = str(request.url)
         logger.info(f"Playlist info request: {url}")
         
         extractor = YouTubeExtractor()
-        result = await extractor.get_playlist_info(url)
+        result = await extractor.get_playlist_info(url, offset=offset, limit=limit)
         
         status_code = result.pop("status_code", 200)
         
@@ -599,6 +922,41 @@ async def get_youtube_playlist_info(request: ExtractRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/youtube/playlist/info/stream")
+async def stream_youtube_playlist_info(request: ExtractRequest):
+    """
+    Stream YouTube playlist entries as NDJSON while they are enumerated
+    
+    Lines: one {"type": "playlist"} header, one {"type": "video"} per entry,
+    then {"type": "end"} or {"type": "error"}.
+    """
+    url = str(request.url)
+    logger.info(f"Playlist stream request: {url}")
+    
+    extractor = YouTubeExtractor()
+    if not extractor._is_playlist_url(url):
+        raise HTTPException(status_code=400, detail="Not a playlist URL")
+    
+    enumeration = playlist_enumerator.get(url)
+    
+    async def ndjson():
+        header_sent = False
+        async for video in enumeration.iter_videos():
+            if not header_sent:
+                yield json.dumps({"type": "playlist", "playlist_title": enumeration.display_title}) + "\n"
+                header_sent = True
+            yield json.dumps({"type": "video", **video}) + "\n"
+        
+        if enumeration.error and not enumeration.videos:
+            yield json.dumps({"type": "error", "error": f"Failed to fetch playlist: {enumeration.error}"}) + "\n"
+        elif not enumeration.videos:
+            yield json.dumps({"type": "error", "error": "No videos found in playlist"}) + "\n"
+        else:
+            yield json.dumps({"type": "end", "video_count": len(enumeration.videos)}) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 @app.post("/api/youtube/playlist/download")
 async def download_youtube_playlist(
     request: ExtractRequest,
@@ -626,6 +984,9 @@ async def download_youtube_playlist(
         
         # Create task ID for progress tracking
         task_id = str(uuid.uuid4())
+        ticket = _reserve_job(YTDLP_JOBS)
+        # Checkpointed right away, so a job still queued at shutdown is resumed too
+        playlist_jobs.ensure_job(task_id, selected_ids, quality, format_type)
         tasks[task_id] = {
             "status": "downloading",
             "progress": 0,
@@ -636,18 +997,22 @@ async def download_youtube_playlist(
             "current_video": "",
             "downloads": []
         }
+        ticket.attach(tasks[task_id])
         
         # Start batch download in background
         background_tasks.add_task(
+            job_scheduler.run,
+            ticket,
             _playlist_download_task,
             task_id,
             selected_ids,
             quality,
-            format_type
+            format_type,
+            ticket
         )
         
         return {
-            "status": "downloading",
+            "status": tasks[task_id]["status"],
             "message": f"Playlist download started ({len(selected_ids)} videos)",
             "task_id": task_id,
             "total_videos": len(selected_ids)
@@ -664,83 +1029,174 @@ async def _playlist_download_task(
     task_id: str,
     video_ids: list,
     quality: str,
-    format_type: str
+    format_type: str,
+    ticket: Optional[JobTicket] = None
 ):
-    """Background task for playlist download"""
+    """
+    Background task for playlist download
+    
+    Videos download concurrently (bounded per playlist and across all
+    playlists); `downloads` keeps the playlist order and fills in as each
+    video finishes. The playlist's own ticket only admits it: once it
+    starts, every video takes its own yt-dlp job slot.
+    """
+    if ticket is not None:
+        ticket.release()
+    
     extractor = YouTubeExtractor()
     total = len(video_ids)
-    completed = 0
-    failed = 0
-    downloads = []
+    playlist_slots = asyncio.Semaphore(settings.playlist_max_parallel)
     
-    for idx, video_id in enumerate(video_ids):
-        try:
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            
-            # Update progress
-            tasks[task_id].update({
-                "progress": int((idx / total) * 100),
-                "current_video": video_id,
-                "message": f"Downloading video {idx + 1}/{total}..."
-            })
-            
-            # Download video
-            result = await extractor.download_and_merge(video_url, quality, format_type)
-            
-            if result.get("status") == "success":
-                completed += 1
-                downloads.append({
-                    "video_id": video_id,
-                    "title": result.get("title"),
-                    "download_url": result.get("download_url"),
-                    "file_size_mb": result.get("file_size_mb"),
-                    "status": "success"
-                })
-            else:
-                failed += 1
-                downloads.append({
-                    "video_id": video_id,
-                    "status": "failed",
-                    "error": result.get("error", "Unknown error")
-                })
-            
-            tasks[task_id].update({
-                "completed_videos": completed,
-                "failed_videos": failed,
-                "downloads": downloads
-            })
-            
-        except Exception as e:
-            logger.error(f"Failed to download video {video_id}: {str(e)}")
-            failed += 1
-            downloads.append({
+    # Item state is checkpointed so a restart resumes the job; finished
+    # items whose files are still on disk are not downloaded again
+    downloads = playlist_jobs.ensure_job(task_id, video_ids, quality, format_type)
+    for idx, item in enumerate(downloads):
+        output_path = item.pop("output_path", None)
+        on_disk = output_path is not None and os.path.exists(output_path)
+        if item["status"] == "downloading" or (item["status"] == "success" and not on_disk):
+            downloads[idx] = {"video_id": item["video_id"], "status": "pending"}
+            playlist_jobs.update_item(task_id, idx, status="pending")
+    
+    tasks[task_id]["downloads"] = downloads
+    
+    def update_progress():
+        completed = sum(1 for item in downloads if item["status"] == "success")
+        failed = sum(1 for item in downloads if item["status"] == "failed")
+        active = [item["video_id"] for item in downloads if item["status"] == "downloading"]
+        tasks[task_id].update({
+            "progress": int(((completed + failed) / total) * 100),
+            "completed_videos": completed,
+            "failed_videos": failed,
+            "current_video": ", ".join(active),
+            "message": f"Downloaded {completed + failed}/{total} videos ({len(active)} in progress)..."
+        })
+        return completed, failed
+    
+    async def download_item(idx: int, video_id: str):
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        
+        async with playlist_slots, playlist_download_slots, job_scheduler.slot(YTDLP_JOBS):
+            downloads[idx]["status"] = "downloading"
+            playlist_jobs.update_item(task_id, idx, status="downloading")
+            update_progress()
+            try:
+                # A stuck video is stopped in its yt-dlp worker and gives up its slot
+                result = await extractor.download_and_merge(
+                    video_url, quality, format_type,
+                    concurrent_fragments=settings.playlist_concurrent_fragments,
+                    timeout=settings.playlist_item_timeout_seconds
+                )
+            except Exception as e:
+                logger.error(f"Failed to download video {video_id}: {str(e)}")
+                result = {"error": str(e)}
+        
+        if result.get("status") == "success":
+            downloads[idx] = {
+                "video_id": video_id,
+                "title": result.get("title"),
+                "download_url": result.get("download_url"),
+                "file_size_mb": result.get("file_size_mb"),
+                "status": "success"
+            }
+        else:
+            downloads[idx] = {
                 "video_id": video_id,
                 "status": "failed",
-                "error": str(e)
-            })
+                "error": result.get("error", "Unknown error")
+            }
+        playlist_jobs.update_item(task_id, idx, output_path=result.get("file_path"), **downloads[idx])
+        update_progress()
+    
+    await asyncio.gather(*(
+        download_item(idx, item["video_id"]) for idx, item in enumerate(downloads) if item["status"] == "pending"
+    ))
+    completed, failed = update_progress()
+    playlist_jobs.finish_job(task_id)
     
     # Mark as completed
     tasks[task_id].update({
         "status": "completed",
         "progress": 100,
         "message": f"Playlist download completed! {completed} successful, {failed} failed",
+        "current_video": "",
         "completed_videos": completed,
         "failed_videos": failed,
         "downloads": downloads
     })
 
 
+def _resume_playlist_jobs():
+    """Restart playlist jobs that were interrupted by a shutdown or crash"""
+    playlist_jobs.prune()
+    for job in playlist_jobs.unfinished_jobs():
+        task_id = job["task_id"]
+        # Every worker looks for abandoned jobs; only one of them gets each
+        if not playlist_jobs.claim(task_id):
+            continue
+        items = playlist_jobs.items(task_id)
+        try:
+            ticket = job_scheduler.reserve(YTDLP_JOBS)
+        except QueueFullError:
+            logger.warning(f"Not resuming playlist job {task_id} now - queue is full")
+            playlist_jobs.release(task_id)
+            continue
+        
+        tasks[task_id] = {
+            "status": "downloading",
+            "progress": 0,
+            "message": f"Resuming playlist download ({len(items)} videos)...",
+            "total_videos": len(items),
+            "completed_videos": 0,
+            "failed_videos": 0,
+            "current_video": "",
+            "downloads": items
+        }
+        ticket.attach(tasks[task_id])
+        logger.info(f"Resuming playlist job {task_id}")
+        resumed = asyncio.create_task(job_scheduler.run(
+            ticket,
+            _playlist_download_task,
+            task_id,
+            [item["video_id"] for item in items],
+            job["quality"],
+            job["format_type"],
+            ticket
+        ))
+        resumed_jobs.add(resumed)
+        resumed.add_done_callback(resumed_jobs.discard)
+
+
+async def _maintain_playlist_jobs():
+    """Renew this worker's playlist job leases and take over jobs other workers abandoned"""
+    while True:
+        try:
+            playlist_jobs.heartbeat()
+            _resume_playlist_jobs()
+        except Exception as e:
+            logger.warning(f"Playlist job maintenance failed: {e}")
+        await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+
+
 @app.post("/api/convert/upload")
 async def upload_video_for_conversion(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    output_format: str = "mp3"
 ):
     """
     Upload a video file for audio extraction
     
     Accepts video files and converts them to MP3
+    
+    Output formats:
+    - mp3: always MP3 (MP3 audio is copied, anything else is encoded)
+    - original: keep AAC (.m4a) or MP3 audio as it is, encoding to MP3 only for other codecs
     """
+    ticket = None
     try:
+        if output_format not in ('mp3', 'original'):
+            raise HTTPException(status_code=400, detail="output_format must be 'mp3' or 'original'")
+        
         # Validate file type
         allowed_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
         file_ext = os.path.splitext(file.filename)[1].lower()
@@ -751,6 +1207,9 @@ async def upload_video_for_conversion(
                 detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
             )
         
+        # Claim a conversion slot before accepting the upload
+        ticket = _reserve_job(AUDIO_JOBS)
+        
         # Create upload directory
         upload_dir = Path("/tmp/video_uploads")
         upload_dir.mkdir(exist_ok=True)
@@ -779,32 +1238,147 @@ async def upload_video_for_conversion(
             "filename": file.filename,
             "file_size_mb": f"{file_size_mb:.2f}"
         }
+        ticket.attach(tasks[task_id])
         
         # Start conversion in background
         background_tasks.add_task(
+            job_scheduler.run,
+            ticket,
             _convert_video_to_audio,
             task_id,
             str(input_path),
-            file.filename
+            file.filename,
+            output_format
         )
         
         return {
             "status": "processing",
-            "message": "File uploaded successfully, converting to MP3...",
+            "message": "File uploaded successfully, extracting audio...",
             "task_id": task_id,
             "filename": file.filename,
             "file_size_mb": f"{file_size_mb:.2f}"
         }
         
     except HTTPException:
+        if ticket:
+            ticket.release()
         raise
     except Exception as e:
+        if ticket:
+            ticket.release()
         logger.error(f"Upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _convert_video_to_audio(task_id: str, input_path: str, original_filename: str):
-    """Background task for video to audio conversion"""
+# Bytes read from a streamed upload before choosing a path (container headers for the probe)
+STREAM_HEAD_BYTES = 1024 * 1024
+
+
+async def _read_head(chunks: AsyncIterator[bytes], size: int) -> bytes:
+    """First `size` bytes of a stream; the rest stays in `chunks`"""
+    head = bytearray()
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= size:
+            break
+    return bytes(head)
+
+
+@app.post("/api/convert/stream")
+async def stream_video_for_conversion(request: Request, filename: str, output_format: str = "mp3"):
+    """
+    Convert a video to audio while it is being uploaded
+    
+    The request body is the raw video file. Containers that can be read
+    front to back (MKV, WebM, FLV and faststart MP4/MOV) are piped straight
+    into FFmpeg, so conversion overlaps the upload and nothing is written
+    to disk first; other files are spooled and converted as with
+    /api/convert/upload. Responds once the conversion has finished.
+    """
+    allowed_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
+    file_ext = os.path.splitext(filename)[1].lower()
+    
+    if file_ext not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
+        )
+    if output_format not in ('mp3', 'original'):
+        raise HTTPException(status_code=400, detail="output_format must be 'mp3' or 'original'")
+    
+    ticket = _reserve_job(AUDIO_JOBS)
+    
+    upload_dir = Path("/tmp/video_uploads")
+    file_id = str(uuid.uuid4())[:8]
+    input_path = upload_dir / f"video_{file_id}{file_ext}"
+    
+    task_id = str(uuid.uuid4())
+    tasks[task_id] = {
+        "status": "uploading",
+        "progress": 0,
+        "message": "Receiving upload...",
+        "filename": filename
+    }
+    ticket.attach(tasks[task_id])
+    
+    async def convert():
+        chunks = request.stream()
+        head = await _read_head(chunks, STREAM_HEAD_BYTES)
+        if not head:
+            tasks[task_id].update({"status": "failed", "progress": 100, "message": "Empty upload"})
+            return
+        
+        if is_streamable(file_ext, head):
+            logger.info(f"Piping upload {filename} into FFmpeg")
+            tasks[task_id]["pipelined"] = True
+            
+            async def body():
+                yield head
+                async for chunk in chunks:
+                    yield chunk
+            
+            await _convert_video_to_audio(
+                task_id, str(input_path), filename, output_format,
+                stdin=body(), media_info=await probe_bytes(head)
+            )
+        else:
+            # MP4/MOV with the index at the end need a seekable input
+            logger.info(f"Spooling upload {filename} to disk before conversion")
+            tasks[task_id]["pipelined"] = False
+            upload_dir.mkdir(exist_ok=True)
+            async with aiofiles.open(input_path, "wb") as buffer:
+                await buffer.write(head)
+                async for chunk in chunks:
+                    await buffer.write(chunk)
+            await _convert_video_to_audio(task_id, str(input_path), filename, output_format)
+    
+    try:
+        await job_scheduler.run(ticket, convert)
+    except Exception as e:
+        logger.error(f"Streamed conversion error: {str(e)}")
+        tasks[task_id].update({"status": "failed", "progress": 100, "message": f"Error: {str(e)}"})
+    
+    task = tasks[task_id]
+    if task["status"] == "failed":
+        raise HTTPException(status_code=400 if task["message"] == "Empty upload" else 500, detail=task["message"])
+    return {"task_id": task_id, **task}
+
+
+async def _convert_video_to_audio(
+    task_id: str,
+    input_path: str,
+    original_filename: str,
+    output_format: str = "mp3",
+    stdin: Optional[AsyncIterator[bytes]] = None,
+    media_info: Optional[MediaInfo] = None
+):
+    """
+    Background task for video to audio conversion
+    
+    With `stdin`, the video is piped into FFmpeg as it is uploaded: nothing
+    is read from `input_path` (it only names the output) and `media_info`
+    comes from probing the first bytes of the upload.
+    """
     try:
         tasks[task_id].update({
             "status": "converting",
@@ -817,57 +1391,73 @@ async def _convert_video_to_audio(task_id: str, input_path: str, original_filena
         output_dir.mkdir(exist_ok=True)
         
         file_id = Path(input_path).stem
-        output_path = output_dir / f"{file_id}.mp3"
-        
-        # Use FFmpeg to extract audio
-        cmd = [
-            'ffmpeg',
-            '-i', input_path,
-            '-vn',  # No video
-            '-acodec', 'libmp3lame',
-            '-q:a', '0',  # Best quality
-            '-y',  # Overwrite output file
-            str(output_path)
-        ]
+        source = 'pipe:0' if stdin is not None else input_path
+        if stdin is None:
+            media_info = await probe(input_path)
+        
+        # AAC/MP3 sources can be copied out in well under a second instead of re-encoded
+        copy_extension = audio_copy_extension(media_info, output_format)
+        if copy_extension:
+            output_path = output_dir / f"{file_id}.{copy_extension}"
+            cmd = [
+                'ffmpeg',
+                '-i', source,
+                '-vn',  # No video
+                '-c:a', 'copy'
+            ]
+            if copy_extension == 'm4a':
+                cmd += ['-movflags', '+faststart']
+            cmd += ['-y', str(output_path)]
+        else:
+            output_path = output_dir / f"{file_id}.mp3"
+            # Use FFmpeg to extract audio
+            cmd = [
+                'ffmpeg',
+                '-i', source,
+                '-vn',  # No video
+                '-acodec', 'libmp3lame',
+                '-q:a', '0',  # Best quality
+                '-y',  # Overwrite output file
+                str(output_path)
+            ]
         
         logger.info(f"Converting: {' '.join(cmd)}")
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        returncode, stderr = await run_transcode(
+            cmd, REMUX if copy_extension else AUDIO, _ffmpeg_progress_updater(task_id, start=60, end=99), stdin=stdin
         )
         
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0 and output_path.exists():
+        if returncode == 0 and output_path.exists():
             file_size = output_path.stat().st_size
             file_size_mb = file_size / (1024 * 1024)
             
             tasks[task_id].update({
                 "status": "completed",
                 "progress": 100,
-                "message": "Conversion completed!",
+                "message": "Conversion completed! (audio copied without re-encoding)" if copy_extension else "Conversion completed!",
                 "download_url": f"/api/convert/download/{output_path.name}",
                 "output_filename": output_path.name,
-                "output_size_mb": f"{file_size_mb:.2f}"
+                "output_size_mb": f"{file_size_mb:.2f}",
+                "output_format": output_path.suffix.lstrip('.'),
+                "audio_copied": bool(copy_extension)
             })
             
             # Clean up input file
-            try:
-                os.remove(input_path)
-            except:
-                pass
+            if stdin is None:
+                try:
+                    os.remove(input_path)
+                except:
+                    pass
             
             logger.info(f"Conversion completed: {output_path.name} ({file_size_mb:.2f} MB)")
         else:
-            error_msg = stderr.decode() if stderr else "Unknown error"
+            error_msg = stderr or "Unknown error"
             logger.error(f"FFmpeg error: {error_msg}")
             
             tasks[task_id].update({
                 "status": "failed",
                 "progress": 100,
-                "message": f"Conversion failed: {error_msg[:200]}"
+                "message": f"Conversion failed: {error_msg[-200:]}"
             })
             
     except Exception as e:
@@ -881,7 +1471,7 @@ async def _convert_video_to_audio(task_id: str, input_path: str, original_filena
 
 @app.get("/api/convert/download/{filename}")
 async def download_converted_audio(filename: str):
-    """Download converted MP3 file"""
+    """Download converted audio file (MP3, or M4A when AAC audio was kept)"""
     file_path = Path("/tmp/converted_audio") / filename
     
     if not file_path.exists():
@@ -893,7 +1483,7 @@ async def download_converted_audio(filename: str):
     
     return FileResponse(
         file_path,
-        media_type="audio/mpeg",
+        media_type="audio/mp4" if file_path.suffix == ".m4a" else "audio/mpeg",
         filename=filename,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -913,6 +1503,7 @@ async def upload_video_for_compression(
     - medium: 480p, 1000k bitrate (~40% size)
     - low: 360p, 500k bitrate (~20% size)
     """
+    ticket = None
     try:
         # Validate file type
         allowed_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
@@ -928,6 +1519,9 @@ async def upload_video_for_compression(
         if quality not in ['high', 'medium', 'low']:
             quality = 'medium'
         
+        # Claim a transcode slot before accepting the upload
+        ticket = _reserve_job(FFMPEG_JOBS)
+        
         # Create upload directory
         upload_dir = Path("/tmp/video_compress")
         upload_dir.mkdir(exist_ok=True)
@@ -962,9 +1556,12 @@ async def upload_video_for_compression(
             "quality": quality,
             "estimated_size_mb": f"{estimated_size_mb:.2f}"
         }
+        ticket.attach(tasks[task_id])
         
         # Start compression in background
         background_tasks.add_task(
+            job_scheduler.run,
+            ticket,
             _compress_video,
             task_id,
             str(input_path),
@@ -983,12 +1580,24 @@ async def upload_video_for_compression(
         }
         
     except HTTPException:
+        if ticket:
+            ticket.release()
         raise
     except Exception as e:
+        if ticket:
+            ticket.release()
         logger.error(f"Upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+COMPRESSION_MESSAGES = {
+    SKIPPED: "Video already meets the target quality - no compression needed",
+    REMUXED: "Video already meets the target quality - repackaged as MP4 ({ratio:.1f}% size reduction)",
+    PARTIAL: "Compression completed! Re-encoded only the streams above target ({ratio:.1f}% size reduction)",
+    REENCODED: "Compression completed! ({ratio:.1f}% size reduction)"
+}
+
+
 async def _compress_video(task_id: str, input_path: str, original_filename: str, quality: str):
     """Background task for video compression"""
     try:
@@ -1026,47 +1635,75 @@ async def _compress_video(task_id: str, input_path: str, original_filename: str,
         
         config = settings.get(quality, settings["medium"])
         
-        # Use FFmpeg to compress video
-        cmd = [
-            'ffmpeg',
-            '-i', input_path,
-            '-vf', f"scale={config['scale']}:force_original_aspect_ratio=decrease,pad={config['scale']}:(ow-iw)/2:(oh-ih)/2",
-            '-c:v', 'libx264',
-            '-b:v', config['bitrate'],
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-preset', 'medium',
-            '-y',
-            str(output_path)
-        ]
-        
-        logger.info(f"Compressing: {' '.join(cmd)}")
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        # Probe the input: streams already within the target are copied, not re-encoded
+        max_width, max_height = (int(side) for side in config['scale'].split(':'))
+        media_info = await probe(input_path)
+        plan = compression_plan(
+            media_info, max_width, max_height,
+            video_kbps=int(config['bitrate'].rstrip('k')), audio_kbps=128
         )
+        original_size = Path(input_path).stat().st_size / (1024 * 1024)
+        logger.info(f"Compression path for {original_filename}: {plan['path']}")
         
-        stdout, stderr = await process.communicate()
+        # Long re-encodes run as parallel chunks
+        segments = segment_count(media_info.duration) if media_info and not plan["copy_video"] else 1
         
-        if process.returncode == 0 and output_path.exists():
+        if plan["path"] == SKIPPED:
+            # Already an MP4 within the target - serve the upload as it is
+            shutil.move(input_path, output_path)
+            returncode, stderr = 0, ""
+        else:
+            if plan["copy_video"]:
+                video_args = ['-c:v', 'copy']
+            else:
+                video_args = [
+                    '-vf', f"scale={config['scale']}:force_original_aspect_ratio=decrease,pad={config['scale']}:(ow-iw)/2:(oh-ih)/2",
+                    '-c:v', 'libx264',
+                    '-b:v', config['bitrate'],
+                    '-preset', 'medium'
+                ]
+            if not plan["has_audio"]:
+                audio_args = []
+            elif plan["copy_audio"]:
+                audio_args = ['-c:a', 'copy']
+            else:
+                audio_args = ['-c:a', 'aac', '-b:a', '128k']
+            progress = _ffmpeg_progress_updater(task_id, start=60, end=99)
+            
+            if segments > 1:
+                logger.info(f"Compressing {original_filename} in {segments} parallel segments")
+                returncode, stderr = await segmented_transcode(
+                    input_path, output_path, video_args,
+                    audio_args if plan["has_audio"] else None,
+                    media_info.duration, segments, progress
+                )
+            else:
+                cmd = ['ffmpeg', '-i', input_path, *video_args, *audio_args, '-movflags', '+faststart', '-y', str(output_path)]
+                logger.info(f"Compressing: {' '.join(cmd)}")
+                
+                priority = ENCODE if not plan["copy_video"] else (REMUX if plan["copy_audio"] or not plan["has_audio"] else AUDIO)
+                returncode, stderr = await run_transcode(cmd, priority, progress)
+        
+        if returncode == 0 and output_path.exists():
             file_size = output_path.stat().st_size
             file_size_mb = file_size / (1024 * 1024)
             
             # Calculate compression ratio
-            original_size = Path(input_path).stat().st_size / (1024 * 1024)
             compression_ratio = ((original_size - file_size_mb) / original_size) * 100
             
             tasks[task_id].update({
                 "status": "completed",
                 "progress": 100,
-                "message": f"Compression completed! ({compression_ratio:.1f}% size reduction)",
+                "message": COMPRESSION_MESSAGES[plan["path"]].format(ratio=compression_ratio),
                 "download_url": f"/api/compress/download/{output_path.name}",
                 "output_filename": output_path.name,
                 "output_size_mb": f"{file_size_mb:.2f}",
                 "compression_ratio": f"{compression_ratio:.1f}",
-                "quality_description": config['description']
+                "quality_description": config['description'],
+                "compression_path": plan["path"],
+                "video_copied": plan["copy_video"],
+                "audio_copied": plan["copy_audio"],
+                "segments": segments
             })
             
             # Clean up input file
@@ -1077,13 +1714,13 @@ async def _compress_video(task_id: str, input_path: str, original_filename: str,
             
             logger.info(f"Compression completed: {output_path.name} ({file_size_mb:.2f} MB, {compression_ratio:.1f}% reduction)")
         else:
-            error_msg = stderr.decode() if stderr else "Unknown error"
+            error_msg = stderr or "Unknown error"
             logger.error(f"FFmpeg error: {error_msg}")
             
             tasks[task_id].update({
                 "status": "failed",
                 "progress": 100,
-                "message": f"Compression failed: {error_msg[:200]}"
+                "message": f"Compression failed: {error_msg[-200:]}"
             })
             
     except Exception as e:
@@ -1250,17 +1887,19 @@ async def download_archived_stream(request: ExtractRequest, background_tasks: Ba
         
         # Create task for download
         task_id = str(uuid.uuid4())
+        ticket = _reserve_job(YTDLP_JOBS)
         tasks[task_id] = {
             "status": "downloading",
             "progress": 0,
             "message": "Downloading archived livestream..."
         }
+        ticket.attach(tasks[task_id])
         
         # Start download in background
-        background_tasks.add_task(_download_archive_task, task_id, url)
+        background_tasks.add_task(job_scheduler.run, ticket, _download_archive_task, task_id, url)
         
         return {
-            "status": "downloading",
+            "status": tasks[task_id]["status"],
             "message": "Archive download started",
             "task_id": task_id
         }
@@ -0,0 +1,165 @@
+"""
+Shared media classifier for all extractors.
+Everything is precompiled at import so the per-response hot path costs one
+suffix lookup, one set lookup and at most one regex search, and duplicate
+detection is a single set membership test.
+"""
+import re
+from typing import Optional
+
+# Media file extensions to capture
+MEDIA_EXTENSIONS = frozenset({'.mp4', '.webm', '.m3u8', '.ts', '.mov', '.avi', '.mkv', '.flv'})
+
+# Media MIME types to capture
+MEDIA_MIME_TYPES = frozenset({
+    'video/mp4', 'video/webm', 'video/ogg', 'video/quicktime',
+    'application/vnd.apple.mpegurl', 'application/x-mpegurl',
+    'video/mp2t', 'application/octet-stream'
+})
+
+# Extension to use when only the MIME type identifies the media
+MIME_EXTENSIONS = {
+    'video/mp4': '.mp4',
+    'video/webm': '.webm',
+    'video/quicktime': '.mov',
+    'video/mp2t': '.ts',
+    'application/vnd.apple.mpegurl': '.m3u8',
+    'application/x-mpegurl': '.m3u8',
+}
+
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico'})
+
+# Extensions whose URLs are numbered stream segments, collapsed for dedup
+SEGMENT_EXTENSIONS = frozenset({'.ts'})
+
+# Patterns to exclude (ads, trackers, etc.)
+EXCLUDE_PATTERNS = [
+    r'doubleclick\.net',
+    r'googlesyndication',
+    r'analytics',
+    r'tracking',
+    r'pixel',
+    r'beacon',
+    r'ad[sv]?\.',
+    r'advertisement'
+]
+
+EXCLUDE_RE = re.compile('|'.join(f'(?:{p})' for p in EXCLUDE_PATTERNS), re.IGNORECASE)
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def url_path(url: str) -> str:
+    """Path component of a URL without query or fragment (no full parse)"""
+    url = url.split('#', 1)[0].split('?', 1)[0]
+    scheme_end = url.find('://')
+    if scheme_end == -1:
+        return url
+    path_start = url.find('/', scheme_end + 3)
+    return url[path_start:] if path_start != -1 else '/'
+
+
+def _suffix(segment: str) -> str:
+    dot = segment.rfind('.')
+    return segment[dot:] if dot != -1 else ''
+
+
+def media_extension(url: str) -> Optional[str]:
+    """Media extension of the URL path, or None if it doesn't look like media"""
+    path = url_path(url).lower()
+    head, _, last = path.rpartition('/')
+
+    ext = _suffix(last)
+    if ext in MEDIA_EXTENSIONS:
+        return ext
+
+    # Some CDNs address renditions as /video.mp4/seg-1 or /video.mp4/range/0-1000
+    for segment in head.split('/'):
+        ext = _suffix(segment)
+        if ext in MEDIA_EXTENSIONS:
+            return ext
+
+    return None
+
+
+def mime_type(content_type: str) -> str:
+    """Bare lowercase MIME type from a Content-Type header value"""
+    return content_type.split(';', 1)[0].strip().lower()
+
+
+def is_media_url(url: str) -> bool:
+    """Check if URL points to a media file based on extension"""
+    return media_extension(url) is not None
+
+
+def is_media_content_type(content_type: str) -> bool:
+    """Check if content type is a media type"""
+    return mime_type(content_type) in MEDIA_MIME_TYPES
+
+
+def should_exclude(url: str) -> bool:
+    """Check if URL should be excluded (ads, trackers, etc.)"""
+    return EXCLUDE_RE.search(url) is not None
+
+
+def extension_for(url: str, content_type: str = '') -> str:
+    """Extension from the URL, else guessed from the content type, else .mp4"""
+    return media_extension(url) or MIME_EXTENSIONS.get(mime_type(content_type), '.mp4')
+
+
+def classify(url: str, content_type: str = '') -> Optional[str]:
+    """
+    Classify a network response in one pass.
+
+    Returns:
+        The media extension if the URL/content type is capturable media that
+        is not an image, ad or tracker - otherwise None
+    """
+    mime = mime_type(content_type)
+    if mime.startswith('image/'):
+        return None
+
+    ext = media_extension(url)
+    if ext is None:
+        if mime not in MEDIA_MIME_TYPES:
+            return None
+        if _suffix(url_path(url).lower()) in IMAGE_EXTENSIONS:
+            return None
+        ext = MIME_EXTENSIONS.get(mime, '.mp4')
+
+    if EXCLUDE_RE.search(url):
+        return None
+    return ext
+
+
+def dedup_key(url: str) -> str:
+    """
+    Key used to detect duplicate media.
+    Numbered stream segments (seg-1.ts, seg-2.ts, ...) of one rendition share a
+    key so a playing HLS stream doesn't add thousands of entries.
+    """
+    if media_extension(url) in SEGMENT_EXTENSIONS:
+        base, _, name = url.split('?', 1)[0].rpartition('/')
+        return f"{base}/{_DIGITS_RE.sub('#', name)}"
+    return url
+
+
+class MediaDeduper:
+    """Seen-URL set keyed by dedup_key"""
+
+    def __init__(self):
+        self._seen = set()
+
+    def add(self, url: str) -> bool:
+        """Record a URL; returns False if it (or its segment group) was already seen"""
+        key = dedup_key(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return dedup_key(url) in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
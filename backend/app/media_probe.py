@@ -0,0 +1,182 @@
+"""
+ffprobe helpers.
+Reads stream codecs, resolution and bitrates of a media file so jobs can
+tell whether FFmpeg has any real work to do - e.g. compression can copy
+streams that are already within the target instead of re-encoding them.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Streams within this factor of the target bitrate count as meeting it
+BITRATE_TOLERANCE = 1.1
+
+# Containers that can be served as .mp4 without remuxing
+MP4_FORMATS = {"mov", "mp4", "m4a", "3gp", "3g2", "mj2"}
+
+# Containers FFmpeg can demux sequentially from a pipe
+STREAMABLE_EXTENSIONS = {".mkv", ".webm", ".flv"}
+MP4_EXTENSIONS = {".mp4", ".mov", ".m4v"}
+
+# Audio codecs that can be stream-copied into a standalone file, by extension
+AUDIO_COPY_EXTENSIONS = {"aac": "m4a", "mp3": "mp3"}
+
+# Compression paths, reported in the task result
+SKIPPED = "skipped"
+REMUXED = "remux"
+PARTIAL = "partial"
+REENCODED = "reencode"
+
+
+class MediaInfo:
+    """The parts of ffprobe's output the converters care about"""
+
+    def __init__(self, probe: Dict):
+        fmt = probe.get("format") or {}
+        streams = probe.get("streams") or []
+        video = next((s for s in streams if s.get("codec_type") == "video"
+                      and not (s.get("disposition") or {}).get("attached_pic")), None)
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+        self.format_names = set((fmt.get("format_name") or "").split(","))
+        self.duration = _number(fmt.get("duration"))
+        self.bitrate = _number(fmt.get("bit_rate"))
+        self.video_codec = video.get("codec_name") if video else None
+        self.width = video.get("width") if video else None
+        self.height = video.get("height") if video else None
+        self.video_bitrate = _number(video.get("bit_rate")) if video else None
+        self.audio_codec = audio.get("codec_name") if audio else None
+        self.audio_bitrate = _number(audio.get("bit_rate")) if audio else None
+
+        # MKV/WebM only report the overall bitrate
+        if video and self.video_bitrate is None and self.bitrate:
+            self.video_bitrate = self.bitrate - (self.audio_bitrate or 0)
+
+    @property
+    def is_mp4(self) -> bool:
+        return bool(self.format_names & MP4_FORMATS)
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "N/A") else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def _ffprobe(target: str, data: Optional[bytes] = None) -> Optional[MediaInfo]:
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', target,
+            stdin=asyncio.subprocess.PIPE if data is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate(data)
+    except FileNotFoundError:
+        logger.warning("ffprobe not found - skipping input probe")
+        return None
+    except (BrokenPipeError, ConnectionResetError):
+        # ffprobe had seen enough before reading all of `data`
+        return None
+
+    if process.returncode != 0:
+        logger.warning(f"ffprobe failed for {target}: {stderr.decode(errors='replace')[-200:]}")
+        return None
+    try:
+        return MediaInfo(json.loads(stdout))
+    except ValueError:
+        return None
+
+
+async def probe(path: str) -> Optional[MediaInfo]:
+    """Probe a file with ffprobe; None if it is unavailable or the file is unreadable"""
+    return await _ffprobe(path)
+
+
+async def probe_bytes(data: bytes) -> Optional[MediaInfo]:
+    """Probe the first bytes of a stream (container headers carry the codecs)"""
+    return await _ffprobe('pipe:0', data)
+
+
+def is_streamable(extension: str, head: bytes) -> bool:
+    """
+    Whether FFmpeg can demux a file read front to back from a pipe.
+    MP4/MOV need their index (moov) before the media data (mdat), as in
+    "faststart" files; the other containers are read sequentially anyway.
+    """
+    if extension in STREAMABLE_EXTENSIONS:
+        return True
+    if extension not in MP4_EXTENSIONS:
+        return False
+
+    offset = 0
+    while offset + 8 <= len(head):
+        size = int.from_bytes(head[offset:offset + 4], 'big')
+        box = head[offset + 4:offset + 8]
+        if box == b'moov':
+            return True
+        if box == b'mdat':
+            return False
+        if size == 1 and offset + 16 <= len(head):
+            size = int.from_bytes(head[offset + 8:offset + 16], 'big')
+        if size < 8:
+            return False
+        offset += size
+    return False
+
+
+def audio_copy_extension(info: Optional[MediaInfo], output_format: str) -> Optional[str]:
+    """
+    Extension to stream-copy the source audio into, or None if it must be encoded.
+
+    `output_format` "mp3" only copies MP3 audio; "original" also copies AAC into .m4a.
+    """
+    if info is None or info.audio_codec is None:
+        return None
+    extension = AUDIO_COPY_EXTENSIONS.get(info.audio_codec)
+    if output_format == "original" or extension == output_format:
+        return extension
+    return None
+
+
+def compression_plan(info: Optional[MediaInfo], max_width: int, max_height: int,
+                     video_kbps: int, audio_kbps: int) -> Dict:
+    """
+    How to compress an input to a target resolution and bitrates.
+
+    Returns:
+        Dict with "path" (skipped / remux / partial / reencode), whether the
+        video and audio streams can be copied as they are, and whether there
+        is an audio stream at all (a video-only input is neither copied nor
+        encoded on the audio side)
+    """
+    if info is None or info.video_codec is None:
+        return {"path": REENCODED, "copy_video": False, "copy_audio": False, "has_audio": True}
+
+    # The orientation of the target box follows the source
+    if (info.height or 0) > (info.width or 0):
+        max_width, max_height = max_height, max_width
+
+    copy_video = (
+        info.video_codec == "h264"
+        and info.width is not None and info.width <= max_width
+        and info.height is not None and info.height <= max_height
+        and info.video_bitrate is not None
+        and info.video_bitrate <= video_kbps * 1000 * BITRATE_TOLERANCE
+    )
+    has_audio = info.audio_codec is not None
+    copy_audio = has_audio and info.audio_codec == "aac" and (
+        info.audio_bitrate is None or info.audio_bitrate <= audio_kbps * 1000 * BITRATE_TOLERANCE
+    )
+
+    if copy_video and (copy_audio or not has_audio):
+        path = SKIPPED if info.is_mp4 else REMUXED
+    elif copy_video or copy_audio:
+        path = PARTIAL
+    else:
+        path = REENCODED
+    return {"path": path, "copy_video": copy_video, "copy_audio": copy_audio, "has_audio": has_audio}
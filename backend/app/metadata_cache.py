@@ -0,0 +1,67 @@
+"""
+Per-video metadata cache.
+Keeps title, thumbnail, duration and uploader by video ID from any yt-dlp
+run that already produced them (downloads, format lookups, playlist
+listings) so other endpoints can show them without another extraction.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+METADATA_FIELDS = ("id", "title", "thumbnail", "duration", "uploader")
+
+
+def metadata_from_info(info: Dict) -> Dict:
+    """Display metadata from a yt-dlp info dict (full or flat playlist entry)"""
+    metadata = {field: info.get(field) for field in METADATA_FIELDS}
+    if not metadata["thumbnail"] and info.get("thumbnails"):
+        # Flat playlist entries only carry the thumbnail list
+        metadata["thumbnail"] = info["thumbnails"][-1].get("url")
+    if not metadata["uploader"]:
+        metadata["uploader"] = info.get("channel")
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+class VideoMetadataCache:
+    """LRU of video metadata by video ID with a fixed lifetime"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.metadata_cache_max_entries
+        self.ttl = ttl if ttl is not None else settings.metadata_cache_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, video_id: Optional[str]) -> Optional[Dict]:
+        entry = self._entries.get(video_id) if video_id else None
+        if entry and entry[0] > time.time():
+            self._entries.move_to_end(video_id)
+            self.hits += 1
+            return dict(entry[1])
+        if entry:
+            del self._entries[video_id]
+        self.misses += 1
+        return None
+
+    def update(self, info: Dict, video_id: Optional[str] = None):
+        """Merge metadata from an info dict; newer non-empty values win"""
+        video_id = video_id or info.get("id")
+        if not video_id:
+            return
+        metadata = metadata_from_info(info)
+        entry = self._entries.get(video_id)
+        if entry and entry[0] > time.time():
+            metadata = {**entry[1], **metadata}
+        self._entries[video_id] = (time.time() + self.ttl, metadata)
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared cache for YouTube endpoints
+video_metadata = VideoMetadataCache()
@@ -6,6 +6,7 @@ from enum import Enum
 class ExtractionStatus(str, Enum):
     """Status of video extraction process"""
     PENDING = "pending"
+    QUEUED = "queued"
     LOADING = "loading"
     EXTRACTING = "extracting"
     DOWNLOADING = "downloading"
@@ -42,6 +43,7 @@ class ExtractResponse(BaseModel):
     download_url: Optional[str] = None
     media_type: Optional[str] = None
     task_id: Optional[str] = None
+    cache_hit: bool = False
 
 
 class ProgressResponse(BaseModel):
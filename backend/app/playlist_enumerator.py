@@ -0,0 +1,162 @@
+"""
+Streaming, cached playlist enumeration.
+A playlist is enumerated once by a yt-dlp worker, page by page; the entries
+collected so far are shared by every request for the same playlist, so
+paginated and streaming (NDJSON) endpoints can answer as soon as the
+entries they need have arrived instead of waiting for the whole list.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.job_scheduler import job_scheduler, JobScheduler, YTDLP_JOBS
+from app.metadata_cache import video_metadata
+from app.url_utils import normalize_url
+from app.ytdlp_pool import ytdlp_pool, YtDlpPool
+
+logger = logging.getLogger(__name__)
+
+
+def playlist_video(entry: Dict) -> Dict:
+    """API representation of a flat playlist entry"""
+    # Flat entries are sparse - fill gaps from earlier full lookups
+    video_metadata.update(entry)
+    metadata = video_metadata.get(entry["id"]) or {}
+    return {
+        "id": entry["id"],
+        "title": metadata.get("title"),
+        "url": f"https://www.youtube.com/watch?v={entry['id']}",
+        "duration": metadata.get("duration"),
+        "thumbnail": metadata.get("thumbnail"),
+        "uploader": metadata.get("uploader")
+    }
+
+
+class PlaylistEnumeration:
+    """Entries of one playlist, filled in while the enumeration runs"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.title: Optional[str] = None
+        self.uploader: Optional[str] = None
+        self.videos: List[Dict] = []
+        self.complete = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self._changed = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, pool: YtDlpPool, scheduler: JobScheduler):
+        self._task = asyncio.create_task(self._run(pool, scheduler))
+
+    def cancel(self):
+        """Stop the enumeration (and its worker job) if it is still running"""
+        if self._task is not None and not self._task.done():
+            self.error = "Playlist enumeration was cancelled"
+            self._task.cancel()
+
+    async def _run(self, pool: YtDlpPool, scheduler: JobScheduler):
+        try:
+            # Enumerations share the yt-dlp workers with downloads, so they queue for the same slots
+            async with scheduler.slot(YTDLP_JOBS):
+                async for event in pool.stream_playlist(self.url):
+                    if "playlist" in event:
+                        self.title = event["playlist"].get("title")
+                        self.uploader = event["playlist"].get("uploader") or event["playlist"].get("channel")
+                    else:
+                        self.videos.extend(playlist_video(entry) for entry in event["entries"] if entry.get("id"))
+                    await self._notify()
+            logger.info(f"Enumerated {len(self.videos)} videos in playlist {self.url}")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Failed to fetch playlist: {self.error}")
+        finally:
+            self.complete = True
+            await self._notify()
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait_for(self, count: Optional[int] = None):
+        """Wait until at least `count` videos are known (or for the whole list when None)"""
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self.complete or (count is not None and len(self.videos) >= count)
+            )
+
+    async def iter_videos(self) -> AsyncIterator[Dict]:
+        """Videos in playlist order, as they arrive"""
+        index = 0
+        while True:
+            await self.wait_for(index + 1)
+            while index < len(self.videos):
+                yield self.videos[index]
+                index += 1
+            if self.complete:
+                return
+
+    @property
+    def display_title(self) -> str:
+        if self.title:
+            return self.title
+        if self.videos and self.videos[0].get("uploader"):
+            return self.videos[0]["uploader"]
+        return self.uploader or "YouTube Playlist"
+
+    @property
+    def expired(self) -> bool:
+        return time.time() - self.created_at > settings.playlist_cache_ttl
+
+
+class PlaylistEnumerator:
+    """Cache of playlist enumerations by normalized URL"""
+
+    def __init__(
+        self,
+        pool: Optional[YtDlpPool] = None,
+        max_entries: Optional[int] = None,
+        scheduler: Optional[JobScheduler] = None
+    ):
+        self.pool = pool or ytdlp_pool
+        self.scheduler = scheduler or job_scheduler
+        self.max_entries = max_entries if max_entries is not None else settings.playlist_cache_max_entries
+        self._enumerations: "OrderedDict[str, PlaylistEnumeration]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> PlaylistEnumeration:
+        """The running or cached enumeration for a playlist, starting one if needed"""
+        key = normalize_url(url)
+        enumeration = self._enumerations.get(key)
+        if enumeration is not None and not enumeration.error and not enumeration.expired:
+            self._enumerations.move_to_end(key)
+            self.hits += 1
+            return enumeration
+
+        self.misses += 1
+        enumeration = PlaylistEnumeration(url)
+        enumeration.start(self.pool, self.scheduler)
+        replaced = self._enumerations.pop(key, None)
+        if replaced is not None:
+            replaced.cancel()
+        self._enumerations[key] = enumeration
+        while len(self._enumerations) > self.max_entries:
+            _, evicted = self._enumerations.popitem(last=False)
+            evicted.cancel()
+        return enumeration
+
+    def stats(self) -> Dict:
+        return {
+            "playlists": len(self._enumerations),
+            "enumerating": sum(1 for e in self._enumerations.values() if not e.complete),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Shared enumerations for the playlist endpoints
+playlist_enumerator = PlaylistEnumerator()
@@ -0,0 +1,196 @@
+"""
+Live progress for long-running download and transcode jobs.
+Turns yt-dlp progress hook events and FFmpeg `-progress pipe:` key/value
+output into percentage, byte counts, speed and ETA as they arrive, instead
+of waiting for the process to exit.
+"""
+import asyncio
+import logging
+import re
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Task fields the progress endpoint passes through when present
+PROGRESS_FIELDS = ("downloaded_bytes", "total_bytes", "output_bytes", "speed", "eta", "stage")
+
+# ffmpeg prints the input duration to stderr before it starts encoding
+_DURATION_RE = re.compile(r'Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+STDERR_TAIL_LINES = 40
+
+ProgressCallback = Callable[[Dict], None]
+
+
+def format_bytes(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value:.0f} B"
+        value /= 1024
+
+
+class DownloadProgress:
+    """
+    Aggregates yt-dlp progress events into one monotonic view.
+    Separate video and audio streams are reported one after the other, so
+    byte counts are summed per file.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self.percent = 0.0
+
+    def update(self, event: Dict) -> Dict:
+        if event.get("status") == "postprocessing":
+            return {"percent": 100.0, "stage": event.get("postprocessor") or "postprocessing", "eta": None}
+
+        name = event.get("filename") or ""
+        downloaded = event.get("downloaded_bytes") or 0
+        total = event.get("total_bytes") or event.get("total_bytes_estimate") or 0
+        if event.get("status") == "finished":
+            total = total or downloaded
+            downloaded = total
+        self._files[name] = (downloaded, total)
+
+        done = sum(d for d, _ in self._files.values())
+        expected = sum(t for _, t in self._files.values())
+        if expected:
+            self.percent = max(self.percent, min(done / expected * 100, 100.0))
+
+        speed = event.get("speed")
+        return {
+            "percent": round(self.percent, 1),
+            "downloaded_bytes": done,
+            "total_bytes": expected or None,
+            "speed": f"{format_bytes(speed)}/s" if speed else None,
+            "eta": event.get("eta"),
+            "stage": "downloading"
+        }
+
+
+def _parse_duration(line: str) -> Optional[float]:
+    match = _DURATION_RE.search(line)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_ffmpeg_progress(block: Dict[str, str], duration: Optional[float]) -> Dict:
+    """One `-progress` block (ending in progress=continue|end) as task fields"""
+    out_us = block.get("out_time_us") or block.get("out_time_ms")
+    try:
+        processed = int(out_us) / 1_000_000 if out_us and out_us != "N/A" else None
+    except ValueError:
+        processed = None
+
+    speed_text = (block.get("speed") or "").strip()
+    try:
+        speed = float(speed_text.rstrip("x")) if speed_text and speed_text != "N/A" else None
+    except ValueError:
+        speed = None
+
+    try:
+        output_bytes = int(block["total_size"]) if block.get("total_size", "N/A") != "N/A" else None
+    except ValueError:
+        output_bytes = None
+
+    percent = None
+    eta = None
+    if block.get("progress") == "end":
+        percent = 100.0
+        eta = 0
+    elif duration and processed is not None:
+        percent = round(min(processed / duration * 100, 100.0), 1)
+        if speed:
+            eta = int(max(duration - processed, 0) / speed)
+
+    return {
+        "percent": percent,
+        "processed_seconds": processed,
+        "output_bytes": output_bytes,
+        "speed": f"{speed:.2f}x" if speed else None,
+        "eta": eta,
+        "stage": "transcoding"
+    }
+
+
+async def run_ffmpeg(
+    cmd: List[str],
+    on_progress: Optional[ProgressCallback] = None,
+    duration: Optional[float] = None,
+    stdin: Optional[AsyncIterator[bytes]] = None
+) -> Tuple[int, str]:
+    """
+    Run an ffmpeg command, reporting progress while it runs.
+
+    Args:
+        cmd: Full command starting with the ffmpeg binary
+        on_progress: Called with parsed progress fields for every update
+        duration: Input duration in seconds, if known (otherwise read from ffmpeg's log)
+        stdin: Chunks written to ffmpeg's stdin as they arrive (for `-i pipe:0`)
+
+    Returns:
+        (return code, last lines of stderr)
+    """
+    full_cmd = [cmd[0], '-hide_banner', '-nostats', '-progress', 'pipe:1', *cmd[1:]]
+    process = await asyncio.create_subprocess_exec(
+        *full_cmd,
+        stdin=asyncio.subprocess.PIPE if stdin is not None else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    known_duration = duration
+
+    async def read_log():
+        nonlocal known_duration
+        async for raw in process.stderr:
+            line = raw.decode(errors='replace')
+            if known_duration is None:
+                known_duration = _parse_duration(line)
+            stderr_tail.append(line)
+
+    async def read_progress():
+        block: Dict[str, str] = {}
+        async for raw in process.stdout:
+            key, _, value = raw.decode(errors='replace').strip().partition('=')
+            if not key:
+                continue
+            block[key] = value
+            if key == 'progress':
+                if on_progress is not None:
+                    try:
+                        on_progress(parse_ffmpeg_progress(block, known_duration))
+                    except Exception as e:
+                        logger.debug(f"Progress callback failed: {e}")
+                block = {}
+
+    async def feed_input():
+        try:
+            async for chunk in stdin:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg stopped reading; its exit code says whether that was an error
+            pass
+        finally:
+            process.stdin.close()
+
+    readers = [read_log(), read_progress()]
+    if stdin is not None:
+        readers.append(feed_input())
+    try:
+        await asyncio.gather(*readers)
+    except BaseException:
+        # Input failed (e.g. the client went away) or we were cancelled
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        raise
+    await process.wait()
+    return process.returncode, ''.join(stderr_tail)
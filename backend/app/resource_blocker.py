@@ -0,0 +1,105 @@
+"""
+Request-level resource blocker for headless extraction.
+Aborts images, fonts, stylesheets and known ad/tracker hosts before they
+are fetched so the page spends its bandwidth on the player and the media.
+"""
+import logging
+import re
+from typing import Dict, Iterable, Optional
+
+from playwright.async_api import Route
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceBlocker:
+    """
+    Playwright route handler that aborts non-essential requests.
+    Install with `await page.route('**/*', blocker.handle)`.
+    """
+
+    # Ad, analytics and tracking hosts that never serve the video itself
+    BLOCKED_HOSTS = re.compile(
+        r'(?:^|\.)(?:'
+        r'doubleclick\.net|googlesyndication\.com|googleadservices\.com|googletagservices\.com|'
+        r'google-analytics\.com|googletagmanager\.com|adservice\.google\.[a-z.]+|'
+        r'amazon-adsystem\.com|adnxs\.com|criteo\.(?:com|net)|pubmatic\.com|rubiconproject\.com|'
+        r'casalemedia\.com|openx\.net|moatads\.com|adsafeprotected\.com|taboola\.com|outbrain\.com|'
+        r'scorecardresearch\.com|quantserve\.com|chartbeat\.(?:com|net)|hotjar\.com|'
+        r'mixpanel\.com|segment\.(?:io|com)|nr-data\.net|connect\.facebook\.net|mc\.yandex\.ru'
+        r')$',
+        re.IGNORECASE
+    )
+
+    # Player scripts and CDNs that must always load, even if a rule above matches
+    PLAYER_ALLOWLIST = re.compile(
+        r'jwplayer|jwpcdn|video[.-]?js|hls(?:\.light)?(?:\.min)?\.js|dash(?:\.all)?(?:\.min)?\.js|'
+        r'shaka-player|plyr|flowplayer|brightcove|kaltura|vimeocdn|clappr|mediaelement',
+        re.IGNORECASE
+    )
+
+    # Aborted requests never report a size, so bandwidth saved is estimated per type
+    TYPICAL_SIZES = {
+        'image': 40_000,
+        'font': 50_000,
+        'stylesheet': 25_000,
+        'script': 60_000,
+        'xhr': 5_000,
+        'fetch': 5_000,
+        'ping': 500,
+        'other': 5_000,
+    }
+
+    def __init__(self, blocked_types: Optional[Iterable[str]] = None):
+        if blocked_types is None:
+            blocked_types = settings.blocked_resource_types_list
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_requests = 0
+        self.blocked_bytes = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """Decide whether a request is non-essential for media extraction"""
+        if resource_type in ('document', 'media'):
+            return False
+        if self.PLAYER_ALLOWLIST.search(url):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+
+        host = url.split('://', 1)[-1].split('/', 1)[0].split(':', 1)[0]
+        return bool(self.BLOCKED_HOSTS.search(host))
+
+    async def handle(self, route: Route):
+        """Route handler - abort blocked requests, let everything else through"""
+        request = route.request
+        resource_type = request.resource_type
+
+        try:
+            if self.should_block(request.url, resource_type):
+                self.blocked_requests += 1
+                self.blocked_bytes += self.TYPICAL_SIZES.get(resource_type, self.TYPICAL_SIZES['other'])
+                self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+                await route.abort('blockedbyclient')
+            else:
+                await route.continue_()
+        except Exception as e:
+            # Page or context closed while the request was pending
+            logger.debug(f"Route handling error: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Blocked request counts and estimated bytes saved"""
+        return {
+            "blocked_requests": self.blocked_requests,
+            "blocked_bytes_estimate": self.blocked_bytes,
+            "blocked_by_type": dict(self.blocked_by_type)
+        }
+
+    def log_summary(self, url: str):
+        by_type = ", ".join(f"{t}={n}" for t, n in sorted(self.blocked_by_type.items()))
+        logger.info(
+            f"Blocked {self.blocked_requests} requests (~{self.blocked_bytes / 1024:.0f} KB est.) "
+            f"while extracting {url[:80]}" + (f" [{by_type}]" if by_type else "")
+        )
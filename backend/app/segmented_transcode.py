@@ -0,0 +1,126 @@
+"""
+Segmented video re-encoding.
+A single libx264 run only keeps as many cores busy as x264 can parallelize,
+so long inputs are split at keyframes (stream copy) into chunks that are
+encoded by separate FFmpeg processes at once, each with its share of the
+transcode scheduler's cores. The audio track is encoded once alongside
+them, and the encoded chunks are joined by the concat demuxer without
+re-encoding.
+"""
+import asyncio
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.progress import ProgressCallback
+from app.transcode_scheduler import run_transcode, transcode_scheduler, REMUX, AUDIO, ENCODE
+
+logger = logging.getLogger(__name__)
+
+# Shorter chunks spend more of their time on encoder start-up and keyframes
+MIN_SEGMENT_SECONDS = 30
+
+
+def segment_count(duration: Optional[float]) -> int:
+    """
+    Number of chunks to encode an input of `duration` seconds in;
+    1 means a single FFmpeg run.
+    """
+    min_seconds = settings.segmented_transcode_min_seconds
+    if not min_seconds or not duration or duration < min_seconds:
+        return 1
+    segments = settings.segmented_transcode_segments or transcode_scheduler.cores // 2
+    return max(1, min(segments, int(duration // MIN_SEGMENT_SECONDS)))
+
+
+def _combined_progress(chunks: int, on_progress: Optional[ProgressCallback]):
+    """Per-chunk FFmpeg progress callbacks reporting the chunks as one job"""
+    latest: List[Dict] = [{} for _ in range(chunks)]
+
+    def for_chunk(index: int):
+        def update(fields: Dict):
+            latest[index] = fields
+            speeds = [float(f["speed"].rstrip("x")) for f in latest if f.get("speed")]
+            etas = [f["eta"] for f in latest if f.get("eta") is not None]
+            on_progress({
+                "percent": round(sum(f.get("percent") or 0 for f in latest) / chunks, 1),
+                "output_bytes": sum(f.get("output_bytes") or 0 for f in latest) or None,
+                # Chunks run side by side, so their speeds add up
+                "speed": f"{sum(speeds):.2f}x" if speeds else None,
+                "eta": max(etas) if len(etas) == chunks else None,
+                "stage": f"transcoding {chunks} segments"
+            })
+        return update if on_progress else None
+
+    return for_chunk
+
+
+async def segmented_transcode(
+    input_path: str,
+    output_path: Path,
+    video_args: List[str],
+    audio_args: Optional[List[str]],
+    duration: float,
+    segments: int,
+    on_progress: Optional[ProgressCallback] = None
+) -> Tuple[int, str]:
+    """
+    Re-encode the video of `input_path` in parallel chunks into an MP4.
+
+    Args:
+        video_args: FFmpeg video encoding options applied to every chunk
+        audio_args: Audio encoding options, or None if the input has no audio
+        duration: Input duration in seconds (chunks are cut at the first
+            keyframe after every `duration / segments` seconds)
+
+    Returns:
+        The (return code, stderr tail) of the first FFmpeg run that failed,
+        or of the final concat
+    """
+    work_dir = output_path.parent / f"{output_path.stem}_segments"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        # Cut the video stream at keyframes - a stream copy, so cheap
+        returncode, stderr = await run_transcode([
+            'ffmpeg', '-i', input_path, '-map', '0:v:0', '-c', 'copy',
+            '-f', 'segment', '-segment_time', f"{duration / segments:.3f}", '-reset_timestamps', '1',
+            '-y', str(work_dir / 'chunk_%03d.mkv')
+        ], REMUX)
+        if returncode != 0:
+            return returncode, stderr
+        chunks = sorted(work_dir.glob('chunk_*.mkv'))
+        if not chunks:
+            return 1, "Splitting the input produced no segments"
+
+        # One share of the core budget per chunk, so all of them can run at once
+        threads = max(1, transcode_scheduler.cores // len(chunks))
+        chunk_progress = _combined_progress(len(chunks), on_progress)
+        encoded = [chunk.with_suffix('.mp4') for chunk in chunks]
+        jobs = [
+            run_transcode(
+                ['ffmpeg', '-i', str(chunk), *video_args, '-an', '-y', str(target)],
+                ENCODE, chunk_progress(index), threads=threads
+            )
+            for index, (chunk, target) in enumerate(zip(chunks, encoded))
+        ]
+        audio_path = work_dir / 'audio.m4a'
+        if audio_args is not None:
+            jobs.append(run_transcode(['ffmpeg', '-i', input_path, '-vn', *audio_args, '-y', str(audio_path)], AUDIO))
+
+        logger.info(f"Encoding {len(chunks)} segments of {input_path} with {threads} thread(s) each")
+        for returncode, stderr in await asyncio.gather(*jobs):
+            if returncode != 0:
+                return returncode, stderr
+
+        # Paths in the list are relative to the list file
+        concat_list = work_dir / 'chunks.txt'
+        concat_list.write_text(''.join(f"file '{path.name}'\n" for path in encoded))
+        cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(concat_list)]
+        if audio_args is not None:
+            cmd += ['-i', str(audio_path), '-map', '0:v', '-map', '1:a']
+        cmd += ['-c', 'copy', '-movflags', '+faststart', '-y', str(output_path)]
+        return await run_transcode(cmd, REMUX)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
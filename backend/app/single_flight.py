@@ -0,0 +1,115 @@
+"""
+Single-flight coalescing of identical in-flight jobs.
+When the same normalized request is submitted while an identical job is
+still running, the new submission attaches to the running job instead of
+starting another browser, yt-dlp or HTTP fetch.
+"""
+import asyncio
+import copy
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.url_utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+FlightKey = Tuple
+
+
+class _Call:
+    """An awaited in-flight call and the number of callers waiting on it"""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Tracks running jobs by request key.
+
+    Background jobs use lead/attach/release: followers get their own task IDs
+    whose task state is the leader's, so progress and results mirror it.
+    Request-scoped calls use run(): concurrent callers await one execution.
+    """
+
+    def __init__(self):
+        self._leaders: Dict[FlightKey, str] = {}
+        self._calls: Dict[FlightKey, _Call] = {}
+        self.started: Counter = Counter()
+        self.coalesced: Counter = Counter()
+
+    @staticmethod
+    def key(
+        kind: str,
+        url: str,
+        quality: Optional[str] = None,
+        format_type: Optional[str] = None,
+        convert_hls: Optional[bool] = None
+    ) -> FlightKey:
+        """Normalized request key"""
+        return (kind, normalize_url(url), quality, format_type, convert_hls)
+
+    def attach(self, key: FlightKey) -> Optional[str]:
+        """Task ID of the running job for this key, counting the duplicate avoided"""
+        leader_id = self._leaders.get(key)
+        if leader_id is not None:
+            self.coalesced[key[0]] += 1
+            logger.info(f"Coalesced duplicate {key[0]} job onto task {leader_id}")
+        return leader_id
+
+    def lead(self, key: FlightKey, task_id: str):
+        """Register task_id as the running job for this key"""
+        self._leaders[key] = task_id
+        self.started[key[0]] += 1
+
+    def release(self, key: FlightKey, task_id: str):
+        """Forget the running job once it has finished"""
+        if self._leaders.get(key) == task_id:
+            del self._leaders[key]
+
+    async def run_leader(self, key: FlightKey, task_id: str, fn: Callable[..., Awaitable], *args):
+        """Run a background job as the leader for its key, releasing the key when done"""
+        try:
+            await fn(task_id, *args)
+        finally:
+            self.release(key, task_id)
+
+    async def run(self, key: FlightKey, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn() once for all concurrent callers with the same key.
+        Every caller gets its own deep copy of the result so it can be modified freely.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced[key[0]] += 1
+            call.waiters += 1
+            result = await asyncio.shield(call.future)
+            return copy.deepcopy(result)
+
+        call = _Call(asyncio.get_running_loop().create_future())
+        self._calls[key] = call
+        self.started[key[0]] += 1
+        try:
+            result = await fn()
+        except BaseException as e:
+            if call.waiters:
+                call.future.set_exception(e)
+            else:
+                call.future.cancel()
+            raise
+        else:
+            call.future.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict:
+        """Counters of started jobs and duplicate submissions avoided, by job kind"""
+        return {
+            "started": dict(self.started),
+            "coalesced": dict(self.coalesced),
+            "duplicates_avoided": sum(self.coalesced.values()),
+            "in_flight": len(self._leaders) + len(self._calls)
+        }
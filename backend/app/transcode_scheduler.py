@@ -0,0 +1,163 @@
+"""
+CPU-aware scheduling for FFmpeg runs.
+Every FFmpeg invocation (HLS remux, audio extraction, compression) takes a
+thread budget from a shared pool sized to the machine's cores and is
+started with a matching `-threads` option. When the cores are busy, jobs
+wait in priority order - cheap stream copies ahead of audio encodes ahead
+of full video re-encodes - so a remux never sits behind a long encode.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.progress import ProgressCallback, run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# Priorities (lower runs first)
+REMUX = 0
+AUDIO = 1
+ENCODE = 2
+
+PRIORITY_NAMES = {REMUX: "remux", AUDIO: "audio", ENCODE: "encode"}
+
+
+class TranscodeScheduler:
+    """Shared core budget for FFmpeg jobs with a priority wait queue"""
+
+    def __init__(self, cores: Optional[int] = None, encode_threads: Optional[int] = None):
+        cores = cores if cores is not None else settings.transcode_cores
+        self.cores = cores or os.cpu_count() or 1
+        encode_threads = encode_threads if encode_threads is not None else settings.transcode_encode_threads
+        self.encode_threads = min(encode_threads or max(1, self.cores // 2), self.cores)
+        self.available = self.cores
+        self._waiting: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        self._completed = {priority: 0 for priority in PRIORITY_NAMES}
+        self._avg_wait = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._max_wait = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._started = time.monotonic()
+        self._busy_since = self._started
+        self._busy_thread_seconds = 0.0
+
+    def threads_for(self, priority: int) -> int:
+        """Thread budget of a job (stream copies and MP3 encodes are single-threaded)"""
+        return self.encode_threads if priority == ENCODE else 1
+
+    def _account(self):
+        """Accumulate busy thread-time up to now (for average utilization)"""
+        now = time.monotonic()
+        self._busy_thread_seconds += (self.cores - self.available) * (now - self._busy_since)
+        self._busy_since = now
+
+    def _take(self, threads: int):
+        self._account()
+        self.available -= threads
+
+    def _wake(self):
+        while self._waiting:
+            _, _, threads, future = self._waiting[0]
+            if future.cancelled():
+                heapq.heappop(self._waiting)
+                continue
+            if threads > self.available:
+                # Strict priority order: nothing jumps ahead of the head of the queue
+                break
+            heapq.heappop(self._waiting)
+            self._take(threads)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int, threads: Optional[int] = None):
+        """
+        Hold a thread budget for one FFmpeg run; yields the thread count.
+        `threads` overrides the priority's default budget (capped at the cores).
+        """
+        threads = min(threads or self.threads_for(priority), self.cores)
+        queued_at = time.monotonic()
+
+        if not self._waiting and threads <= self.available:
+            self._take(threads)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (priority, next(self._order), threads, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just as we were cancelled - hand the threads back
+                    self._account()
+                    self.available += threads
+                # Jobs queued behind this one may fit now
+                self._wake()
+                raise
+
+        waited = time.monotonic() - queued_at
+        self._avg_wait[priority] = 0.8 * self._avg_wait[priority] + 0.2 * waited
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+        if waited > 1:
+            logger.info(f"{PRIORITY_NAMES[priority]} job waited {waited:.1f}s for {threads} thread(s)")
+
+        self._running[priority] += 1
+        try:
+            yield threads
+        finally:
+            self._running[priority] -= 1
+            self._completed[priority] += 1
+            self._account()
+            self.available += threads
+            self._wake()
+
+    def stats(self) -> Dict:
+        self._account()
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        queued = {priority: 0 for priority in PRIORITY_NAMES}
+        for priority, _, _, future in self._waiting:
+            if not future.cancelled():
+                queued[priority] += 1
+        return {
+            "cores": self.cores,
+            "busy_threads": self.cores - self.available,
+            "utilization": round((self.cores - self.available) / self.cores * 100, 1),
+            "avg_utilization": round(self._busy_thread_seconds / (self.cores * elapsed) * 100, 1),
+            "jobs": {
+                name: {
+                    "threads": self.threads_for(priority),
+                    "running": self._running[priority],
+                    "queued": queued[priority],
+                    "completed": self._completed[priority],
+                    "avg_wait_seconds": round(self._avg_wait[priority], 2),
+                    "max_wait_seconds": round(self._max_wait[priority], 2)
+                }
+                for priority, name in PRIORITY_NAMES.items()
+            }
+        }
+
+
+# Shared by every FFmpeg call site
+transcode_scheduler = TranscodeScheduler()
+
+
+async def run_transcode(
+    cmd: List[str],
+    priority: int,
+    on_progress: Optional[ProgressCallback] = None,
+    duration: Optional[float] = None,
+    stdin: Optional[AsyncIterator[bytes]] = None,
+    threads: Optional[int] = None
+) -> Tuple[int, str]:
+    """
+    Run an FFmpeg command once the scheduler grants it a thread budget.
+
+    `cmd` ends with the output file; `-threads` is added just before it.
+    Returns the same (return code, stderr tail) as run_ffmpeg.
+    """
+    async with transcode_scheduler.slot(priority, threads) as threads:
+        return await run_ffmpeg([*cmd[:-1], '-threads', str(threads), cmd[-1]], on_progress, duration, stdin)
@@ -0,0 +1,71 @@
+"""
+URL helpers shared by caches and job de-duplication.
+"""
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that never change what a page serves
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid', 'ref_src', 'si', 'feature'
+})
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Absolute expiry timestamps used by common CDNs (googlevideo `expire=`,
+# CloudFront `Expires=`, Akamai `exp=` tokens)
+_EXPIRY_RE = re.compile(r'(?:^|[?&~;])(?:expire|expires|expiry|exp)=(\d{9,13})(?=$|[&~;#])', re.IGNORECASE)
+_AMZ_DATE_RE = re.compile(r'[?&]X-Amz-Date=(\d{8}T\d{6}Z)', re.IGNORECASE)
+_AMZ_EXPIRES_RE = re.compile(r'[?&]X-Amz-Expires=(\d+)', re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a page URL for cache and de-duplication keys.
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def url_expiry(url: str) -> Optional[float]:
+    """
+    Expiry time (epoch seconds) advertised by a signed media URL, if any
+    """
+    match = _EXPIRY_RE.search(url)
+    if match:
+        value = int(match.group(1))
+        # Some CDNs use milliseconds
+        return value / 1000 if value > 10 ** 12 else float(value)
+
+    amz_date = _AMZ_DATE_RE.search(url)
+    amz_expires = _AMZ_EXPIRES_RE.search(url)
+    if amz_date and amz_expires:
+        signed_at = datetime.strptime(amz_date.group(1), '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+        return signed_at.timestamp() + int(amz_expires.group(1))
+
+    return None
+
+
+def seconds_until_expiry(url: str, now: Optional[float] = None) -> Optional[float]:
+    """Seconds left before a signed URL expires (negative if already expired)"""
+    expiry = url_expiry(url)
+    if expiry is None:
+        return None
+    return expiry - (now if now is not None else time.time())
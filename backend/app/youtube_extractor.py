@@ -4,15 +4,28 @@ Extracts video/audio URLs from YouTube videos and Shorts
 Downloads and merges video+audio streams when needed
 """
 import logging
-import asyncio
-import json
-import os
+import re
 import uuid
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict
 from pathlib import Path
 
+from app.config import settings
+from app.ytdlp_pool import ytdlp_pool, YtDlpError, YtDlpTimeout
+from app.metadata_cache import video_metadata, metadata_from_info
+from app.download_cache import youtube_download_cache
+from app.format_index import FormatIndex, format_indexes
+from app.playlist_enumerator import playlist_enumerator
+
 logger = logging.getLogger(__name__)
 
+_VIDEO_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/live/|/embed/)([A-Za-z0-9_-]{11})')
+
+
+def youtube_video_id(url: str) -> Optional[str]:
+    """11-character video ID from a watch/shorts/youtu.be URL"""
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
 
 class YouTubeExtractor:
     """Extract video/audio URLs from YouTube using yt-dlp"""
@@ -20,6 +33,8 @@ class YouTubeExtractor:
     def __init__(self):
         self.download_dir = Path("/tmp/youtube_downloads")
         self.download_dir.mkdir(exist_ok=True)
+        self.download_cache = youtube_download_cache
+        self.playlist_enumerator = playlist_enumerator
     
     async def extract(self, url: str) -> Dict:
         """
@@ -49,43 +64,13 @@ class YouTubeExtractor:
                     "error": "Could not extract video information",
                     "status_code": 404
                 }
+            video_metadata.update(info)
             
-            # Get available formats
-            formats = info.get("formats", [])
-            
-            # Find best video+audio combined format (usually format 22 or 18)
-            # YouTube provides combined formats up to 720p (format 22) or 360p (format 18)
-            best_combined = None
-            for fmt in formats:
-                vcodec = fmt.get("vcodec", "none")
-                acodec = fmt.get("acodec", "none")
-                # Must have both video and audio codecs
-                if vcodec and vcodec != "none" and acodec and acodec != "none":
-                    height = fmt.get("height") or 0
-                    # Prefer higher quality combined formats
-                    if not best_combined or height > (best_combined.get("height") or 0):
-                        best_combined = fmt
-                        logger.debug(f"Found combined format: {fmt.get('format_id')} - {height}p")
-            
-            # Find best video-only format
-            best_video = None
-            for fmt in formats:
-                vcodec = fmt.get("vcodec", "none")
-                acodec = fmt.get("acodec", "none")
-                if vcodec and vcodec != "none" and (not acodec or acodec == "none"):
-                    height = fmt.get("height") or 0
-                    if not best_video or height > (best_video.get("height") or 0):
-                        best_video = fmt
-            
-            # Find best audio-only format
-            best_audio = None
-            for fmt in formats:
-                acodec = fmt.get("acodec", "none")
-                vcodec = fmt.get("vcodec", "none")
-                if acodec and acodec != "none" and (not vcodec or vcodec == "none"):
-                    abr = fmt.get("abr") or 0
-                    if not best_audio or abr > (best_audio.get("abr") or 0):
-                        best_audio = fmt
+            # One pass over the formats, cached for the quality selector and downloads
+            index = format_indexes.update(info) or FormatIndex(info.get("id") or "", info)
+            best_combined = index.best_combined
+            best_video = index.best_video
+            best_audio = index.best_audio
             
             # Prepare result with all available options
             result = {
@@ -99,17 +84,17 @@ class YouTubeExtractor:
             
             # Add combined format (best for direct download)
             if best_combined:
-                result["video_url"] = best_combined.get("url")
-                result["combined_download_url"] = best_combined.get("url")
-                result["video_quality"] = f"{best_combined.get('height', '?')}p"
-                result["video_format"] = best_combined.get("ext", "mp4")
+                result["video_url"] = best_combined["url"]
+                result["combined_download_url"] = best_combined["url"]
+                result["video_quality"] = f"{best_combined['height'] or '?'}p"
+                result["video_format"] = best_combined["container"] or "mp4"
                 result["format_type"] = "video"
                 logger.info(f"Found combined format: {result['video_quality']}")
             
             # Add separate video stream
             if best_video:
-                result["video_only_url"] = best_video.get("url")
-                result["video_only_quality"] = f"{best_video.get('height', '?')}p"
+                result["video_only_url"] = best_video["url"]
+                result["video_only_quality"] = f"{best_video['height'] or '?'}p"
                 # If no combined format, use video-only as primary
                 if not best_combined:
                     result["video_url"] = best_video.get("url")
@@ -117,8 +102,8 @@ class YouTubeExtractor:
             
             # Add audio stream
             if best_audio:
-                result["audio_url"] = best_audio.get("url")
-                abr = best_audio.get("abr") or best_audio.get("tbr") or 0
+                result["audio_url"] = best_audio["url"]
+                abr = best_audio["abr_kbps"] or best_audio["bitrate_kbps"] or 0
                 result["audio_quality"] = f"{abr:.0f}kbps" if abr else "Best"
             
             # If no combined format, we need to merge video+audio
@@ -169,45 +154,30 @@ class YouTubeExtractor:
     async def _get_video_info(self, url: str) -> Optional[Dict]:
         """Get video information using yt-dlp"""
         try:
-            cmd = [
-                'yt-dlp',
-                '--dump-json',
-                '--no-playlist',
-                '--no-warnings',
-                url
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                info = json.loads(stdout.decode())
-                return info
-            else:
-                logger.error(f"yt-dlp info error: {stderr.decode()}")
-                return None
-                
+            info = await ytdlp_pool.extract_info(url, noplaylist=True)
+            video_metadata.update(info)
+            return info
         except Exception as e:
             logger.error(f"Failed to get video info: {str(e)}")
             return None
     
-    async def get_playlist_info(self, url: str) -> Dict:
+    async def get_playlist_info(self, url: str, offset: int = 0, limit: Optional[int] = None) -> Dict:
         """
         Get playlist information and video list
         
+        Entries come from a shared, cached enumeration: a page is returned as
+        soon as its entries have been listed, without waiting for the rest.
+        
         Args:
             url: YouTube playlist URL or video URL with playlist parameter
+            offset: Index of the first video to return
+            limit: Maximum number of videos to return (None for all)
             
         Returns:
             Dict with playlist title, video count, and list of videos
         """
         try:
-            logger.info(f"Fetching playlist info from: {url}")
+            logger.info(f"Fetching playlist info from: {url} (offset={offset}, limit={limit})")
             
             if not self._is_playlist_url(url):
                 return {
@@ -215,65 +185,38 @@ class YouTubeExtractor:
                     "status_code": 400
                 }
             
-            # Get playlist info using yt-dlp
-            cmd = [
-                'yt-dlp',
-                '--flat-playlist',
-                '--dump-json',
-                '--no-warnings',
-                url
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            enumeration = self.playlist_enumerator.get(url)
+            # One extra entry tells whether another page exists
+            await enumeration.wait_for(offset + limit + 1 if limit is not None else None)
             
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                error_msg = stderr.decode()
-                logger.error(f"Failed to fetch playlist: {error_msg}")
+            if enumeration.error and not enumeration.videos:
                 return {
-                    "error": f"Failed to fetch playlist: {error_msg}",
+                    "error": f"Failed to fetch playlist: {enumeration.error}",
                     "status_code": 500
                 }
             
-            # Parse video entries
-            videos = []
-            for line in stdout.decode().strip().split('\n'):
-                if line:
-                    try:
-                        video_info = json.loads(line)
-                        videos.append({
-                            "id": video_info.get("id"),
-                            "title": video_info.get("title"),
-                            "url": f"https://www.youtube.com/watch?v={video_info.get('id')}",
-                            "duration": video_info.get("duration"),
-                            "thumbnail": video_info.get("thumbnail"),
-                            "uploader": video_info.get("uploader")
-                        })
-                    except json.JSONDecodeError:
-                        continue
-            
-            if not videos:
+            if enumeration.complete and not enumeration.videos:
                 return {
                     "error": "No videos found in playlist",
                     "status_code": 404
                 }
             
-            # Get playlist title from first video's playlist info
-            playlist_title = videos[0].get("uploader", "YouTube Playlist") if videos else "YouTube Playlist"
+            end = offset + limit if limit is not None else None
+            videos = enumeration.videos[offset:end]
+            has_more = end is not None and (len(enumeration.videos) > end or not enumeration.complete)
             
             result = {
-                "playlist_title": playlist_title,
-                "video_count": len(videos),
+                "playlist_title": enumeration.display_title,
+                "video_count": len(enumeration.videos),
+                "complete": enumeration.complete,
                 "videos": videos,
+                "offset": offset,
+                "limit": limit,
+                "next_offset": end if has_more else None,
                 "status_code": 200
             }
             
-            logger.info(f"Found {len(videos)} videos in playlist")
+            logger.info(f"Returning {len(videos)} of {len(enumeration.videos)} videos in playlist")
             return result
             
         except Exception as e:
@@ -284,32 +227,35 @@ class YouTubeExtractor:
                 "status_code": 500
             }
     
+    async def get_formats(self, url: str) -> Dict:
+        """
+        Format ladder for a video, from the cache while its URLs are valid
+        
+        Returns:
+            Dict with best formats, a ladder grouped by height and audio formats
+        """
+        if not self._is_youtube_url(url) or self._is_playlist_only_url(url):
+            return {"error": "Invalid YouTube URL", "status_code": 400}
+        
+        index = format_indexes.get(youtube_video_id(url))
+        if index is None:
+            info = await self._get_video_info_with_formats(url)
+            if not info:
+                return {"error": "Could not extract video information", "status_code": 404}
+            video_metadata.update(info)
+            index = format_indexes.update(info)
+            if index is None:
+                return {"error": "No formats available", "status_code": 404}
+        
+        return {**index.to_dict(), "status_code": 200}
+    
+    def _is_playlist_only_url(self, url: str) -> bool:
+        return youtube_video_id(url) is None and self._is_playlist_url(url)
+    
     async def _get_video_info_with_formats(self, url: str) -> Optional[Dict]:
         """Get video information with all available formats"""
         try:
-            cmd = [
-                'yt-dlp',
-                '--dump-json',
-                '--no-playlist',
-                '--no-warnings',
-                url
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                info = json.loads(stdout.decode())
-                return info
-            else:
-                logger.error(f"yt-dlp info error: {stderr.decode()}")
-                return None
-                
+            return await ytdlp_pool.extract_info(url, noplaylist=True)
         except Exception as e:
             logger.error(f"Failed to get video info with formats: {str(e)}")
             return None
@@ -317,30 +263,8 @@ class YouTubeExtractor:
     async def _get_best_video_url(self, url: str) -> Optional[str]:
         """Get best quality video URL using yt-dlp"""
         try:
-            cmd = [
-                'yt-dlp',
-                '-f', 'best',
-                '-g',
-                '--no-playlist',
-                '--no-warnings',
-                url
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                video_url = stdout.decode().strip()
-                return video_url
-            else:
-                logger.error(f"yt-dlp video error: {stderr.decode()}")
-                return None
-                
+            info = await ytdlp_pool.extract_info(url, format='best', noplaylist=True)
+            return info.get("url")
         except Exception as e:
             logger.error(f"Failed to get video URL: {str(e)}")
             return None
@@ -348,38 +272,29 @@ class YouTubeExtractor:
     async def _get_best_audio_url(self, url: str) -> Optional[str]:
         """Get best quality audio URL using yt-dlp"""
         try:
-            cmd = [
-                'yt-dlp',
-                '-f', 'bestaudio',
-                '-g',
-                '--no-playlist',
-                '--no-warnings',
-                url
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                audio_url = stdout.decode().strip()
-                return audio_url
-            else:
-                logger.debug(f"yt-dlp audio error: {stderr.decode()}")
-                return None
-                
+            info = await ytdlp_pool.extract_info(url, format='bestaudio', noplaylist=True)
+            return info.get("url")
         except Exception as e:
             logger.debug(f"Failed to get audio URL: {str(e)}")
             return None
     
-    async def download_and_merge(self, url: str, quality: str = "720p", format_type: str = "video") -> Dict:
+    async def download_and_merge(
+        self,
+        url: str,
+        quality: str = "720p",
+        format_type: str = "video",
+        progress: Optional[Callable[[Dict], None]] = None,
+        concurrent_fragments: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
         """
         Download video and audio separately, then merge them with FFmpeg
         This is the most reliable method for YouTube videos
+        
+        `progress` receives yt-dlp progress events while the download runs.
+        `concurrent_fragments` sets how many fragments of a DASH/HLS format
+        are fetched at once (defaults to YOUTUBE_CONCURRENT_FRAGMENTS).
+        `timeout` stops the yt-dlp worker once the download has run that many seconds.
         """
         try:
             logger.info(f"Downloading and merging YouTube video: {url}")
@@ -391,44 +306,23 @@ class YouTubeExtractor:
                     "status_code": 400
                 }
             
-            # Try to update yt-dlp to latest version (helps with 403 errors)
-            try:
-                update_cmd = ['pip3', 'install', '--break-system-packages', '--upgrade', 'yt-dlp']
-                update_process = await asyncio.create_subprocess_exec(
-                    *update_cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                await update_process.communicate()
-                logger.info("yt-dlp updated to latest version")
-            except Exception as e:
-                logger.warning(f"Could not update yt-dlp: {e}")
-            
-            # Generate unique filename
-            video_id = str(uuid.uuid4())[:8]
-            output_file = self.download_dir / f"youtube_{video_id}.mp4"
-            
             # Use yt-dlp to download and merge automatically
             # Format selection based on requested quality and type
             
             if format_type == "audio":
                 # Audio-only download with MP3 conversion
-                output_file = self.download_dir / f"youtube_{video_id}.mp3"
                 format_string = "bestaudio/best"
+                extension = "mp3"
                 logger.info(f"Downloading audio only (MP3)")
                 
-                cmd = [
-                    'yt-dlp',
-                    '-f', format_string,
-                    '-x',  # Extract audio
-                    '--audio-format', 'mp3',
-                    '--audio-quality', '0',  # Best quality
-                    '-o', str(output_file),
-                    '--no-playlist',
-                    '--no-warnings',
-                    '--no-check-certificates',
-                    url
-                ]
+                options = {
+                    'format': format_string,
+                    'postprocessors': [{
+                        'key': 'FFmpegExtractAudio',
+                        'preferredcodec': 'mp3',
+                        'preferredquality': '0'  # Best quality
+                    }]
+                }
             else:
                 # Video download with quality selection
                 quality_map = {
@@ -440,55 +334,70 @@ class YouTubeExtractor:
                 }
                 
                 format_string = quality_map.get(quality, quality_map["720p"])
+                extension = "mp4"
                 logger.info(f"Downloading video with quality: {quality} (format: {format_string})")
                 
-                cmd = [
-                    'yt-dlp',
-                    '-f', format_string,
-                    '--merge-output-format', 'mp4',
-                    '-o', str(output_file),
-                    '--no-playlist',
-                    '--no-warnings',
-                    '--no-check-certificates',
-                    url
-                ]
-            
-            logger.info(f"Running yt-dlp command: {' '.join(cmd)}")
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
+                options = {
+                    'format': format_string,
+                    'merge_output_format': 'mp4'
+                }
             
-            if process.returncode == 0 and output_file.exists():
-                # Get video info
-                info = await self._get_video_info(url)
+            # Outputs are named by content so repeat requests reuse the file
+            video_id = youtube_video_id(url)
+            if video_id:
+                cache_key = self.download_cache.key_for(video_id, format_string, format_type)
+            else:
+                cache_key = str(uuid.uuid4())[:8]
+            output_file = self.download_cache.path_for(cache_key, extension)
+            
+            options.update({
+                # Extracted audio replaces the downloaded extension with .mp3
+                'outtmpl': str(output_file.with_suffix('.%(ext)s')) if format_type == "audio" else str(output_file),
+                'noplaylist': True,
+                'nocheckcertificate': True,
+                # Pick up .part files left by an interrupted run instead of starting over
+                'continuedl': True,
+                'concurrent_fragment_downloads': concurrent_fragments or settings.youtube_concurrent_fragments
+            })
+            
+            async with self.download_cache.lock(cache_key):
+                cached = self.download_cache.lookup(output_file) if video_id else None
+                if cached is not None:
+                    logger.info(f"Serving cached download for {video_id} ({format_type}, {format_string})")
+                    # Stored with the file, so hits served by other workers or after a restart have it too
+                    info = cached.metadata or video_metadata.get(video_id) or {"id": video_id}
+                    return self._download_result(output_file, info, format_type, cache_hit=True)
                 
-                file_size = output_file.stat().st_size
-                file_size_mb = file_size / (1024 * 1024)
+                # The download run's own info dict carries the metadata - no second extraction
+                info = None
+                error_msg = None
+                # A cached format index lets yt-dlp resolve the quality without re-extracting
+                index = format_indexes.get(video_id)
+                try:
+                    if index is not None:
+                        try:
+                            info = await ytdlp_pool.download(
+                                url, progress=progress, info=index.info, timeout=timeout, **options
+                            )
+                        except YtDlpTimeout:
+                            raise
+                        except YtDlpError as e:
+                            logger.info(f"Download from cached formats failed ({e}), extracting again")
+                    if info is None:
+                        info = await ytdlp_pool.download(url, progress=progress, timeout=timeout, **options)
+                        format_indexes.update(info)
+                    video_metadata.update(info)
+                except YtDlpError as e:
+                    error_msg = str(e) or "Unknown error"
                 
-                result = {
-                    "status": "success",
-                    "title": info.get("title", "YouTube Video") if info else "YouTube Video",
-                    "thumbnail": info.get("thumbnail") if info else None,
-                    "duration": info.get("duration") if info else None,
-                    "uploader": info.get("uploader") if info else None,
-                    "file_path": str(output_file),
-                    "file_size": file_size,
-                    "file_size_mb": f"{file_size_mb:.2f}",
-                    "download_url": f"/api/youtube/file/{output_file.name}",
-                    "format_type": format_type,
-                    "file_extension": "mp3" if format_type == "audio" else "mp4",
-                    "status_code": 200
-                }
+                if error_msg is None and output_file.exists():
+                    if video_id:
+                        self.download_cache.add(output_file, metadata_from_info(info or {}))
+                    result = self._download_result(output_file, info, format_type)
+                    logger.info(f"Successfully downloaded and merged: {result['title']} ({result['file_size_mb']} MB)")
+                    return result
                 
-                logger.info(f"Successfully downloaded and merged: {result['title']} ({result['file_size_mb']} MB)")
-                return result
-            else:
-                error_msg = stderr.decode() if stderr else "Unknown error"
+                error_msg = error_msg or "Output file was not created"
                 logger.error(f"yt-dlp download failed: {error_msg}")
                 
                 # Handle specific errors
@@ -505,3 +414,26 @@ class YouTubeExtractor:
             error_msg = str(e)
             logger.error(f"YouTube download and merge failed: {error_msg}")
             return {"error": f"Download failed: {error_msg}", "status_code": 500}
+    
+    def _download_result(self, output_file: Path, info: Optional[Dict], format_type: str, cache_hit: bool = False) -> Dict:
+        """Success response for a finished (or cached) download"""
+        info = info or {}
+        file_size = output_file.stat().st_size
+        file_size_mb = file_size / (1024 * 1024)
+        
+        return {
+            "status": "success",
+            "title": info.get("title", "YouTube Video"),
+            "thumbnail": info.get("thumbnail"),
+            "duration": info.get("duration"),
+            "uploader": info.get("uploader"),
+            "video_id": info.get("id"),
+            "file_path": str(output_file),
+            "file_size": file_size,
+            "file_size_mb": f"{file_size_mb:.2f}",
+            "download_url": f"/api/youtube/file/{output_file.name}",
+            "format_type": format_type,
+            "file_extension": "mp3" if format_type == "audio" else "mp4",
+            "cache_hit": cache_hit,
+            "status_code": 200
+        }
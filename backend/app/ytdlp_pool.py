@@ -0,0 +1,511 @@
+"""
+Persistent yt-dlp worker pool.
+Runs yt-dlp in long-lived worker processes that import it once and keep
+YoutubeDL instances around, instead of spawning the yt-dlp CLI (and paying
+interpreter start-up plus import time) for every info lookup and download.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Options every job runs with (the CLI equivalents were --no-warnings and captured output)
+BASE_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noprogress': True,
+    # A stalled connection fails the job instead of blocking the worker
+    'socket_timeout': settings.ytdlp_socket_timeout
+}
+
+# YoutubeDL instances kept by each worker, keyed by their options
+_worker_ydls: Dict[str, Any] = {}
+MAX_CACHED_YDLS = 8
+
+# Queue the workers report download progress on (set by the initializer)
+_progress_queue = None
+PROGRESS_KEYS = (
+    'status', 'filename', 'downloaded_bytes', 'total_bytes', 'total_bytes_estimate',
+    'speed', 'eta', 'fragment_index', 'fragment_count'
+)
+# Seconds between "downloading" events sent per job
+PROGRESS_INTERVAL = 0.5
+
+# Playlist entries sent to the app per message while enumerating
+PLAYLIST_BATCH_SIZE = 50
+
+# Deadline of the timed download running in this worker, if any
+_job_deadline: Optional[float] = None
+# Seconds a timed-out download gets to unwind before the app kills its worker
+WATCHDOG_GRACE_SECONDS = 30
+
+# Job ids the app stopped waiting for (dict proxy shared with the app, set by the initializer)
+_cancelled_jobs = None
+
+
+class YtDlpError(Exception):
+    """A yt-dlp job failed; the message is yt-dlp's own error text"""
+
+
+class YtDlpTimeout(YtDlpError):
+    """A download ran past its time limit and was stopped in the worker"""
+
+
+class _DeadlineExceeded(KeyboardInterrupt):
+    """
+    Raised in a worker's main thread by the deadline watchdog. A
+    KeyboardInterrupt, so yt-dlp stops its fragment threads as on Ctrl-C.
+    """
+
+
+def _on_deadline_signal(signum, frame):
+    # The timer may fire just as the job finishes - only interrupt a job that is late
+    if _job_deadline is not None and time.monotonic() >= _job_deadline:
+        raise _DeadlineExceeded()
+
+
+def staged_package_path() -> Optional[str]:
+    """Directory of the yt-dlp release staged by the updater, if any"""
+    current = os.path.join(settings.ytdlp_runtime_dir, 'current')
+    return os.path.realpath(current) if os.path.isdir(current) else None
+
+
+def _init_worker(package_path: Optional[str] = None, progress_queue=None, cancelled_jobs=None):
+    """Worker initializer: pay the yt-dlp import cost once per process"""
+    global _progress_queue, _cancelled_jobs
+    _progress_queue = progress_queue
+    _cancelled_jobs = cancelled_jobs
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, _on_deadline_signal)
+    if package_path:
+        # A staged release shadows the one installed with the app
+        sys.path.insert(0, package_path)
+    import yt_dlp  # noqa: F401
+
+
+def _job_cancelled(job_id: str) -> bool:
+    """Whether the app has cancelled this job (consumes the flag)"""
+    return _cancelled_jobs is not None and _cancelled_jobs.pop(job_id, None) is not None
+
+
+def _version_job() -> str:
+    import yt_dlp
+    return yt_dlp.version.__version__
+
+
+def _ydl_for(options: Dict):
+    """Cached YoutubeDL for info jobs with these options"""
+    import yt_dlp
+
+    key = json.dumps(options, sort_keys=True)
+    ydl = _worker_ydls.get(key)
+    if ydl is None:
+        if len(_worker_ydls) >= MAX_CACHED_YDLS:
+            _worker_ydls.pop(next(iter(_worker_ydls))).close()
+        ydl = yt_dlp.YoutubeDL({**BASE_OPTIONS, **options})
+        _worker_ydls[key] = ydl
+    return ydl
+
+
+def _extract_info_job(url: str, options: Dict) -> Dict:
+    ydl = _ydl_for(options)
+    try:
+        info = ydl.extract_info(url, download=False)
+        return ydl.sanitize_info(info)
+    except Exception as e:
+        raise YtDlpError(str(e)) from None
+
+
+def _progress_hooks(job_id: str) -> Dict:
+    """yt-dlp hooks forwarding (throttled) progress events for a job"""
+    last_sent = [0.0]
+
+    def progress_hook(event):
+        now = time.monotonic()
+        if event.get('status') == 'downloading' and now - last_sent[0] < PROGRESS_INTERVAL:
+            return
+        last_sent[0] = now
+        _progress_queue.put((job_id, {key: event.get(key) for key in PROGRESS_KEYS}))
+
+    def postprocessor_hook(event):
+        if event.get('status') == 'started':
+            _progress_queue.put((job_id, {'status': 'postprocessing', 'postprocessor': event.get('postprocessor')}))
+
+    return {'progress_hooks': [progress_hook], 'postprocessor_hooks': [postprocessor_hook]}
+
+
+def _deadline_hook(deadline: float) -> Callable[[Dict], None]:
+    """yt-dlp progress hook that aborts the download once `deadline` has passed"""
+    from yt_dlp.utils import DownloadCancelled
+
+    def hook(event):
+        if time.monotonic() > deadline:
+            raise DownloadCancelled("Time limit exceeded")
+
+    return hook
+
+
+def _start_watchdog(timeout: float) -> Optional[threading.Timer]:
+    """
+    Timer interrupting the worker's main thread when a download's time is
+    up, wherever yt-dlp is stuck (no progress hook runs during extraction,
+    a stalled request or post-processing)
+    """
+    if not hasattr(signal, 'SIGUSR1') or signal.getsignal(signal.SIGUSR1) is not _on_deadline_signal:
+        return None
+    timer = threading.Timer(timeout, os.kill, (os.getpid(), signal.SIGUSR1))
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def _download_job(
+    url: str,
+    options: Dict,
+    job_id: Optional[str] = None,
+    info: Optional[Dict] = None,
+    timeout: Optional[float] = None
+) -> Dict:
+    import yt_dlp
+    global _job_deadline
+
+    hooks = {}
+    if job_id and _progress_queue is not None:
+        # Lets the app find (and if need be kill) the process running the job
+        _progress_queue.put((job_id, {'worker_pid': os.getpid()}))
+        hooks = _progress_hooks(job_id)
+    # The clock starts when a worker picks the job up, not while it waits for one
+    deadline = time.monotonic() + timeout if timeout else None
+    if deadline is not None:
+        hooks['progress_hooks'] = [*hooks.get('progress_hooks', []), _deadline_hook(deadline)]
+    options = {**options, **hooks}
+
+    # Output template differs per download, so these get a fresh instance
+    try:
+        _job_deadline = deadline
+        watchdog = _start_watchdog(timeout) if deadline is not None else None
+        try:
+            with yt_dlp.YoutubeDL({**BASE_OPTIONS, **options}) as ydl:
+                if info is not None:
+                    # Same as --load-info-json: select formats from the earlier extraction
+                    info = ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=True)
+                else:
+                    info = ydl.extract_info(url, download=True)
+                return ydl.sanitize_info(info)
+        finally:
+            _job_deadline = None
+            if watchdog is not None:
+                watchdog.cancel()
+    except _DeadlineExceeded:
+        raise YtDlpTimeout(f"Timed out after {timeout:.0f}s") from None
+    except Exception as e:
+        if deadline is not None and time.monotonic() > deadline:
+            raise YtDlpTimeout(f"Timed out after {timeout:.0f}s") from None
+        raise YtDlpError(str(e)) from None
+
+
+def _playlist_entries_job(url: str, job_id: str) -> int:
+    """
+    Enumerate a playlist without resolving its videos, sending entries in
+    batches as yt-dlp pages through it. Returns the number of entries,
+    stopping early (without a "done" event) when the app cancels the job.
+    """
+    from yt_dlp.utils import PagedList
+
+    if _job_cancelled(job_id):
+        return 0
+    ydl = _ydl_for({'extract_flat': 'in_playlist'})
+    try:
+        # process=False leaves `entries` as the extractor's lazy page generator
+        info = ydl.extract_info(url, download=False, process=False)
+        while info.get('_type') in ('url', 'url_transparent'):
+            info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+
+        _progress_queue.put((job_id, {
+            'playlist': {key: info.get(key) for key in ('id', 'title', 'uploader', 'channel')}
+        }))
+
+        entries = info.get('entries') or []
+        if isinstance(entries, PagedList):
+            entries = entries.getslice()
+
+        count = 0
+        batch = []
+        for entry in entries:
+            if not entry:
+                continue
+            batch.append(ydl.sanitize_info(dict(entry)))
+            if len(batch) >= PLAYLIST_BATCH_SIZE:
+                # Checked between batches so an abandoned enumeration stops paging
+                if _job_cancelled(job_id):
+                    return count
+                _progress_queue.put((job_id, {'entries': batch}))
+                count += len(batch)
+                batch = []
+        if batch:
+            _progress_queue.put((job_id, {'entries': batch}))
+            count += len(batch)
+
+        # Sent on the same queue as the entries, so it arrives after all of them
+        _progress_queue.put((job_id, {'done': True, 'count': count}))
+        return count
+    except Exception as e:
+        raise YtDlpError(str(e)) from None
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class YtDlpPool:
+    """
+    Pool of worker processes running yt-dlp jobs.
+
+    Workers are started with the spawn method (safe next to the event loop
+    and browser threads) and recycled after a number of jobs so memory held
+    by extractors does not accumulate.
+    """
+
+    def __init__(self, size: Optional[int] = None, max_tasks_per_worker: Optional[int] = None):
+        self.size = size or settings.ytdlp_pool_size
+        self.max_tasks_per_worker = max_tasks_per_worker or settings.ytdlp_worker_max_tasks
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._manager = None
+        self._cancelled_jobs = None
+        self._listeners: Dict[str, Tuple[asyncio.AbstractEventLoop, Callable[[Dict], None]]] = {}
+        self.jobs = 0
+        self.failures = 0
+        self.restarts = 0
+
+    def _ensure_progress_queue(self):
+        """Queue shared with every worker generation, drained by a dispatcher thread"""
+        if self._progress_queue is None:
+            self._progress_queue = multiprocessing.get_context('spawn').Queue()
+            threading.Thread(
+                target=self._dispatch_progress,
+                args=(self._progress_queue,),
+                name="ytdlp-progress",
+                daemon=True
+            ).start()
+        return self._progress_queue
+
+    def _ensure_cancelled_jobs(self):
+        """Dict of cancelled job ids the workers check while they run"""
+        if self._cancelled_jobs is None:
+            self._manager = multiprocessing.get_context('spawn').Manager()
+            self._cancelled_jobs = self._manager.dict()
+        return self._cancelled_jobs
+
+    def _dispatch_progress(self, progress_queue):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                break
+            job_id, event = item
+            listener = self._listeners.get(job_id)
+            if listener is not None:
+                loop, callback = listener
+                loop.call_soon_threadsafe(callback, event)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        kwargs = {}
+        if sys.version_info >= (3, 11):
+            kwargs['max_tasks_per_child'] = self.max_tasks_per_worker
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(staged_package_path(), self._ensure_progress_queue(), self._ensure_cancelled_jobs()),
+            **kwargs
+        )
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    async def start(self):
+        """Start the workers and import yt-dlp in each of them"""
+        executor = self._ensure_executor()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.size)))
+        logger.info(f"yt-dlp worker pool ready ({len(set(pids))} worker(s))")
+
+    async def stop(self):
+        """Stop the workers, cancelling jobs that have not started"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+        progress_queue, self._progress_queue = self._progress_queue, None
+        if progress_queue is not None:
+            progress_queue.put(None)
+        manager, self._manager, self._cancelled_jobs = self._manager, None, None
+        if manager is not None:
+            manager.shutdown()
+
+    def reload(self):
+        """
+        Replace the workers. New jobs go to fresh processes (which pick up
+        a newly staged yt-dlp); the old ones finish their current jobs and exit.
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self.restarts += 1
+
+    async def _submit(self, fn, *args):
+        executor = self._ensure_executor()
+        self.jobs += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self.failures += 1
+            logger.warning("yt-dlp worker died - restarting pool")
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+            raise YtDlpError("yt-dlp worker process crashed")
+        except YtDlpError:
+            self.failures += 1
+            raise
+
+    async def version(self) -> str:
+        """yt-dlp version the workers are running"""
+        return await self._submit(_version_job)
+
+    async def extract_info(self, url: str, **options) -> Dict:
+        """Info dict for a URL (like `yt-dlp --dump-json`)"""
+        return await self._submit(_extract_info_job, url, options)
+
+    async def download(
+        self,
+        url: str,
+        progress: Optional[Callable[[Dict], None]] = None,
+        info: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        **options
+    ) -> Dict:
+        """
+        Download a URL with the given YoutubeDL options; returns its info dict.
+        `progress` is called on the event loop with yt-dlp progress events.
+        `info` is an earlier extraction of the URL to download from instead
+        of extracting again.
+        `timeout` stops the download inside the worker once it has run that
+        many seconds (raising YtDlpTimeout); the .part file is kept for a retry.
+        A worker that does not stop within WATCHDOG_GRACE_SECONDS after that
+        is killed and the pool recycled.
+        """
+        if progress is None and timeout is None:
+            return await self._submit(_download_job, url, options, None, info, timeout)
+
+        job_id = uuid.uuid4().hex
+        started = asyncio.Event()
+        worker = {}
+
+        def on_event(event: Dict):
+            if 'worker_pid' in event:
+                worker['pid'] = event['worker_pid']
+                started.set()
+            elif progress is not None:
+                progress(event)
+
+        self._listeners[job_id] = (asyncio.get_running_loop(), on_event)
+        job = asyncio.ensure_future(self._submit(_download_job, url, options, job_id, info, timeout))
+        try:
+            if timeout is None:
+                return await job
+            # Queued jobs have not started their clock; wait for a worker to pick this one up
+            waiting = asyncio.ensure_future(started.wait())
+            await asyncio.wait({job, waiting}, return_when=asyncio.FIRST_COMPLETED)
+            waiting.cancel()
+            if job.done():
+                return job.result()
+            try:
+                return await asyncio.wait_for(asyncio.shield(job), timeout + WATCHDOG_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                self._terminate_worker(worker['pid'])
+                # Fails with the crashed worker (or finishes if it got there first)
+                with suppress(YtDlpError):
+                    await job
+                raise YtDlpTimeout(f"Timed out after {timeout:.0f}s; worker {worker['pid']} was killed") from None
+        finally:
+            self._listeners.pop(job_id, None)
+            if not job.done():
+                job.cancel()
+
+    def _terminate_worker(self, pid: int):
+        """Kill a worker stuck in a job; the other workers are replaced with it"""
+        logger.warning(f"yt-dlp worker {pid} did not stop at its job's deadline - terminating it")
+        # The executor is unusable once one of its processes is killed
+        self.reload()
+        with suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGTERM)
+
+    async def stream_playlist(self, url: str) -> AsyncIterator[Dict]:
+        """
+        Enumerate a playlist, yielding events as the worker pages through it:
+        {"playlist": {...}} once, then {"entries": [...]} batches.
+        """
+        job_id = uuid.uuid4().hex
+        events: asyncio.Queue = asyncio.Queue()
+        self._listeners[job_id] = (asyncio.get_running_loop(), events.put_nowait)
+        self._ensure_executor()
+        job = asyncio.ensure_future(self._submit(_playlist_entries_job, url, job_id))
+        try:
+            while True:
+                if job.done():
+                    # Re-raises the worker's error; on success the remaining events are in flight
+                    job.result()
+                    event = await asyncio.wait_for(events.get(), timeout=10)
+                else:
+                    next_event = asyncio.ensure_future(events.get())
+                    await asyncio.wait({next_event, job}, return_when=asyncio.FIRST_COMPLETED)
+                    if not next_event.done():
+                        next_event.cancel()
+                        continue
+                    event = next_event.result()
+                if event.get('done'):
+                    break
+                yield event
+        finally:
+            self._listeners.pop(job_id, None)
+            if not job.done():
+                # Cancelling `job` would only stop waiting; the worker has to be told to stop paging
+                self._ensure_cancelled_jobs()[job_id] = True
+                job.add_done_callback(lambda done: self._forget_cancelled(job_id, done))
+
+    def _forget_cancelled(self, job_id: str, job: asyncio.Future):
+        """Drop the cancel flag of a job that finished before checking it"""
+        if not job.cancelled():
+            job.exception()
+        if self._cancelled_jobs is not None:
+            self._cancelled_jobs.pop(job_id, None)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.size,
+            "running": self._executor is not None,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "jobs": self.jobs,
+            "failures": self.failures,
+            "restarts": self.restarts
+        }
+
+
+# Shared pool used by YouTubeExtractor
+ytdlp_pool = YtDlpPool()
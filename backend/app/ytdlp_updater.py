@@ -0,0 +1,189 @@
+"""
+Background yt-dlp updater.
+Checks PyPI for new yt-dlp releases on a schedule (or on demand from the
+admin endpoint), installs them into a staging directory next to the
+running release and atomically swaps the `current` symlink. The worker
+pool is then reloaded so new jobs use the new release; downloads never
+wait for the updater.
+
+Layout under YTDLP_RUNTIME_DIR:
+    versions/<version>/   pip --target installs
+    current -> versions/<version>
+"""
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.ytdlp_pool import ytdlp_pool, YtDlpPool
+
+logger = logging.getLogger(__name__)
+
+PYPI_URL = "https://pypi.org/pypi/yt-dlp/json"
+
+# Releases kept on disk: the current one and the one before it (old workers
+# may still be finishing jobs with it)
+KEEP_VERSIONS = 2
+
+
+class YtDlpUpdater:
+    """Stages yt-dlp upgrades and hands them to the worker pool"""
+
+    def __init__(self, pool: Optional[YtDlpPool] = None, runtime_dir: Optional[str] = None):
+        self.pool = pool or ytdlp_pool
+        self.runtime_dir = Path(runtime_dir or settings.ytdlp_runtime_dir)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.current_version: Optional[str] = None
+        self.latest_version: Optional[str] = None
+        self.last_check: Optional[float] = None
+        self.last_result: Optional[str] = None
+
+    @property
+    def versions_dir(self) -> Path:
+        return self.runtime_dir / "versions"
+
+    @property
+    def current_link(self) -> Path:
+        return self.runtime_dir / "current"
+
+    def start(self):
+        """Start the periodic update check (no-op when the interval is 0)"""
+        if settings.ytdlp_update_interval_hours > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_periodically(self):
+        interval = settings.ytdlp_update_interval_hours * 3600
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check_and_update()
+            except Exception as e:
+                logger.warning(f"yt-dlp update check failed: {e}")
+
+    def trigger(self) -> bool:
+        """Start an update check in the background; False if one is already running"""
+        if self._lock.locked():
+            return False
+        asyncio.create_task(self._check_and_log())
+        return True
+
+    async def _check_and_log(self):
+        try:
+            await self.check_and_update()
+        except Exception as e:
+            logger.warning(f"yt-dlp update failed: {e}")
+
+    async def check_and_update(self) -> str:
+        """Install the latest yt-dlp release if it is newer than the running one"""
+        async with self._lock:
+            self.last_check = time.time()
+            try:
+                self.current_version = await self.pool.version()
+                self.latest_version = await self._latest_version()
+
+                if self.latest_version == self.current_version:
+                    self.last_result = f"up to date ({self.current_version})"
+                    return self.last_result
+
+                await self._stage(self.latest_version)
+                self._activate(self.latest_version)
+                self.pool.reload()
+                self._prune()
+
+                self.last_result = f"updated {self.current_version} -> {self.latest_version}"
+                self.current_version = self.latest_version
+                logger.info(f"yt-dlp {self.last_result}")
+                return self.last_result
+            except Exception as e:
+                self.last_result = f"failed: {e}"
+                raise
+
+    async def _latest_version(self) -> str:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.get(PYPI_URL)
+            response.raise_for_status()
+            return response.json()["info"]["version"]
+
+    async def _stage(self, version: str):
+        """pip-install a release into its own directory without touching the running one"""
+        target = self.versions_dir / version
+        if target.exists():
+            return
+
+        # Per-process staging directory: every gunicorn worker runs its own updater
+        partial = self.versions_dir / f"{version}.{os.getpid()}.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir(parents=True)
+
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'pip', 'install',
+            '--quiet', '--no-deps', '--disable-pip-version-check',
+            '--target', str(partial),
+            f'yt-dlp=={version}',
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise RuntimeError(f"pip install failed: {stderr.decode()[-500:]}")
+
+        try:
+            os.rename(partial, target)
+        except OSError:
+            if not target.exists():
+                raise
+            # Another worker staged the same release first
+            shutil.rmtree(partial, ignore_errors=True)
+
+    def _activate(self, version: str):
+        """Point `current` at a staged release with an atomic rename"""
+        temp_link = self.runtime_dir / f"current.{os.getpid()}.tmp"
+        if temp_link.is_symlink():
+            temp_link.unlink()
+        os.symlink(Path("versions") / version, temp_link)
+        os.replace(temp_link, self.current_link)
+
+    def _prune(self):
+        """Remove staged releases beyond the newest KEEP_VERSIONS"""
+        current = os.path.realpath(self.current_link)
+        staged = sorted(
+            (p for p in self.versions_dir.iterdir() if p.is_dir() and not p.name.endswith(".partial")),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        for old in staged[KEEP_VERSIONS:]:
+            if str(old.resolve()) != current:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def status(self) -> Dict:
+        return {
+            "current_version": self.current_version,
+            "latest_version": self.latest_version,
+            "staged_path": str(self.current_link.resolve()) if self.current_link.exists() else None,
+            "last_check": self.last_check,
+            "last_result": self.last_result,
+            "updating": self._lock.locked(),
+            "interval_hours": settings.ytdlp_update_interval_hours
+        }
+
+
+# Shared updater for the app's worker pool
+ytdlp_updater = YtDlpUpdater()
@@ -0,0 +1,82 @@
+"""
+Benchmark: sequential vs concurrent HLS segment fetching.
+
+Serves a generated VOD playlist from a local HTTP server that adds a fixed
+latency to every segment request (like a distant CDN edge), then times
+fetch_hls at different concurrency levels.
+
+    cd backend && python -m benchmarks.bench_hls_fetch [--segments 60] [--latency 0.08]
+"""
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from app.hls_fetcher import fetch_hls
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Playlist plus `segments` segments of `segment_kb` KB, each delayed by `latency`"""
+
+    def __init__(self, *args, segments: int, segment_kb: int, latency: float, **kwargs):
+        self.segments = segments
+        self.segment = b"\x47" * (segment_kb * 1024)
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == "/index.m3u8":
+            lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:4"]
+            for i in range(self.segments):
+                lines += ["#EXTINF:4.0,", f"seg{i}.ts"]
+            body = ("\n".join(lines + ["#EXT-X-ENDLIST"]) + "\n").encode()
+        else:
+            time.sleep(self.latency)
+            body = self.segment
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def run(url: str, concurrency_levels, total_mb: float):
+    baseline = None
+    for concurrency in concurrency_levels:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            await fetch_hls(url, Path(directory), concurrency)
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"concurrency={concurrency:<3} {elapsed:6.2f}s  {total_mb / elapsed:7.1f} MB/s  "
+              f"x{baseline / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=60)
+    parser.add_argument("--segment-kb", type=int, default=512)
+    parser.add_argument("--latency", type=float, default=0.08, help="seconds added per segment request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    handler = partial(FixtureHandler, segments=args.segments, segment_kb=args.segment_kb, latency=args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/index.m3u8"
+        total_mb = args.segments * args.segment_kb / 1024
+        print(f"{args.segments} segments x {args.segment_kb} KB, {args.latency * 1000:.0f} ms latency")
+        asyncio.run(run(url, args.concurrency, total_mb))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
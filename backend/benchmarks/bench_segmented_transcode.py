@@ -0,0 +1,81 @@
+"""
+Benchmark: single-process vs segmented compression.
+
+Generates a test clip with FFmpeg's lavfi sources (moving test pattern plus
+a sine tone), then times the "medium" compression encode as one FFmpeg
+process and as parallel keyframe-split segments. Requires ffmpeg on PATH.
+
+    cd backend && python -m benchmarks.bench_segmented_transcode [--duration 600] [--segments 2 4 8]
+"""
+import argparse
+import asyncio
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from app.segmented_transcode import segmented_transcode
+from app.transcode_scheduler import run_transcode, transcode_scheduler, ENCODE
+
+# Same options as the "medium" compression preset
+VIDEO_ARGS = [
+    '-vf', "scale=854:480:force_original_aspect_ratio=decrease,pad=854:480:(ow-iw)/2:(oh-ih)/2",
+    '-c:v', 'libx264', '-b:v', '1000k', '-preset', 'medium'
+]
+AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '128k']
+
+
+def generate_clip(path: Path, duration: int, size: str):
+    """Test pattern with a keyframe every 2 seconds, like typical uploads"""
+    subprocess.run([
+        'ffmpeg', '-v', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={size}:rate=30:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '60',
+        '-c:a', 'aac', '-shortest', '-y', str(path)
+    ], check=True)
+
+
+async def run(clip: Path, duration: float, segment_counts):
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / "single.mp4"
+        start = time.perf_counter()
+        returncode, stderr = await run_transcode(
+            ['ffmpeg', '-i', str(clip), *VIDEO_ARGS, *AUDIO_ARGS, '-movflags', '+faststart', '-y', str(output)],
+            ENCODE
+        )
+        baseline = time.perf_counter() - start
+        if returncode != 0:
+            raise SystemExit(f"single-process encode failed: {stderr}")
+        print(f"single process     {baseline:7.2f}s  {output.stat().st_size / 2 ** 20:6.1f} MB")
+
+        for segments in segment_counts:
+            output = Path(directory) / f"segmented_{segments}.mp4"
+            start = time.perf_counter()
+            returncode, stderr = await segmented_transcode(
+                str(clip), output, VIDEO_ARGS, AUDIO_ARGS, duration, segments
+            )
+            elapsed = time.perf_counter() - start
+            if returncode != 0:
+                raise SystemExit(f"segmented encode ({segments}) failed: {stderr}")
+            print(f"segments={segments:<3}       {elapsed:7.2f}s  {output.stat().st_size / 2 ** 20:6.1f} MB  "
+                  f"x{baseline / elapsed:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=int, default=600, help="clip length in seconds")
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--segments", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        clip = Path(directory) / "clip.mp4"
+        print(f"Generating {args.duration}s {args.size} test clip...")
+        generate_clip(clip, args.duration, args.size)
+        print(f"{transcode_scheduler.cores} cores, {transcode_scheduler.encode_threads} threads per single encode")
+        asyncio.run(run(clip, args.duration, args.segments))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.browser_pool import BrowserPool
+
+
+def _fake_playwright():
+    """Playwright stand-in whose chromium.launch returns fresh fake browsers"""
+    def make_browser(*args, **kwargs):
+        browser = MagicMock()
+        browser.is_connected.return_value = True
+        browser.new_context = AsyncMock(side_effect=lambda **kwargs: AsyncMock())
+        browser.close = AsyncMock()
+        return browser
+
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(side_effect=make_browser)
+    playwright.stop = AsyncMock()
+
+    starter = MagicMock()
+    starter.start = AsyncMock(return_value=playwright)
+    return starter, playwright
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_warm_browser():
+    """Consecutive leases share one browser but get separate contexts"""
+    starter, playwright = _fake_playwright()
+    pool = BrowserPool(size=2, warmup=1, recycle_pages=0, recycle_memory_mb=0)
+
+    with patch('app.browser_pool.async_playwright', return_value=starter):
+        await pool.start()
+        async with pool.context() as first:
+            pass
+        async with pool.context() as second:
+            pass
+
+    assert playwright.chromium.launch.await_count == 1
+    assert first is not second
+    first.close.assert_awaited()
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_pool_recycles_after_page_limit():
+    """A browser that served recycle_pages contexts is closed and replaced"""
+    starter, playwright = _fake_playwright()
+    pool = BrowserPool(size=1, warmup=1, recycle_pages=2, recycle_memory_mb=0)
+
+    with patch('app.browser_pool.async_playwright', return_value=starter):
+        await pool.start()
+        for _ in range(3):
+            async with pool.context():
+                pass
+
+    assert playwright.chromium.launch.await_count == 2
+    assert pool.stats()["alive"] == 1
+    await pool.stop()
@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app import youtube_extractor
+from app.download_cache import DownloadCache
+from app.youtube_extractor import YouTubeExtractor
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.mark.asyncio
+async def test_repeat_request_reuses_cached_file(monkeypatch, tmp_path):
+    """Same video, format and type is downloaded once and then served from disk"""
+    extractor = YouTubeExtractor()
+    extractor.download_cache = DownloadCache(tmp_path, max_mb=10, min_age_seconds=0)
+
+    async def fake_download(url, **options):
+        with open(options["outtmpl"], "wb") as f:
+            f.write(b"x" * 1000)
+        return {"id": "dQw4w9WgXcQ", "title": "Clip"}
+
+    download = AsyncMock(side_effect=fake_download)
+    monkeypatch.setattr(youtube_extractor.ytdlp_pool, "download", download)
+
+    first = await extractor.download_and_merge(URL, "720p")
+    second = await extractor.download_and_merge(URL, "720p")
+    other_quality = await extractor.download_and_merge(URL, "360p")
+
+    assert download.await_count == 2
+    assert second["cache_hit"] and not first["cache_hit"]
+    assert second["download_url"] == first["download_url"] != other_quality["download_url"]
+    assert extractor.download_cache.stats()["bytes_saved"] == 1000
+    assert second["title"] == "Clip"
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_in_another_worker_keeps_metadata(monkeypatch, tmp_path):
+    """Metadata is stored next to the file, not only in the per-process metadata cache"""
+    async def fake_download(url, **options):
+        with open(options["outtmpl"], "wb") as f:
+            f.write(b"x" * 1000)
+        return {"id": "dQw4w9WgXcQ", "title": "Clip", "duration": 212, "thumbnail": "https://i.ytimg.com/t.jpg"}
+
+    monkeypatch.setattr(youtube_extractor.ytdlp_pool, "download", AsyncMock(side_effect=fake_download))
+    first = YouTubeExtractor()
+    first.download_cache = DownloadCache(tmp_path, max_mb=10, min_age_seconds=0)
+    await first.download_and_merge(URL, "720p")
+
+    # A fresh worker: its in-memory metadata cache knows nothing about the video
+    monkeypatch.setattr(youtube_extractor.video_metadata, "get", lambda video_id: None)
+    other = YouTubeExtractor()
+    other.download_cache = DownloadCache(tmp_path, max_mb=10, min_age_seconds=0)
+    hit = await other.download_and_merge(URL, "720p")
+
+    assert hit["cache_hit"]
+    assert (hit["title"], hit["duration"], hit["thumbnail"]) == ("Clip", 212, "https://i.ytimg.com/t.jpg")
+    assert other.download_cache.stats()["entries"] == 1
+
+
+def test_eviction_skips_pinned_and_recent_files(tmp_path):
+    """LRU eviction never removes files being served"""
+    cache = DownloadCache(tmp_path, max_mb=1, min_age_seconds=0)
+    paths = []
+    for name in ("a", "b", "c"):
+        path = cache.path_for(name, "mp4")
+        path.write_bytes(b"x" * 400 * 1024)
+        paths.append(path)
+        if name == "a":
+            cache.add(path)
+            assert cache.acquire(path.name)
+        else:
+            cache.add(path)
+
+    # Over budget: "a" is oldest but pinned, so "b" goes instead
+    assert paths[0].exists()
+    assert not paths[1].exists()
+    assert cache.stats()["evictions"] == 1
+
+    cache.release(paths[0].name)
+    cache.max_bytes = 500 * 1024
+    cache.evict()
+    assert not paths[0].exists() and paths[2].exists()
+
+
+def test_existing_files_are_indexed_on_startup(tmp_path):
+    path = tmp_path / "youtube_abc.mp4"
+    path.write_bytes(b"data")
+    (tmp_path / "youtube_def.mp4.part").write_bytes(b"partial")
+
+    cache = DownloadCache(tmp_path, max_mb=10)
+
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup(path) is not None
+
+
+def test_files_served_by_another_worker_are_not_evicted(tmp_path):
+    """Pins are file locks, so they hold across processes sharing the directory"""
+    serving = DownloadCache(tmp_path, max_mb=1, min_age_seconds=0)
+    other = DownloadCache(tmp_path, max_mb=1, min_age_seconds=0)
+    pinned = serving.path_for("a", "mp4")
+    pinned.write_bytes(b"x" * 800 * 1024)
+    assert serving.acquire(pinned.name)
+
+    newer = other.path_for("b", "mp4")
+    newer.write_bytes(b"x" * 800 * 1024)
+    other.add(newer)
+    # The oldest file is pinned by the other instance, so the newer one goes
+    assert pinned.exists() and not newer.exists()
+
+    serving.release(pinned.name)
+    newer.write_bytes(b"x" * 800 * 1024)
+    other.add(newer)
+    assert not pinned.exists() and newer.exists()
+    assert not other.acquire(pinned.name)
+
+
+@pytest.mark.asyncio
+async def test_key_lock_is_shared_between_workers(tmp_path):
+    first = DownloadCache(tmp_path, max_mb=10)
+    second = DownloadCache(tmp_path, max_mb=10)
+    order = []
+
+    async def worker(cache, name, hold):
+        async with cache.lock("key"):
+            order.append(f"{name} start")
+            await asyncio.sleep(hold)
+            order.append(f"{name} end")
+
+    await asyncio.gather(worker(first, "first", 0.2), worker(second, "second", 0))
+    assert order == ["first start", "first end", "second start", "second end"]
+
+
+def test_only_finished_outputs_count_as_cached(tmp_path):
+    for name in ("youtube_abc.f137.mp4", "youtube_abc.temp.mp4", "youtube_abc.mp4.part"):
+        (tmp_path / name).write_bytes(b"partial")
+    cache = DownloadCache(tmp_path, max_mb=10)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,54 @@
+import time
+import pytest
+from app.extraction_cache import ExtractionCache
+from app.models import MediaFile
+from app.url_utils import normalize_url, url_expiry
+
+
+def test_normalize_url():
+    """Equivalent page URLs share one normalized form"""
+    assert normalize_url("HTTPS://Example.com:443/watch/?b=2&a=1&utm_source=x#t=10") == \
+        normalize_url("https://example.com/watch?a=1&b=2")
+    assert normalize_url("https://example.com/a?id=1") != normalize_url("https://example.com/a?id=2")
+
+
+def test_url_expiry_hints():
+    """Expiry is read from expire=/Expires= params and AWS signatures"""
+    assert url_expiry("https://r1.googlevideo.com/videoplayback?expire=1900000000&ei=x") == 1900000000
+    assert url_expiry("https://d1.cloudfront.net/v.mp4?Expires=1900000000&Signature=abc") == 1900000000
+    assert url_expiry(
+        "https://bucket.s3.amazonaws.com/v.mp4?X-Amz-Date=20300101T000000Z&X-Amz-Expires=3600"
+    ) == 1893456000 + 3600
+    assert url_expiry("https://example.com/video.mp4") is None
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_and_ttl_from_signed_url():
+    """Entries are served until the media URL's expiry hint (minus margin)"""
+    cache = ExtractionCache(max_entries=10, default_ttl=600, max_ttl=3600, redis_url="")
+    expiring = MediaFile(
+        url=f"https://cdn.example.com/v.mp4?expire={int(time.time()) + 300}",
+        type="video/mp4",
+        extension=".mp4",
+        cookies=[{"name": "session", "value": "abc"}],
+        headers={"Referer": "https://example.com/watch"}
+    )
+
+    await cache.set("https://example.com/watch?utm_campaign=x", [expiring])
+    cached = await cache.get("https://example.com/watch")
+
+    assert cached[0].url == expiring.url
+    assert cached[0].cookies == expiring.cookies
+    assert 200 < cache.ttl_for([expiring]) <= 300
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_skips_nearly_expired_media():
+    """Media whose signature is about to lapse is not cached"""
+    cache = ExtractionCache(max_entries=10, default_ttl=600, max_ttl=3600, redis_url="")
+    stale = MediaFile(url=f"https://cdn.example.com/v.mp4?expire={int(time.time()) + 10}", type="video/mp4", extension=".mp4")
+
+    await cache.set("https://example.com/watch", [stale])
+
+    assert await cache.get("https://example.com/watch") is None
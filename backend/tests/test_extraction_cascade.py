@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.extraction_cascade import ExtractionCascade, DomainTierStats
+from app.models import MediaFile
+
+
+class FakeBrowserExtractor:
+    calls = 0
+
+    async def extract(self, url):
+        FakeBrowserExtractor.calls += 1
+        self.finish_phase = "load"
+        return [MediaFile(url="https://cdn.example.com/browser.mp4", type="video/mp4", extension=".mp4")]
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    FakeBrowserExtractor.calls = 0
+
+
+@pytest.mark.asyncio
+async def test_static_hit_skips_browser():
+    """A plausible static scan result answers without launching the browser"""
+    cascade = ExtractionCascade(FakeBrowserExtractor, DomainTierStats(skip_after_misses=3))
+    static_media = [MediaFile(url="https://cdn.example.com/static.mp4", type="video", extension=".mp4")]
+
+    with patch.object(cascade, '_static_scan', AsyncMock(return_value=static_media)):
+        result = await cascade.extract("https://www.example.com/watch/1")
+
+    assert result.tier == "static"
+    assert result.media_files == static_media
+    assert FakeBrowserExtractor.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_static_miss_escalates_and_is_skipped_later():
+    """Repeated static misses on a domain make later requests go straight to the browser"""
+    cascade = ExtractionCascade(FakeBrowserExtractor, DomainTierStats(skip_after_misses=2))
+    segment_only = [MediaFile(url="https://cdn.example.com/seg-1.ts", type="video", extension=".ts")]
+    static_scan = AsyncMock(return_value=segment_only)
+
+    with patch.object(cascade, '_static_scan', static_scan):
+        for _ in range(3):
+            result = await cascade.extract("https://example.com/watch/1")
+            assert result.tier == "browser"
+            assert result.finish_phase == "load"
+
+    assert static_scan.await_count == 2
+    assert FakeBrowserExtractor.calls == 3
+    assert cascade.stats.snapshot()["example.com"]["static"]["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_skipped_tier_is_reprobed_and_recovers():
+    """A skipped static tier is tried again periodically and stops being skipped once it answers"""
+    cascade = ExtractionCascade(FakeBrowserExtractor, DomainTierStats(skip_after_misses=1, reprobe_every=3))
+    direct = [MediaFile(url="https://cdn.example.com/video.mp4", type="video", extension=".mp4")]
+    static_scan = AsyncMock(return_value=[])
+
+    with patch.object(cascade, '_static_scan', static_scan):
+        tiers = [(await cascade.extract("https://example.com/watch/1")).tier for _ in range(4)]
+        # The site now serves its media in the HTML
+        static_scan.return_value = direct
+        for _ in range(3):
+            tiers.append((await cascade.extract("https://example.com/watch/1")).tier)
+
+    # Miss, skip, skip, re-probe (miss), skip, skip, re-probe (hit)
+    assert static_scan.await_count == 3
+    assert tiers == ["browser"] * 6 + ["static"]
+    assert not cascade.stats.should_skip("example.com", "static")
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from app.extractor import MediaExtractor
+from app.models import MediaFile
+
+
+def _extractor_with_deadline(seconds: float) -> MediaExtractor:
+    extractor = MediaExtractor(pool=MagicMock())
+    loop = asyncio.get_running_loop()
+    extractor._deadline = loop.time() + seconds
+    extractor._last_activity = loop.time()
+    return extractor
+
+
+@pytest.mark.asyncio
+async def test_settle_returns_early_once_media_is_quiet():
+    """A captured manifest plus a quiet network ends the wait early"""
+    extractor = _extractor_with_deadline(10)
+    extractor._last_activity -= 5
+    extractor._media_ready.set()
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await extractor._settle(3)
+    assert loop.time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_settle_is_bounded_by_deadline():
+    """Without qualifying media the wait never runs past the deadline"""
+    extractor = _extractor_with_deadline(0.1)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert not await extractor._settle(3)
+    assert loop.time() - started < 0.5
+    assert extractor._deadline_passed()
+
+
+def test_qualifying_media():
+    """Manifests always qualify, small files (previews, thumbnails) don't"""
+    extractor = MediaExtractor(pool=MagicMock())
+
+    manifest = MediaFile(url="https://cdn.example.com/master.m3u8", type="application/vnd.apple.mpegurl", extension=".m3u8")
+    preview = MediaFile(url="https://cdn.example.com/preview.mp4", type="video/mp4", extension=".mp4", size=20_000)
+    video = MediaFile(url="https://cdn.example.com/video.mp4", type="video/mp4", extension=".mp4", size=50_000_000)
+
+    assert extractor._is_qualifying_media(manifest)
+    assert not extractor._is_qualifying_media(preview)
+    assert extractor._is_qualifying_media(video)
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock, patch
+from app.extractor_selenium import WebDriverPool
+
+
+def test_driver_is_reset_and_reused():
+    """Released sessions are cleared and handed out again"""
+    pool = WebDriverPool(size=1, recycle_pages=0)
+    with patch.object(WebDriverPool, '_create', side_effect=lambda: MagicMock()) as create:
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+    assert first is second
+    assert create.call_count == 1
+    first.execute_cdp_cmd.assert_any_call('Network.clearBrowserCookies', {})
+    first.get.assert_called_with('about:blank')
+
+
+def test_broken_or_worn_out_driver_is_replaced():
+    """Unhealthy sessions and sessions past recycle_pages are quit"""
+    pool = WebDriverPool(size=1, recycle_pages=2)
+    with patch.object(WebDriverPool, '_create', side_effect=lambda: MagicMock()) as create:
+        broken = pool.acquire()
+        pool.release(broken, healthy=False)
+        worn = pool.acquire()
+        pool.release(worn)
+        pool.release(pool.acquire())
+        pool.acquire()
+
+    broken.quit.assert_called_once()
+    worn.quit.assert_called_once()
+    assert create.call_count == 3
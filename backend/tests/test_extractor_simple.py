@@ -0,0 +1,64 @@
+import httpx
+import pytest
+from app.config import settings
+from app.extractor_simple import SimpleMediaExtractor
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Response body delivered in fixed-size chunks"""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.chunks_sent = 0
+
+    async def __aiter__(self):
+        for i in range(0, len(self.body), self.chunk_size):
+            self.chunks_sent += 1
+            yield self.body[i:i + self.chunk_size]
+
+
+def _client_for(stream: ChunkedStream) -> httpx.AsyncClient:
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, stream=stream)
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+PAGE = (
+    '<html><body>'
+    '<video src="/media/clip.mp4"></video>'
+    + 'x' * 5000 +
+    '<script>var cfg = {"hls": "https:\\/\\/cdn.example.com\\/live\\/master.m3u8?token=abc"};</script>'
+    '<script>load("https://doubleclick.net/ad.mp4")</script>'
+    '</body></html>'
+).encode()
+
+
+@pytest.mark.asyncio
+async def test_scans_tags_and_scripts_across_chunks():
+    """Tags and script URLs are found even when split across chunk boundaries"""
+    stream = ChunkedStream(PAGE, chunk_size=7)
+    async with _client_for(stream) as client:
+        media = await SimpleMediaExtractor(client=client).extract("https://example.com/watch")
+
+    urls = [m.url for m in media]
+    assert urls == [
+        "https://example.com/media/clip.mp4",
+        "https://cdn.example.com/live/master.m3u8?token=abc",
+    ]
+    assert media[1].extension == ".m3u8"
+    assert media[0].headers["Referer"] == "https://example.com/watch"
+
+
+@pytest.mark.asyncio
+async def test_stops_reading_at_size_cap(monkeypatch):
+    """Reading stops once the configured cap is reached"""
+    monkeypatch.setattr(settings, "static_scan_max_kb", 1)
+    body = b'<video src="/a.mp4"></video>' + b' ' * 100_000
+    stream = ChunkedStream(body, chunk_size=512)
+
+    async with _client_for(stream) as client:
+        media = await SimpleMediaExtractor(client=client).extract("https://example.com/")
+
+    assert [m.url for m in media] == ["https://example.com/a.mp4"]
+    assert stream.chunks_sent <= 3
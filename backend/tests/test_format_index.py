@@ -0,0 +1,82 @@
+import time
+import pytest
+from app import youtube_extractor
+from app.download_cache import DownloadCache
+from app.format_index import FormatIndex, FormatIndexCache
+from app.youtube_extractor import YouTubeExtractor
+
+EXPIRE = int(time.time()) + 6 * 3600
+
+
+def yt_format(format_id, vcodec, acodec, ext="mp4", height=None, tbr=None, abr=None, **extra):
+    return {"format_id": format_id, "vcodec": vcodec, "acodec": acodec, "ext": ext, "height": height,
+            "tbr": tbr, "abr": abr, "url": f"https://rr1.googlevideo.com/videoplayback?expire={EXPIRE}&itag={format_id}",
+            **extra}
+
+
+INFO = {
+    "id": "dQw4w9WgXcQ",
+    "title": "Clip",
+    "duration": 100,
+    "formats": [
+        {"format_id": "sb0", "vcodec": "none", "acodec": "none", "ext": "mhtml"},
+        yt_format("140", "none", "mp4a.40.2", ext="m4a", abr=129.5, filesize=1600000),
+        yt_format("251", "none", "opus", ext="webm", abr=140),
+        yt_format("18", "avc1.42001E", "mp4a.40.2", height=360, tbr=500),
+        yt_format("136", "avc1.4d401f", "none", height=720, tbr=1200),
+        yt_format("247", "vp9", "none", ext="webm", height=720, tbr=900),
+        yt_format("137", "avc1.640028", "none", height=1080, tbr=2500),
+        yt_format("399", "av01.0.08M.08", "none", height=1080, tbr=1800),
+    ]
+}
+
+
+def test_index_groups_formats_in_one_pass():
+    index = FormatIndex(INFO["id"], INFO)
+
+    assert index.best_combined["format_id"] == "18"
+    assert index.best_video["height"] == 1080
+    assert index.best_audio["format_id"] == "251"
+
+    ladder = index.ladder()
+    assert [rung["label"] for rung in ladder] == ["1080p", "720p", "360p"]
+    assert [(v["vcodec"], v["container"]) for v in ladder[1]["variants"]] == [("avc1", "mp4"), ("vp9", "webm")]
+    # 2500 kbit/s for 100 s
+    assert ladder[0]["variants"][0]["size_bytes"] == 31250000
+    assert index.audio[1]["size_bytes"] == 1600000
+    assert index.expires_at == EXPIRE - 300
+
+
+def test_cache_drops_expired_indexes():
+    cache = FormatIndexCache(max_entries=2)
+    index = cache.update(INFO)
+    assert cache.get("dQw4w9WgXcQ") is index
+
+    index.expires_at = time.time() - 1
+    assert cache.get("dQw4w9WgXcQ") is None
+    assert cache.update({"id": "x", "formats": []}) is None
+
+
+@pytest.mark.asyncio
+async def test_download_resolves_quality_from_cached_formats(monkeypatch, tmp_path):
+    """A download after a format lookup hands yt-dlp the cached info instead of the URL alone"""
+    extractor = YouTubeExtractor()
+    extractor.download_cache = DownloadCache(tmp_path, max_mb=10, min_age_seconds=0)
+    cache = FormatIndexCache(max_entries=5)
+    cache.update(INFO)
+    monkeypatch.setattr(youtube_extractor, "format_indexes", cache)
+
+    calls = []
+
+    async def fake_download(url, progress=None, info=None, **options):
+        calls.append(info)
+        with open(options["outtmpl"], "wb") as f:
+            f.write(b"video")
+        return {**INFO, "format_id": "136+140"}
+
+    monkeypatch.setattr(youtube_extractor.ytdlp_pool, "download", fake_download)
+
+    result = await extractor.download_and_merge("https://www.youtube.com/watch?v=dQw4w9WgXcQ", quality="1080p")
+
+    assert result["status"] == "success"
+    assert calls == [INFO]
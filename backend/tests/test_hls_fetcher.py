@@ -0,0 +1,105 @@
+import httpx
+import pytest
+from app.hls_fetcher import HlsFetchError, fetch_hls, rewrite_playlist
+
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360
+low/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720
+high/index.m3u8
+"""
+
+MEDIA = """#EXTM3U
+#EXT-X-TARGETDURATION:4
+#EXT-X-MAP:URI="init.mp4"
+#EXTINF:4.0,
+seg0.m4s?token=1
+#EXTINF:4.0,
+seg1.m4s?token=1
+#EXT-X-ENDLIST
+"""
+
+
+def serve(requests_seen):
+    def handler(request):
+        requests_seen.append(request.url.path)
+        if request.url.path == "/master.m3u8":
+            return httpx.Response(200, text=MASTER)
+        if request.url.path == "/high/index.m3u8":
+            return httpx.Response(200, text=MEDIA)
+        return httpx.Response(200, content=request.url.path.encode())
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_fetch_picks_best_variant_and_writes_local_playlist(tmp_path):
+    seen = []
+    updates = []
+    async with serve(seen) as client:
+        playlist = await fetch_hls("https://cdn.test/master.m3u8", tmp_path, 4, client=client,
+                                   on_progress=updates.append)
+
+    text = playlist.read_text()
+    assert 'URI="segment_00000.mp4"' in text
+    assert "segment_00001.m4s" in text and "segment_00002.m4s" in text
+    assert (tmp_path / "segment_00002.m4s").read_bytes() == b"/high/seg1.m4s"
+    assert "/low/index.m3u8" not in seen
+    assert updates[-1]["percent"] == 100.0
+
+
+def test_live_and_encrypted_playlists_are_left_to_ffmpeg():
+    with pytest.raises(HlsFetchError, match="Live"):
+        rewrite_playlist("https://cdn.test/a.m3u8", "#EXTM3U\n#EXTINF:4.0,\nseg0.ts\n")
+    with pytest.raises(HlsFetchError, match="Encrypted"):
+        rewrite_playlist("https://cdn.test/a.m3u8",
+                         '#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="k"\n#EXTINF:4.0,\nseg0.ts\n#EXT-X-ENDLIST\n')
+
+
+BYTERANGE_MEDIA = """#EXTM3U
+#EXT-X-TARGETDURATION:4
+#EXT-X-MAP:URI="video.mp4",BYTERANGE="100@0"
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:50@100
+video.mp4
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:30
+video.mp4
+#EXT-X-ENDLIST
+"""
+
+
+@pytest.mark.asyncio
+async def test_byte_ranges_are_fetched_as_separate_range_requests(tmp_path):
+    resource = bytes(range(180))
+    ranges = []
+    updates = []
+
+    def handler(request):
+        if request.url.path == "/index.m3u8":
+            return httpx.Response(200, text=BYTERANGE_MEDIA)
+        start, end = (int(v) for v in request.headers["Range"].removeprefix("bytes=").split("-"))
+        ranges.append((start, end))
+        return httpx.Response(206, content=resource[start:end + 1])
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        playlist = await fetch_hls("https://cdn.test/index.m3u8", tmp_path, 4, client=client,
+                                   on_progress=updates.append)
+
+    assert sorted(ranges) == [(0, 99), (100, 149), (150, 179)]
+    text = playlist.read_text()
+    assert "BYTERANGE" not in text and '#EXT-X-MAP:URI="segment_00000.mp4"' in text
+    assert (tmp_path / "segment_00002.mp4").read_bytes() == resource[150:180]
+    assert {"output_bytes", "speed", "eta", "stage"} <= updates[-1].keys()
+    assert updates[-1]["output_bytes"] == 180
+
+
+@pytest.mark.asyncio
+async def test_server_ignoring_range_falls_back_to_ffmpeg(tmp_path):
+    def handler(request):
+        if request.url.path == "/index.m3u8":
+            return httpx.Response(200, text=BYTERANGE_MEDIA)
+        return httpx.Response(200, content=b"x" * 180)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(HlsFetchError, match="Range"):
+            await fetch_hls("https://cdn.test/index.m3u8", tmp_path, 1, client=client)
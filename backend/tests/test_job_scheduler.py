@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from app.job_scheduler import JobScheduler, QueueFullError
+from app.models import ExtractionStatus
+
+
+@pytest.mark.asyncio
+async def test_jobs_beyond_limit_queue_with_positions():
+    """Jobs over the class limit wait as QUEUED and start in FIFO order"""
+    scheduler = JobScheduler(limits={"browser": 1}, max_queued=5)
+    release = asyncio.Event()
+    started = []
+
+    async def job(name):
+        started.append(name)
+        await release.wait()
+
+    states = [{"status": ExtractionStatus.LOADING, "message": "Starting..."} for _ in range(3)]
+    tickets = []
+    for state in states:
+        ticket = scheduler.reserve("browser")
+        ticket.attach(state)
+        tickets.append(ticket)
+
+    assert states[0]["status"] == ExtractionStatus.LOADING
+    assert states[1]["status"] == ExtractionStatus.QUEUED and states[1]["queue_position"] == 1
+    assert states[2]["queue_position"] == 2
+
+    runners = [asyncio.create_task(scheduler.run(t, job, i)) for i, t in enumerate(tickets)]
+    await asyncio.sleep(0)
+    assert started == [0]
+
+    release.set()
+    await asyncio.gather(*runners)
+
+    assert started == [0, 1, 2]
+    assert states[2]["status"] == ExtractionStatus.LOADING and "queue_position" not in states[2]
+    assert scheduler.stats()["browser"]["completed"] == 3
+
+
+def test_full_queue_is_rejected_with_retry_hint():
+    """Once the queue is full, reserve raises with a Retry-After estimate"""
+    scheduler = JobScheduler(limits={"ffmpeg": 1}, max_queued=1)
+    scheduler.reserve("ffmpeg")
+    scheduler.reserve("ffmpeg")
+
+    with pytest.raises(QueueFullError) as exc:
+        scheduler.reserve("ffmpeg")
+
+    assert exc.value.retry_after >= 1
+    assert scheduler.stats()["ffmpeg"]["rejected"] == 1
+
+
+def test_released_queued_ticket_frees_its_place():
+    """Abandoning a queued job (e.g. failed upload) leaves room for others"""
+    scheduler = JobScheduler(limits={"audio": 1}, max_queued=1)
+    running = scheduler.reserve("audio")
+    queued = scheduler.reserve("audio")
+
+    queued.release()
+    scheduler.reserve("audio")
+
+    running.release()
+    assert scheduler.stats()["audio"]["running"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sub_job_slots_count_against_the_limit_but_are_never_rejected():
+    """Parts of an admitted job (playlist items) wait for a slot even when the queue is full"""
+    scheduler = JobScheduler(limits={"ytdlp": 2}, max_queued=0)
+    running = 0
+    peak = 0
+
+    async def item():
+        nonlocal running, peak
+        async with scheduler.slot("ytdlp"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(item() for _ in range(5)))
+
+    assert peak == 2
+    stats = scheduler.stats()["ytdlp"]
+    assert stats["completed"] == 5 and stats["running"] == 0 and stats["rejected"] == 0
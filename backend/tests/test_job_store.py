@@ -0,0 +1,51 @@
+import time
+from app import job_store
+from app.job_store import PlaylistJobStore
+
+
+def test_only_one_worker_claims_an_abandoned_job(tmp_path):
+    """Workers sharing the store never resume the same job twice"""
+    path = str(tmp_path / "jobs.db")
+    owner = PlaylistJobStore(path)
+    owner.ensure_job("job", ["a", "b"], "720p", "video")
+    first, second = PlaylistJobStore(path), PlaylistJobStore(path)
+
+    # Held by a live owner
+    assert first.unfinished_jobs() == [] and not first.claim("job")
+
+    owner.release()
+    assert first.claim("job")
+    assert not second.claim("job")
+    assert second.unfinished_jobs() == []
+
+
+def test_lease_of_a_dead_worker_expires(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    crashed = PlaylistJobStore(path)
+    crashed.ensure_job("job", ["a"], "720p", "video")
+    survivor = PlaylistJobStore(path)
+    assert not survivor.claim("job")
+
+    # No heartbeat for longer than the lease
+    later = time.time() + job_store.LEASE_SECONDS + 1
+    monkeypatch.setattr(job_store.time, "time", lambda: later)
+    assert [job["task_id"] for job in survivor.unfinished_jobs()] == ["job"]
+    assert survivor.claim("job")
+    assert survivor.heartbeat() == 1
+    assert crashed.heartbeat() == 0
+
+
+def test_stores_without_lease_columns_are_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "jobs.db")
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE playlist_jobs (task_id TEXT PRIMARY KEY, quality TEXT NOT NULL, format_type TEXT NOT NULL, "
+        "status TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL);"
+        "INSERT INTO playlist_jobs VALUES ('old', '720p', 'video', 'running', 0, 0);"
+    )
+    db.close()
+
+    store = PlaylistJobStore(path)
+    assert [job["task_id"] for job in store.unfinished_jobs()] == ["old"]
+    assert store.claim("old")
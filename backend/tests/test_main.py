@@ -1,4 +1,5 @@
 import pytest
+from pathlib import Path
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock, MagicMock
 from app.main import app
@@ -124,3 +125,295 @@ async def test_exclude_patterns():
     
     # Should not exclude legitimate URLs
     assert not extractor._should_exclude("https://example.com/video.mp4")
+
+
+def test_youtube_file_missing_or_evicted_is_404(monkeypatch):
+    from app import main
+    monkeypatch.setattr(main.youtube_download_cache, "acquire", lambda filename: False)
+    response = client.get("/api/youtube/file/youtube_0123456789abcdef0123.mp4")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_playlist_downloads_run_concurrently_in_order(monkeypatch, tmp_path):
+    """Playlist videos download in parallel; a failure doesn't stop the rest and order is kept"""
+    import asyncio
+    from app import main
+    from app.job_store import PlaylistJobStore
+
+    monkeypatch.setattr(main, "playlist_jobs", PlaylistJobStore(str(tmp_path / "jobs.db")))
+
+    running = 0
+    peak = 0
+
+    async def fake_download(url, quality, format_type, concurrent_fragments=None, timeout=None):
+        nonlocal running, peak
+        assert concurrent_fragments == main.settings.playlist_concurrent_fragments
+        assert timeout == main.settings.playlist_item_timeout_seconds
+        # Every running video holds a yt-dlp job slot of its own
+        assert main.job_scheduler.queues["ytdlp"].running >= running + 1
+        running += 1
+        peak = max(peak, running)
+        video_id = url.split("v=")[1]
+        await asyncio.sleep(0.03 if video_id == "slow" else 0.01)
+        running -= 1
+        if video_id == "bad":
+            return {"error": "Video unavailable"}
+        return {"status": "success", "title": video_id, "download_url": f"/api/youtube/file/{video_id}.mp4"}
+
+    main.tasks["playlist"] = {"status": "downloading", "progress": 0, "message": ""}
+    with patch('app.main.YouTubeExtractor') as extractor_cls:
+        extractor_cls.return_value.download_and_merge = fake_download
+        await main._playlist_download_task("playlist", ["slow", "bad", "c", "d"], "720p", "video")
+
+    task = main.tasks.pop("playlist")
+    assert peak > 1
+    assert [d["video_id"] for d in task["downloads"]] == ["slow", "bad", "c", "d"]
+    assert [d["status"] for d in task["downloads"]] == ["success", "failed", "success", "success"]
+    assert task["completed_videos"] == 3 and task["failed_videos"] == 1
+    assert task["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_interrupted_playlist_job_resumes_unfinished_items(monkeypatch, tmp_path):
+    """After a restart only items that were not finished (or lost their file) are downloaded again"""
+    from app import main
+    from app.job_store import PlaylistJobStore
+
+    kept = tmp_path / "youtube_kept.mp4"
+    kept.write_bytes(b"video")
+
+    # The process that ran the job checkpointed it and let go of it on shutdown
+    previous = PlaylistJobStore(str(tmp_path / "jobs.db"))
+    previous.ensure_job("job", ["kept", "gone", "partial", "bad", "new"], "720p", "video")
+    previous.update_item("job", 0, status="success", title="kept", output_path=str(kept))
+    previous.update_item("job", 1, status="success", title="gone", output_path=str(tmp_path / "missing.mp4"))
+    previous.update_item("job", 2, status="downloading")
+    previous.update_item("job", 3, status="failed", error="Private video")
+    previous.release()
+    previous.close()
+
+    store = PlaylistJobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(main, "playlist_jobs", store)
+    assert store.unfinished_jobs() == [{"task_id": "job", "quality": "720p", "format_type": "video"}]
+    assert store.claim("job")
+
+    downloaded = []
+
+    async def fake_download(url, quality, format_type, concurrent_fragments=None, timeout=None):
+        video_id = url.split("v=")[1]
+        downloaded.append(video_id)
+        return {"status": "success", "title": video_id, "file_path": str(tmp_path / f"{video_id}.mp4")}
+
+    main.tasks["job"] = {"status": "downloading", "progress": 0, "message": ""}
+    with patch('app.main.YouTubeExtractor') as extractor_cls:
+        extractor_cls.return_value.download_and_merge = fake_download
+        await main._playlist_download_task("job", ["kept", "gone", "partial", "bad", "new"], "720p", "video")
+
+    task = main.tasks.pop("job")
+    assert sorted(downloaded) == ["gone", "new", "partial"]
+    assert [d["status"] for d in task["downloads"]] == ["success", "success", "success", "failed", "success"]
+    assert store.unfinished_jobs() == []
+    assert store.items("job")[4]["output_path"] == str(tmp_path / "new.mp4")
+
+
+@pytest.mark.asyncio
+async def test_playlist_is_checkpointed_when_submitted(monkeypatch, tmp_path):
+    """A playlist still waiting for its turn at shutdown is not lost"""
+    from fastapi import BackgroundTasks
+    from app import main
+    from app.job_store import PlaylistJobStore
+    from app.models import ExtractRequest
+
+    store = PlaylistJobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(main, "playlist_jobs", store)
+
+    background = BackgroundTasks()
+    result = await main.download_youtube_playlist(
+        ExtractRequest(url="https://www.youtube.com/playlist?list=PL1"), background, video_ids="a,b"
+    )
+    main.tasks.pop(result["task_id"])
+    background.tasks[0].args[0].release()
+
+    assert [item["video_id"] for item in store.items(result["task_id"])] == ["a", "b"]
+    assert all(item["status"] == "pending" for item in store.items(result["task_id"]))
+    # Owned by this worker until it shuts down
+    store.release()
+    assert [job["task_id"] for job in PlaylistJobStore(str(tmp_path / "jobs.db")).unfinished_jobs()] == [result["task_id"]]
+
+
+@pytest.mark.asyncio
+async def test_compression_skips_inputs_already_within_target(monkeypatch, tmp_path):
+    """An upload that already meets the target is served without running FFmpeg"""
+    from app import main
+    from app.media_probe import MediaInfo
+
+    upload = tmp_path / "clip.mp4"
+    upload.write_bytes(b"x" * 2048)
+
+    async def fake_probe(path):
+        return MediaInfo({
+            "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2"},
+            "streams": [{"codec_type": "video", "codec_name": "h264", "width": 640, "height": 360, "bit_rate": "400000"},
+                        {"codec_type": "audio", "codec_name": "aac", "bit_rate": "96000"}]
+        })
+
+    run_transcode = AsyncMock()
+    monkeypatch.setattr(main, "probe", fake_probe)
+    monkeypatch.setattr(main, "run_transcode", run_transcode)
+
+    main.tasks["compress"] = {"status": "uploading", "progress": 50, "message": ""}
+    await main._compress_video("compress", str(upload), "clip.mp4", "low")
+    task = main.tasks.pop("compress")
+
+    run_transcode.assert_not_called()
+    assert task["status"] == "completed"
+    assert task["compression_path"] == "skipped" and task["compression_ratio"] == "0.0"
+    Path(f"/tmp/compressed_video/{task['output_filename']}").unlink()
+
+
+@pytest.mark.asyncio
+async def test_video_only_reencode_has_no_audio_options(monkeypatch, tmp_path):
+    """A silent input is reported as re-encoded, not as partially copied"""
+    from app import main
+    from app.media_probe import MediaInfo
+
+    upload = tmp_path / "silent.mp4"
+    upload.write_bytes(b"x" * 4096)
+
+    async def fake_probe(path):
+        return MediaInfo({
+            "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "20.0"},
+            "streams": [{"codec_type": "video", "codec_name": "hevc", "width": 1920, "height": 1080}]
+        })
+
+    commands = []
+
+    async def fake_run_transcode(cmd, priority, on_progress=None, duration=None, stdin=None, threads=None):
+        commands.append(cmd)
+        Path(cmd[-1]).write_bytes(b"y" * 1024)
+        return 0, ""
+
+    monkeypatch.setattr(main, "probe", fake_probe)
+    monkeypatch.setattr(main, "run_transcode", fake_run_transcode)
+
+    main.tasks["compress"] = {"status": "uploading", "progress": 50, "message": ""}
+    await main._compress_video("compress", str(upload), "silent.mp4", "low")
+    task = main.tasks.pop("compress")
+
+    assert not any(arg.startswith("-c:a") for arg in commands[0])
+    assert task["compression_path"] == "reencode" and task["audio_copied"] is False
+    Path(f"/tmp/compressed_video/{task['output_filename']}").unlink()
+
+
+@pytest.mark.asyncio
+async def test_long_reencode_runs_in_segments(monkeypatch, tmp_path):
+    """A long input that must be re-encoded goes to the segmented path"""
+    from app import main
+    from app.media_probe import MediaInfo
+
+    upload = tmp_path / "long.mkv"
+    upload.write_bytes(b"x" * 4096)
+
+    async def fake_probe(path):
+        return MediaInfo({
+            "format": {"format_name": "matroska,webm", "duration": "1800.0"},
+            "streams": [{"codec_type": "video", "codec_name": "vp9", "width": 1920, "height": 1080},
+                        {"codec_type": "audio", "codec_name": "opus"}]
+        })
+
+    async def fake_segmented(input_path, output_path, video_args, audio_args, duration, segments, on_progress=None):
+        calls.append((video_args, audio_args, duration, segments))
+        output_path.write_bytes(b"y" * 1024)
+        return 0, ""
+
+    calls = []
+    run_transcode = AsyncMock()
+    monkeypatch.setattr(main, "probe", fake_probe)
+    monkeypatch.setattr(main, "run_transcode", run_transcode)
+    monkeypatch.setattr(main, "segmented_transcode", fake_segmented)
+    monkeypatch.setattr(main, "segment_count", lambda duration: 4)
+
+    main.tasks["compress"] = {"status": "uploading", "progress": 50, "message": ""}
+    await main._compress_video("compress", str(upload), "long.mkv", "low")
+    task = main.tasks.pop("compress")
+
+    run_transcode.assert_not_called()
+    video_args, audio_args, duration, segments = calls[0]
+    assert 'libx264' in video_args and audio_args == ['-c:a', 'aac', '-b:a', '128k']
+    assert duration == 1800.0 and segments == 4
+    assert task["status"] == "completed" and task["segments"] == 4
+    Path(f"/tmp/compressed_video/{task['output_filename']}").unlink()
+
+
+@pytest.mark.asyncio
+async def test_audio_extraction_copies_aac_into_m4a(monkeypatch, tmp_path):
+    """With output_format=original, AAC audio is stream-copied instead of encoded to MP3"""
+    from app import main
+    from app.media_probe import MediaInfo
+
+    upload = tmp_path / "video_abc.mp4"
+    upload.write_bytes(b"video")
+
+    async def fake_probe(path):
+        return MediaInfo({"format": {"format_name": "mov,mp4"}, "streams": [
+            {"codec_type": "video", "codec_name": "h264"}, {"codec_type": "audio", "codec_name": "aac"}
+        ]})
+
+    commands = []
+
+    async def fake_run_transcode(cmd, priority, on_progress=None, stdin=None):
+        commands.append((cmd, priority))
+        Path(cmd[-1]).write_bytes(b"audio")
+        return 0, ""
+
+    monkeypatch.setattr(main, "probe", fake_probe)
+    monkeypatch.setattr(main, "run_transcode", fake_run_transcode)
+
+    main.tasks["audio"] = {"status": "uploading", "progress": 50, "message": ""}
+    await main._convert_video_to_audio("audio", str(upload), "clip.mp4", "original")
+    task = main.tasks.pop("audio")
+
+    cmd, priority = commands[0]
+    assert ["-c:a", "copy"] == cmd[cmd.index("-c:a"):cmd.index("-c:a") + 2]
+    assert priority == main.REMUX
+    assert task["output_filename"] == "video_abc.m4a" and task["audio_copied"] is True
+    Path(f"/tmp/converted_audio/{task['output_filename']}").unlink()
+
+
+def test_streamed_conversion_pipes_streamable_uploads(monkeypatch):
+    """MKV uploads go straight into FFmpeg's stdin; mdat-first MP4s are spooled to disk first"""
+    from app import main
+
+    received = {}
+
+    async def fake_run_transcode(cmd, priority, on_progress=None, stdin=None):
+        data = b""
+        if stdin is not None:
+            async for chunk in stdin:
+                data += chunk
+        received["input"] = cmd[cmd.index("-i") + 1]
+        received["data"] = data
+        Path(cmd[-1]).write_bytes(b"audio")
+        return 0, ""
+
+    async def fake_probe(data):
+        return None
+
+    monkeypatch.setattr(main, "run_transcode", fake_run_transcode)
+    monkeypatch.setattr(main, "probe_bytes", fake_probe)
+    monkeypatch.setattr(main, "probe", fake_probe)
+
+    response = client.post("/api/convert/stream?filename=clip.mkv", content=b"\x1a\x45\xdf\xa3" + b"v" * 5000)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["pipelined"] is True and result["status"] == "completed"
+    assert received["input"] == "pipe:0" and len(received["data"]) == 5004
+    Path(f"/tmp/converted_audio/{result['output_filename']}").unlink()
+
+    mdat_first = (16).to_bytes(4, "big") + b"ftypisom" + b"\0" * 4 + (8).to_bytes(4, "big") + b"mdat"
+    response = client.post("/api/convert/stream?filename=clip.mp4", content=mdat_first)
+    result = response.json()
+    assert result["pipelined"] is False
+    assert received["input"].startswith("/tmp/video_uploads/") and received["data"] == b""
+    Path(f"/tmp/converted_audio/{result['output_filename']}").unlink()
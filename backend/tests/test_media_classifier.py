@@ -0,0 +1,33 @@
+from app import media_classifier
+from app.media_classifier import MediaDeduper
+
+
+def test_media_extension_uses_path_suffix():
+    """Extensions come from the URL path, ignoring query strings and hosts"""
+    assert media_classifier.media_extension("https://cdn.example.com/v/video.mp4?token=abc") == ".mp4"
+    assert media_classifier.media_extension("https://cdn.example.com/hls/master.m3u8") == ".m3u8"
+    assert media_classifier.media_extension("https://cdn.example.com/video.mp4/seg-1") == ".mp4"
+    assert media_classifier.media_extension("https://stats.example.com/page.html") is None
+    assert media_classifier.media_extension("https://example.com/image.jpg") is None
+
+
+def test_classify_filters_images_and_ads():
+    """classify() returns an extension only for capturable media"""
+    assert media_classifier.classify("https://cdn.example.com/a.mp4", "video/mp4") == ".mp4"
+    assert media_classifier.classify("https://cdn.example.com/stream", "application/x-mpegURL; charset=utf-8") == ".m3u8"
+    assert media_classifier.classify("https://cdn.example.com/poster", "image/jpeg") is None
+    assert media_classifier.classify("https://cdn.example.com/thumb.png", "application/octet-stream") is None
+    assert media_classifier.classify("https://doubleclick.net/ad.mp4", "video/mp4") is None
+    assert media_classifier.classify("https://example.com/app.js", "text/javascript") is None
+
+
+def test_deduper_collapses_stream_segments():
+    """Numbered .ts segments of one rendition count once, other URLs are exact"""
+    seen = MediaDeduper()
+
+    assert seen.add("https://cdn.example.com/720p/seg-00001.ts?sig=1")
+    assert not seen.add("https://cdn.example.com/720p/seg-00002.ts?sig=2")
+    assert seen.add("https://cdn.example.com/1080p/seg-00001.ts")
+    assert seen.add("https://cdn.example.com/video.mp4")
+    assert not seen.add("https://cdn.example.com/video.mp4")
+    assert len(seen) == 3
@@ -0,0 +1,74 @@
+from app.media_probe import MediaInfo, audio_copy_extension, compression_plan, is_streamable, PARTIAL, REENCODED, REMUXED, SKIPPED
+
+
+def probe_output(format_name="mov,mp4,m4a,3gp,3g2,mj2", vcodec="h264", width=854, height=480,
+                 vbitrate="900000", acodec="aac", abitrate="128000", bit_rate="1030000"):
+    streams = [{"codec_type": "video", "codec_name": vcodec, "width": width, "height": height, "bit_rate": vbitrate}]
+    if acodec:
+        streams.append({"codec_type": "audio", "codec_name": acodec, "bit_rate": abitrate})
+    return {"format": {"format_name": format_name, "duration": "12.5", "bit_rate": bit_rate}, "streams": streams}
+
+
+def plan_for(probe, max_width=854, max_height=480, video_kbps=1000):
+    return compression_plan(MediaInfo(probe), max_width, max_height, video_kbps, audio_kbps=128)
+
+
+def test_input_within_target_is_skipped_or_remuxed():
+    assert plan_for(probe_output())["path"] == SKIPPED
+    assert plan_for(probe_output(acodec=None))["path"] == SKIPPED
+    # Same streams in Matroska only need a container change; bitrate comes from the format
+    assert plan_for(probe_output(format_name="matroska,webm", vbitrate=None))["path"] == REMUXED
+    # Portrait phone video against a landscape target box
+    assert plan_for(probe_output(width=480, height=854))["path"] == SKIPPED
+
+
+def test_only_streams_over_target_are_reencoded():
+    plan = plan_for(probe_output(acodec="opus"))
+    assert plan == {"path": PARTIAL, "copy_video": True, "copy_audio": False, "has_audio": True}
+
+    plan = plan_for(probe_output(width=1920, height=1080, vbitrate="6000000"))
+    assert plan == {"path": PARTIAL, "copy_video": False, "copy_audio": True, "has_audio": True}
+
+    assert plan_for(probe_output(vcodec="hevc", acodec="opus"))["path"] == REENCODED
+
+
+def test_video_only_input_is_judged_on_its_video_alone():
+    """A missing audio stream is neither copied nor encoded"""
+    plan = plan_for(probe_output(acodec=None, width=1920, height=1080, vbitrate="6000000"))
+    assert plan == {"path": REENCODED, "copy_video": False, "copy_audio": False, "has_audio": False}
+
+    plan = plan_for(probe_output(acodec=None, format_name="matroska,webm"))
+    assert plan == {"path": REMUXED, "copy_video": True, "copy_audio": False, "has_audio": False}
+
+
+def test_unknown_input_is_fully_reencoded():
+    assert compression_plan(None, 854, 480, 1000, 128)["path"] == REENCODED
+    # Cover art is not a video stream
+    audio_only = {"format": {"format_name": "mp3"}, "streams": [
+        {"codec_type": "audio", "codec_name": "mp3"},
+        {"codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}}
+    ]}
+    assert plan_for(audio_only)["path"] == REENCODED
+
+
+def test_audio_copy_depends_on_source_codec_and_mode():
+    aac = MediaInfo(probe_output(acodec="aac"))
+    mp3 = MediaInfo(probe_output(acodec="mp3"))
+    opus = MediaInfo(probe_output(acodec="opus"))
+
+    assert audio_copy_extension(aac, "original") == "m4a"
+    assert audio_copy_extension(aac, "mp3") is None
+    assert audio_copy_extension(mp3, "mp3") == "mp3"
+    assert audio_copy_extension(opus, "original") is None
+    assert audio_copy_extension(None, "original") is None
+
+
+def box(kind, payload=b""):
+    return (8 + len(payload)).to_bytes(4, "big") + kind + payload
+
+
+def test_streamable_containers():
+    assert is_streamable(".mkv", b"\x1a\x45\xdf\xa3")
+    assert is_streamable(".mp4", box(b"ftyp", b"isom") + box(b"moov", b"\0" * 16) + box(b"mdat"))
+    assert not is_streamable(".mp4", box(b"ftyp", b"isom") + box(b"mdat", b"\0" * 16) + box(b"moov"))
+    assert not is_streamable(".avi", b"RIFF")
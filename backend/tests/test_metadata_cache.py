@@ -0,0 +1,47 @@
+import pytest
+from unittest.mock import AsyncMock
+from app import youtube_extractor
+from app.download_cache import DownloadCache
+from app.metadata_cache import VideoMetadataCache, metadata_from_info
+from app.youtube_extractor import YouTubeExtractor, youtube_video_id
+
+
+def test_video_id_from_youtube_urls():
+    assert youtube_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1") == "dQw4w9WgXcQ"
+    assert youtube_video_id("https://youtu.be/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert youtube_video_id("https://www.youtube.com/shorts/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert youtube_video_id("https://www.youtube.com/playlist?list=PL1") is None
+
+
+def test_flat_entries_merge_with_full_metadata():
+    """Sparse playlist entries keep fields learned from a full lookup"""
+    cache = VideoMetadataCache(max_entries=10, ttl=60)
+    cache.update({"id": "abc", "title": "Song", "thumbnail": "https://i/hq.jpg", "uploader": "Band"})
+    cache.update({"id": "abc", "title": "Song (Live)", "thumbnails": [{"url": "https://i/small.jpg"}]})
+
+    metadata = cache.get("abc")
+    assert metadata["title"] == "Song (Live)"
+    assert metadata["uploader"] == "Band"
+    assert metadata_from_info({"thumbnails": [{"url": "a"}, {"url": "b"}]})["thumbnail"] == "b"
+
+
+@pytest.mark.asyncio
+async def test_download_reuses_info_from_the_download_run(monkeypatch, tmp_path):
+    """Metadata comes from the download itself - no second info extraction"""
+    extractor = YouTubeExtractor()
+    extractor.download_cache = DownloadCache(tmp_path, max_mb=10, min_age_seconds=0)
+
+    async def fake_download(url, **options):
+        with open(options["outtmpl"], "wb") as f:
+            f.write(b"video")
+        return {"id": "dQw4w9WgXcQ", "title": "Clip", "duration": 10, "uploader": "Me"}
+
+    extract_info = AsyncMock()
+    monkeypatch.setattr(youtube_extractor.ytdlp_pool, "download", fake_download)
+    monkeypatch.setattr(youtube_extractor.ytdlp_pool, "extract_info", extract_info)
+
+    result = await extractor.download_and_merge("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+    assert result["status"] == "success" and result["title"] == "Clip"
+    extract_info.assert_not_called()
+    assert youtube_extractor.video_metadata.get("dQw4w9WgXcQ")["uploader"] == "Me"
@@ -0,0 +1,94 @@
+import queue
+import sys
+import pytest
+from app import ytdlp_pool
+from app.progress import DownloadProgress, parse_ffmpeg_progress, run_ffmpeg
+
+FAKE_FFMPEG = '''#!{python}
+import sys
+sys.stderr.write("Input #0, mov,mp4\\n  Duration: 00:00:10.00, start: 0.000000, bitrate: 800 kb/s\\n")
+for us, state in ((2500000, "continue"), (5000000, "continue"), (10000000, "end")):
+    sys.stdout.write(f"total_size={{us // 100}}\\nout_time_us={{us}}\\nspeed=2.5x\\nprogress={{state}}\\n")
+    sys.stdout.flush()
+'''
+
+FAKE_FFMPEG_COPY_STDIN = '''#!{python}
+import sys
+data = sys.stdin.buffer.read()
+open(sys.argv[-1], "wb").write(data)
+sys.stdout.write(f"total_size={{len(data)}}\\nprogress=end\\n")
+'''
+
+
+def test_download_progress_sums_separate_streams():
+    """Video and audio streams add up, and the percentage never goes backwards"""
+    tracker = DownloadProgress()
+    tracker.update({"status": "downloading", "filename": "v.mp4", "downloaded_bytes": 50, "total_bytes": 100})
+    fields = tracker.update({"status": "finished", "filename": "v.mp4", "total_bytes": 100})
+    assert fields["percent"] == 100.0
+
+    fields = tracker.update({"status": "downloading", "filename": "a.m4a", "downloaded_bytes": 10,
+                             "total_bytes": 100, "speed": 2 * 1024 * 1024, "eta": 4})
+    assert fields["downloaded_bytes"] == 110 and fields["total_bytes"] == 200
+    assert fields["percent"] == 100.0
+    assert fields["speed"] == "2.0 MiB/s" and fields["eta"] == 4
+
+
+def test_parse_ffmpeg_progress_block():
+    fields = parse_ffmpeg_progress(
+        {"out_time_us": "30000000", "total_size": "1048576", "speed": "1.5x", "progress": "continue"},
+        duration=120
+    )
+    assert fields["percent"] == 25.0
+    assert fields["output_bytes"] == 1048576
+    assert fields["eta"] == 60
+
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_streams_progress(tmp_path):
+    """Progress blocks are reported as they arrive, using the duration from the log"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    script.chmod(0o755)
+
+    updates = []
+    returncode, log = await run_ffmpeg([str(script), "-i", "in.mp4", "out.mp4"], updates.append)
+
+    assert returncode == 0
+    assert [u["percent"] for u in updates] == [25.0, 50.0, 100.0]
+    assert updates[0]["eta"] == 3
+    assert "Duration" in log
+
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_feeds_stdin_while_running(tmp_path):
+    """Chunks from an async iterator are written to ffmpeg's stdin"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG_COPY_STDIN.format(python=sys.executable))
+    script.chmod(0o755)
+
+    async def upload():
+        for part in (b"abc", b"def", b"ghi"):
+            yield part
+
+    output = tmp_path / "out.bin"
+    returncode, _ = await run_ffmpeg([str(script), "-i", "pipe:0", str(output)], stdin=upload())
+
+    assert returncode == 0
+    assert output.read_bytes() == b"abcdefghi"
+
+
+def test_worker_progress_hooks_are_throttled(monkeypatch):
+    """Workers forward progress on the shared queue, at most one 'downloading' event per interval"""
+    progress_queue = queue.Queue()
+    monkeypatch.setattr(ytdlp_pool, "_progress_queue", progress_queue)
+    hooks = ytdlp_pool._progress_hooks("job-1")
+
+    for downloaded in (10, 20, 30):
+        hooks["progress_hooks"][0]({"status": "downloading", "downloaded_bytes": downloaded})
+    hooks["progress_hooks"][0]({"status": "finished", "downloaded_bytes": 40})
+    hooks["postprocessor_hooks"][0]({"status": "started", "postprocessor": "Merger"})
+
+    events = [progress_queue.get_nowait() for _ in range(progress_queue.qsize())]
+    assert [e[1]["status"] for e in events] == ["downloading", "finished", "postprocessing"]
+    assert all(job_id == "job-1" for job_id, _ in events)
@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.resource_blocker import ResourceBlocker
+
+
+def test_blocks_heavy_types_and_trackers():
+    """Images, fonts and tracker hosts are blocked; documents and media never are"""
+    blocker = ResourceBlocker(blocked_types=["image", "font", "stylesheet"])
+
+    assert blocker.should_block("https://example.com/hero.jpg", "image")
+    assert blocker.should_block("https://example.com/font.woff2", "font")
+    assert blocker.should_block("https://www.google-analytics.com/collect", "ping")
+    assert blocker.should_block("https://securepubads.g.doubleclick.net/tag.js", "script")
+
+    assert not blocker.should_block("https://example.com/watch", "document")
+    assert not blocker.should_block("https://cdn.example.com/video.mp4", "media")
+    assert not blocker.should_block("https://example.com/app.js", "script")
+
+
+def test_player_scripts_are_allowlisted():
+    """Player scripts load even when their type would be blocked"""
+    blocker = ResourceBlocker(blocked_types=["script", "stylesheet"])
+
+    assert not blocker.should_block("https://cdn.jsdelivr.net/npm/hls.js@1/dist/hls.min.js", "script")
+    assert not blocker.should_block("https://vjs.zencdn.net/8.0.4/video-js.css", "stylesheet")
+
+
+@pytest.mark.asyncio
+async def test_handle_counts_blocked_requests():
+    """Aborted requests are counted with an estimated byte total"""
+    blocker = ResourceBlocker(blocked_types=["image"])
+
+    route = MagicMock()
+    route.request.url = "https://example.com/poster.png"
+    route.request.resource_type = "image"
+    route.abort = AsyncMock()
+    route.continue_ = AsyncMock()
+
+    await blocker.handle(route)
+
+    route.abort.assert_awaited_once()
+    route.continue_.assert_not_awaited()
+    assert blocker.stats()["blocked_requests"] == 1
+    assert blocker.stats()["blocked_bytes_estimate"] > 0
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from app import segmented_transcode as module
+from app.segmented_transcode import segment_count, segmented_transcode
+from app.transcode_scheduler import ENCODE, REMUX, AUDIO, TranscodeScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = TranscodeScheduler(cores=8, encode_threads=4)
+    monkeypatch.setattr(module, "transcode_scheduler", scheduler)
+    return scheduler
+
+
+def test_segment_count(monkeypatch, scheduler):
+    monkeypatch.setattr(module.settings, "segmented_transcode_min_seconds", 300)
+    monkeypatch.setattr(module.settings, "segmented_transcode_segments", 0)
+    assert segment_count(None) == 1
+    assert segment_count(120) == 1
+    # Auto: one chunk per two cores
+    assert segment_count(3600) == 4
+    # Never chunks shorter than MIN_SEGMENT_SECONDS
+    monkeypatch.setattr(module.settings, "segmented_transcode_segments", 16)
+    assert segment_count(300) == 10
+
+    monkeypatch.setattr(module.settings, "segmented_transcode_min_seconds", 0)
+    assert segment_count(3600) == 1
+
+
+@pytest.mark.asyncio
+async def test_chunks_encode_in_parallel_and_concat_without_reencoding(monkeypatch, tmp_path, scheduler):
+    calls = []
+    running = 0
+    peak = 0
+    progress = []
+
+    async def fake_run_transcode(cmd, priority, on_progress=None, duration=None, stdin=None, threads=None):
+        nonlocal running, peak
+        calls.append((cmd, priority, threads))
+        if '-f' in cmd and cmd[cmd.index('-f') + 1] == 'segment':
+            for i in range(3):
+                (tmp_path / "out_segments" / f"chunk_{i:03d}.mkv").write_bytes(b"")
+        elif '-an' in cmd:
+            # Encodes are all in flight together
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            on_progress({"percent": 100.0, "output_bytes": 10, "speed": "2.00x", "eta": 0})
+            running -= 1
+        elif '-f' in cmd and cmd[cmd.index('-f') + 1] == 'concat':
+            concat_list = cmd[cmd.index('-i') + 1]
+            calls[-1] += (open(concat_list).read(),)
+        return 0, ""
+
+    monkeypatch.setattr(module, "run_transcode", fake_run_transcode)
+
+    output = tmp_path / "out.mp4"
+    returncode, _ = await segmented_transcode(
+        "in.mkv", output, ['-c:v', 'libx264'], ['-c:a', 'aac'], 600.0, 3, progress.append
+    )
+
+    assert returncode == 0
+    split, *encodes, audio, join = calls
+    assert split[1] == REMUX and '-c' in split[0] and split[0][split[0].index('-segment_time') + 1] == "200.000"
+    assert [priority for _, priority, _ in encodes] == [ENCODE] * 3
+    assert all(threads == 2 for _, _, threads in encodes)
+    assert peak == 3
+    assert audio[1] == AUDIO and '-vn' in audio[0]
+
+    cmd, priority, _, concat_list = join
+    assert priority == REMUX
+    assert cmd[cmd.index('-c') + 1] == 'copy' and cmd[-1] == str(output)
+    assert concat_list == "file 'chunk_000.mp4'\nfile 'chunk_001.mp4'\nfile 'chunk_002.mp4'\n"
+
+    assert progress[-1]["percent"] == 100.0
+    assert progress[-1]["speed"] == "6.00x" and progress[-1]["output_bytes"] == 30
+    # Scratch chunks are removed
+    assert not (tmp_path / "out_segments").exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_fails_the_job(monkeypatch, tmp_path, scheduler):
+    async def fake_run_transcode(cmd, priority, on_progress=None, duration=None, stdin=None, threads=None):
+        if 'segment' in cmd:
+            (tmp_path / "out_segments" / "chunk_000.mkv").write_bytes(b"")
+        if '-an' in cmd:
+            return 1, "encoder error"
+        assert 'concat' not in cmd
+        return 0, ""
+
+    monkeypatch.setattr(module, "run_transcode", fake_run_transcode)
+
+    result = await segmented_transcode("in.mkv", tmp_path / "out.mp4", ['-c:v', 'libx264'], None, 600.0, 2)
+    assert result == (1, "encoder error")
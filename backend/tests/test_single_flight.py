@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from app.single_flight import SingleFlight
+
+
+def test_key_normalizes_url_and_keeps_options():
+    """Equivalent URLs share a key; different quality/format do not"""
+    key = SingleFlight.key
+    assert key("youtube", "https://YouTube.com/watch?v=x&utm_source=a", quality="720p") == \
+        key("youtube", "https://youtube.com/watch?v=x", quality="720p")
+    assert key("youtube", "https://youtube.com/watch?v=x", quality="720p") != \
+        key("youtube", "https://youtube.com/watch?v=x", quality="1080p")
+    assert key("extract", "https://a.com/v", convert_hls=True) != key("extract", "https://a.com/v", convert_hls=False)
+
+
+@pytest.mark.asyncio
+async def test_followers_attach_until_leader_finishes():
+    """Duplicates attach to the leader while it runs and start fresh afterwards"""
+    flight = SingleFlight()
+    key = flight.key("extract", "https://example.com/v")
+    release = asyncio.Event()
+    runs = []
+
+    async def job(task_id):
+        runs.append(task_id)
+        await release.wait()
+
+    assert flight.attach(key) is None
+    flight.lead(key, "leader")
+    runner = asyncio.create_task(flight.run_leader(key, "leader", job))
+    await asyncio.sleep(0)
+
+    assert flight.attach(key) == "leader"
+    release.set()
+    await runner
+
+    assert runs == ["leader"]
+    assert flight.attach(key) is None
+    assert flight.stats()["duplicates_avoided"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_shares_one_call_and_copies_results():
+    """Concurrent awaited calls run once and each caller gets its own copy"""
+    flight = SingleFlight()
+    key = flight.key("instagram", "https://instagram.com/reel/abc")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"status_code": 200, "url": "v.mp4"}
+
+    first, second = await asyncio.gather(flight.run(key, fetch), flight.run(key, fetch))
+
+    assert calls == 1
+    assert first == second and first is not second
+    assert flight.stats()["coalesced"] == {"instagram": 1}
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_errors_to_followers():
+    """A failed call fails every attached caller and is not cached"""
+    flight = SingleFlight()
+    key = flight.key("instagram", "https://instagram.com/reel/abc")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("blocked")
+
+    results = await asyncio.gather(flight.run(key, boom), flight.run(key, boom), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
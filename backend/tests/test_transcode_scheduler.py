@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from app import transcode_scheduler as module
+from app.transcode_scheduler import ENCODE, REMUX, AUDIO, TranscodeScheduler
+
+
+@pytest.mark.asyncio
+async def test_queued_remux_runs_before_queued_encode():
+    """Once cores free up, waiting stream copies start ahead of re-encodes queued earlier"""
+    scheduler = TranscodeScheduler(cores=4, encode_threads=4)
+    started = []
+    release_first = asyncio.Event()
+
+    async def job(name, priority, hold=None):
+        async with scheduler.slot(priority) as threads:
+            started.append((name, threads))
+            if hold:
+                await hold.wait()
+
+    first = asyncio.create_task(job("encode-1", ENCODE, release_first))
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(job("encode-2", ENCODE)), asyncio.create_task(job("audio", AUDIO)),
+               asyncio.create_task(job("remux", REMUX))]
+    await asyncio.sleep(0)
+
+    stats = scheduler.stats()
+    assert stats["utilization"] == 100.0
+    assert stats["jobs"]["encode"]["queued"] == 1 and stats["jobs"]["remux"]["queued"] == 1
+
+    release_first.set()
+    await asyncio.gather(first, *waiting)
+
+    assert started == [("encode-1", 4), ("remux", 1), ("audio", 1), ("encode-2", 4)]
+    assert scheduler.available == 4
+    assert scheduler.stats()["jobs"]["encode"]["max_wait_seconds"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = TranscodeScheduler(cores=1)
+    hold = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot(REMUX):
+            await hold.wait()
+
+    running = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+
+    async def waiter():
+        async with scheduler.slot(AUDIO):
+            pass
+
+    waiting = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    hold.set()
+    await running
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.available == 1 and scheduler.stats()["jobs"]["audio"]["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_transcode_adds_thread_budget(monkeypatch):
+    scheduler = TranscodeScheduler(cores=8, encode_threads=3)
+    monkeypatch.setattr(module, "transcode_scheduler", scheduler)
+    commands = []
+
+    async def fake_run_ffmpeg(cmd, on_progress=None, duration=None, stdin=None):
+        commands.append(cmd)
+        return 0, ""
+
+    monkeypatch.setattr(module, "run_ffmpeg", fake_run_ffmpeg)
+    await module.run_transcode(["ffmpeg", "-i", "in.mp4", "-c:v", "libx264", "out.mp4"], ENCODE)
+
+    assert commands == [["ffmpeg", "-i", "in.mp4", "-c:v", "libx264", "-threads", "3", "out.mp4"]]
+
+
+@pytest.mark.asyncio
+async def test_thread_override_is_capped_at_the_cores():
+    scheduler = TranscodeScheduler(cores=4, encode_threads=2)
+    async with scheduler.slot(ENCODE, threads=1) as threads:
+        assert threads == 1 and scheduler.available == 3
+    async with scheduler.slot(ENCODE, threads=16) as threads:
+        assert threads == 4
+    assert scheduler.available == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queue_head_unblocks_jobs_behind_it():
+    """Smaller jobs queued behind a cancelled waiter start without waiting for a release"""
+    scheduler = TranscodeScheduler(cores=4, encode_threads=4)
+    hold = asyncio.Event()
+    started = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot(REMUX):
+            await hold.wait()
+
+    async def small():
+        async with scheduler.slot(ENCODE, threads=1):
+            started.set()
+
+    running = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    head = asyncio.create_task(scheduler.slot(ENCODE).__aenter__())
+    await asyncio.sleep(0)
+    behind = asyncio.create_task(small())
+    await asyncio.sleep(0)
+    assert not started.is_set()
+
+    head.cancel()
+    await asyncio.wait_for(started.wait(), 1)
+    await behind
+    hold.set()
+    await running
+    assert scheduler.available == 4
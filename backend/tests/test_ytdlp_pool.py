@@ -0,0 +1,237 @@
+import asyncio
+import pytest
+from app.job_scheduler import JobScheduler, YTDLP_JOBS
+from app.playlist_enumerator import PlaylistEnumerator
+from app.youtube_extractor import YouTubeExtractor
+from app.ytdlp_pool import YtDlpPool, YtDlpError
+
+
+@pytest.mark.asyncio
+async def test_pool_workers_run_jobs_and_report_errors():
+    """Jobs run in persistent workers and yt-dlp errors come back as YtDlpError"""
+    pool = YtDlpPool(size=1, max_tasks_per_worker=10)
+    try:
+        await pool.start()
+        with pytest.raises(YtDlpError, match="not a valid URL"):
+            await pool.extract_info("not-a-url")
+        assert pool.stats()["failures"] == 1
+    finally:
+        await pool.stop()
+    assert pool.stats()["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_playlist_pages_are_served_while_enumeration_runs():
+    """The first page returns as soon as its entries arrive; later pages reuse the enumeration"""
+    more_entries = asyncio.Event()
+    calls = []
+
+    class FakePool:
+        async def stream_playlist(self, url):
+            calls.append(url)
+            yield {"playlist": {"title": "Mix"}}
+            yield {"entries": [{"id": "a1", "title": "First"}, {"id": "b2", "title": "Second"}, {"id": "c3"}]}
+            await more_entries.wait()
+            yield {"entries": [{"id": "d4", "title": "Fourth"}]}
+
+    extractor = YouTubeExtractor()
+    extractor.playlist_enumerator = PlaylistEnumerator(pool=FakePool(), max_entries=5)
+    url = "https://www.youtube.com/playlist?list=PL1"
+
+    first = await asyncio.wait_for(extractor.get_playlist_info(url, offset=0, limit=2), 1)
+    assert first["playlist_title"] == "Mix"
+    assert [v["id"] for v in first["videos"]] == ["a1", "b2"]
+    assert first["next_offset"] == 2 and first["complete"] is False
+
+    more_entries.set()
+    rest = await extractor.get_playlist_info(url, offset=2)
+    assert [v["id"] for v in rest["videos"]] == ["c3", "d4"]
+    assert rest["complete"] is True and rest["video_count"] == 4 and rest["next_offset"] is None
+    assert calls == [url]
+
+
+@pytest.mark.asyncio
+async def test_enumerations_take_scheduler_slots_and_are_cancelled_on_eviction():
+    """Enumerations queue for yt-dlp slots; an evicted one gives its slot back"""
+    started = []
+    closed = []
+
+    class FakePool:
+        async def stream_playlist(self, url):
+            started.append(url)
+            try:
+                yield {"playlist": {"title": url}}
+                await asyncio.Event().wait()
+            finally:
+                closed.append(url)
+
+    scheduler = JobScheduler(limits={YTDLP_JOBS: 1}, max_queued=5)
+    enumerator = PlaylistEnumerator(pool=FakePool(), max_entries=2, scheduler=scheduler)
+    first = enumerator.get("https://www.youtube.com/playlist?list=PL1")
+    enumerator.get("https://www.youtube.com/playlist?list=PL2")
+    await asyncio.sleep(0.01)
+    assert started == ["https://www.youtube.com/playlist?list=PL1"]
+
+    enumerator.get("https://www.youtube.com/playlist?list=PL3")
+    await asyncio.wait_for(first.wait_for(), 1)
+    await asyncio.sleep(0.01)
+    assert first.error and closed == ["https://www.youtube.com/playlist?list=PL1"]
+    assert started[1] == "https://www.youtube.com/playlist?list=PL2"
+
+
+def test_cancelled_enumeration_stops_paging_in_the_worker(monkeypatch):
+    """The worker checks the cancel flag between batches instead of paging to the end"""
+    from app import ytdlp_pool as module
+    pages = []
+
+    def entries():
+        for i in range(1000):
+            if i % 100 == 0:
+                pages.append(i)
+            yield {"id": f"v{i}"}
+
+    class FakeYdl:
+        def extract_info(self, url, download, process):
+            return {"_type": "playlist", "title": "Mix", "entries": entries()}
+
+        def sanitize_info(self, info):
+            return info
+
+    class FakeQueue:
+        def __init__(self):
+            self.events = []
+
+        def put(self, item):
+            self.events.append(item[1])
+            if "entries" in item[1]:
+                cancelled["job"] = True
+
+    cancelled = {}
+    queue = FakeQueue()
+    monkeypatch.setattr(module, "_ydl_for", lambda options: FakeYdl())
+    monkeypatch.setattr(module, "_progress_queue", queue)
+    monkeypatch.setattr(module, "_cancelled_jobs", cancelled)
+
+    assert module._playlist_entries_job("https://www.youtube.com/playlist?list=PL1", "job") == module.PLAYLIST_BATCH_SIZE
+    assert pages == [0]
+    assert not any(event.get("done") for event in queue.events)
+    assert cancelled == {}
+
+
+@pytest.mark.asyncio
+async def test_abandoned_playlist_stream_flags_its_worker_job(monkeypatch):
+    """Closing the stream early tells the worker to stop; the flag is dropped once the job ends"""
+    pool = YtDlpPool(size=1)
+    pool._cancelled_jobs = {}
+    release = asyncio.Event()
+    submitted = []
+
+    async def fake_submit(fn, url, job_id):
+        submitted.append(job_id)
+        pool._listeners[job_id][1]({"playlist": {"title": "Mix"}})
+        await release.wait()
+        assert job_id in pool._cancelled_jobs
+        return 0
+
+    monkeypatch.setattr(pool, "_submit", fake_submit)
+    try:
+        stream = pool.stream_playlist("https://www.youtube.com/playlist?list=PL1")
+        assert await stream.__anext__() == {"playlist": {"title": "Mix"}}
+        await stream.aclose()
+        assert list(pool._cancelled_jobs) == submitted
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert pool._cancelled_jobs == {}
+    finally:
+        await pool.stop()
+
+
+def test_download_past_its_time_limit_is_stopped_in_the_worker(monkeypatch):
+    """The deadline hook aborts yt-dlp itself, so no orphaned download keeps running"""
+    import time
+    import yt_dlp
+    from app import ytdlp_pool as module
+
+    class FakeYoutubeDL:
+        def __init__(self, options):
+            self.hooks = options["progress_hooks"]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def extract_info(self, url, download):
+            for _ in range(3):
+                for hook in self.hooks:
+                    hook({"status": "downloading"})
+                time.sleep(0.02)
+            return {"id": "x"}
+
+        def sanitize_info(self, info, **kwargs):
+            return info
+
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", FakeYoutubeDL)
+
+    with pytest.raises(module.YtDlpTimeout, match="Timed out"):
+        module._download_job("https://youtu.be/x", {}, timeout=0.01)
+    assert module._download_job("https://youtu.be/x", {}, timeout=5) == {"id": "x"}
+
+
+def test_watchdog_interrupts_a_download_stuck_without_progress(monkeypatch):
+    """The worker-side timer stops a job that never reaches a progress hook"""
+    import signal
+    import time
+    import yt_dlp
+    from app import ytdlp_pool as module
+
+    class StuckYoutubeDL:
+        def __init__(self, options):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def extract_info(self, url, download):
+            time.sleep(10)
+
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", StuckYoutubeDL)
+    previous = signal.signal(signal.SIGUSR1, module._on_deadline_signal)
+    try:
+        start = time.monotonic()
+        with pytest.raises(module.YtDlpTimeout, match="Timed out"):
+            module._download_job("https://youtu.be/x", {}, timeout=0.1)
+        assert time.monotonic() - start < 2
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+@pytest.mark.asyncio
+async def test_worker_still_running_past_the_grace_period_is_killed(monkeypatch):
+    """The caller's own deadline kills a worker that ignores the watchdog and recycles the pool"""
+    import subprocess
+    from app import ytdlp_pool as module
+
+    stuck = subprocess.Popen(["sleep", "30"])
+    pool = YtDlpPool(size=1)
+
+    async def fake_submit(fn, url, options, job_id, info, timeout):
+        pool._listeners[job_id][1]({"worker_pid": stuck.pid})
+        await asyncio.to_thread(stuck.wait)
+        raise YtDlpError("yt-dlp worker process crashed")
+
+    monkeypatch.setattr(module, "WATCHDOG_GRACE_SECONDS", 0.1)
+    monkeypatch.setattr(pool, "_submit", fake_submit)
+    try:
+        with pytest.raises(module.YtDlpTimeout, match="was killed"):
+            await asyncio.wait_for(pool.download("https://youtu.be/x", timeout=0.1), 5)
+        assert stuck.poll() is not None
+        assert pool.stats()["restarts"] == 1
+    finally:
+        stuck.kill()
+        await pool.stop()
@@ -0,0 +1,78 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.ytdlp_updater import YtDlpUpdater
+
+
+def make_updater(tmp_path, running_version, latest_version):
+    pool = MagicMock()
+    pool.version = AsyncMock(return_value=running_version)
+    updater = YtDlpUpdater(pool=pool, runtime_dir=str(tmp_path))
+    updater._latest_version = AsyncMock(return_value=latest_version)
+
+    async def fake_stage(version):
+        (updater.versions_dir / version / "yt_dlp").mkdir(parents=True)
+
+    updater._stage = fake_stage
+    return updater, pool
+
+
+@pytest.mark.asyncio
+async def test_new_release_is_staged_swapped_and_reloaded(tmp_path):
+    """A newer release is activated via the current symlink and the pool reloads"""
+    updater, pool = make_updater(tmp_path, "2024.11.18", "2025.01.01")
+
+    result = await updater.check_and_update()
+
+    assert result == "updated 2024.11.18 -> 2025.01.01"
+    assert os.path.realpath(tmp_path / "current") == str(tmp_path / "versions" / "2025.01.01")
+    pool.reload.assert_called_once()
+    assert updater.status()["current_version"] == "2025.01.01"
+
+
+@pytest.mark.asyncio
+async def test_up_to_date_release_is_left_alone(tmp_path):
+    """No staging or reload when the running release is the latest"""
+    updater, pool = make_updater(tmp_path, "2025.01.01", "2025.01.01")
+
+    result = await updater.check_and_update()
+
+    assert result.startswith("up to date")
+    assert not (tmp_path / "current").exists()
+    pool.reload.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_old_releases_are_pruned(tmp_path):
+    """Only the newest releases are kept after repeated updates"""
+    updater, pool = make_updater(tmp_path, "1", "2")
+    for running, latest in [("1", "2"), ("2", "3"), ("3", "4")]:
+        pool.version.return_value = running
+        updater._latest_version.return_value = latest
+        await updater.check_and_update()
+
+    remaining = sorted(p.name for p in (tmp_path / "versions").iterdir())
+    assert "4" in remaining and len(remaining) <= 2
+
+
+@pytest.mark.asyncio
+async def test_staging_race_with_another_worker_counts_as_staged(tmp_path, monkeypatch):
+    """If another worker renames the same release into place first, staging still succeeds"""
+    from app import ytdlp_updater as module
+    updater = YtDlpUpdater(pool=MagicMock(), runtime_dir=str(tmp_path))
+    target = updater.versions_dir / "2025.01.01"
+
+    async def fake_pip(*args, **kwargs):
+        staging = args[args.index('--target') + 1]
+        assert staging.endswith(f".{os.getpid()}.partial")
+        (tmp_path / "versions" / "2025.01.01" / "yt_dlp").mkdir(parents=True)
+        (module.Path(staging) / "yt_dlp").mkdir()
+        process = MagicMock(returncode=0)
+        process.communicate = AsyncMock(return_value=(b"", b""))
+        return process
+
+    monkeypatch.setattr(module.asyncio, "create_subprocess_exec", fake_pip)
+    await updater._stage("2025.01.01")
+
+    assert (target / "yt_dlp").is_dir()
+    assert [p.name for p in updater.versions_dir.iterdir()] == ["2025.01.01"]